@@ -1,60 +1,72 @@
 """
-Chips Compensation Script
-Add 300 chips to all players to compensate for BUG testing
+筹码批量发放（补偿/活动空投）管理命令
+
+    python add_chips_compensation.py 300 --reason "BUG补偿"
+    python add_chips_compensation.py 500 --reason "活动" --max-chips 1000 --dry-run
+    python add_chips_compensation.py 100 --reason "补发" --user 123 --user 456
+
+按块提交事务，Bot运行中也可以执行，但Bot内存中的余额缓存和排行榜
+不会感知其他进程的修改，发放后需要重启Bot。
 """
-import sqlite3
+import argparse
+import asyncio
 import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import Config
+from data.database import Database
+from data.models import GrantFilter
+from utils.helpers import datetime_to_ms
+
 
-# Database path
-DB_PATH = os.path.join(os.path.dirname(__file__), "data", "games.db")
-
-def add_chips_to_all_players(amount: int = 300):
-    """Add chips to all players"""
-    
-    if not os.path.exists(DB_PATH):
-        print(f"[ERROR] Database file not found: {DB_PATH}")
-        return
-    
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    
+async def _main() -> None:
+    parser = argparse.ArgumentParser(description="批量发放筹码")
+    parser.add_argument("amount", type=int, help="每人发放数量")
+    parser.add_argument("--reason", required=True, help="发放原因（记入账本）")
+    parser.add_argument("--db", default=Config.DATABASE_PATH, help="数据库路径")
+    parser.add_argument("--user", type=int, action="append", dest="user_ids", help="指定玩家ID（可重复）")
+    parser.add_argument("--min-chips", type=int, help="余额下限（含）")
+    parser.add_argument("--max-chips", type=int, help="余额上限（含）")
+    parser.add_argument("--created-before", help="只发放给此日期前注册的玩家（YYYY-MM-DD，本地时间）")
+    parser.add_argument("--chunk-size", type=int, default=Config.BULK_GRANT_CHUNK_SIZE, help="每个事务处理的玩家数")
+    parser.add_argument("--dry-run", action="store_true", help="只统计符合条件的玩家数")
+    args = parser.parse_args()
+
+    if args.amount <= 0:
+        parser.error("发放数量必须为正数")
+
+    grant_filter = GrantFilter(
+        user_ids=tuple(args.user_ids) if args.user_ids else None,
+        min_chips=args.min_chips,
+        max_chips=args.max_chips,
+        created_before_ms=(
+            datetime_to_ms(datetime.strptime(args.created_before, "%Y-%m-%d"))
+            if args.created_before else None
+        ),
+    )
+
+    database = Database(args.db, wal=Config.DATABASE_WAL)
+    await database.connect()
     try:
-        # Get all players current balance
-        cursor.execute("SELECT user_id, chips FROM players")
-        players = cursor.fetchall()
-        
-        if not players:
-            print("[ERROR] No players found")
+        targets = await database.count_grant_targets(grant_filter)
+        print(f"符合条件的玩家: {targets}，每人发放 {args.amount} 🎰（{args.reason}）")
+        if args.dry_run or targets == 0:
             return
-        
-        print(f"[INFO] Found {len(players)} players")
-        print("-" * 50)
-        
-        # Add chips to each player
-        for player in players:
-            old_chips = player["chips"]
-            new_chips = old_chips + amount
-            cursor.execute(
-                "UPDATE players SET chips = ? WHERE user_id = ?",
-                (new_chips, player["user_id"])
-            )
-            print(f"  Player {player['user_id']}: {old_chips} -> {new_chips} (+{amount})")
-        
-        # Commit changes
-        conn.commit()
-        
-        print("-" * 50)
-        print(f"[SUCCESS] Added {amount} chips to {len(players)} players!")
-        
-    except Exception as e:
-        conn.rollback()
-        print(f"[ERROR] {e}")
+
+        start = time.perf_counter()
+        granted = await database.bulk_grant(
+            args.amount, args.reason, grant_filter,
+            chunk_size=args.chunk_size, pause=Config.BULK_GRANT_PAUSE
+        )
+        print(f"已向 {granted} 名玩家发放，共 {granted * args.amount} 🎰，"
+              f"耗时 {time.perf_counter() - start:.2f}s")
     finally:
-        conn.close()
+        await database.close()
+
 
 if __name__ == "__main__":
-    print("=" * 50)
-    print("Chips Compensation Script")
-    print("=" * 50)
-    add_chips_to_all_players(300)
\ No newline at end of file
+    asyncio.run(_main())
@@ -0,0 +1,110 @@
+"""
+行解码基准测试
+
+对比时间列为ISO文本（每行 datetime.fromisoformat）与INTEGER毫秒时间戳
+（直接取整数，按需转换）时，读取玩家行并判断能否签到的开销。
+
+用法:
+    python benchmarks/bench_row_decode.py [--rows 100000] [--repeat 5]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.models import PlayerData
+from utils.helpers import datetime_to_ms
+
+
+@dataclass
+class TextPlayerData:
+    """旧格式：时间为datetime字段"""
+    user_id: int
+    chips: int = 0
+    last_daily: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+    
+    def can_claim_daily(self) -> bool:
+        if self.last_daily is None:
+            return True
+        return datetime.now().date() > self.last_daily.date()
+
+
+def build(rows: int) -> sqlite3.Connection:
+    """创建两种格式的内存表"""
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.execute("CREATE TABLE players_text (user_id INTEGER PRIMARY KEY, chips INTEGER, "
+                 "last_daily TEXT, created_at TEXT)")
+    conn.execute("CREATE TABLE players_ms (user_id INTEGER PRIMARY KEY, chips INTEGER, "
+                 "last_daily INTEGER, created_at INTEGER)")
+    
+    base = datetime.now() - timedelta(days=30)
+    text_rows, ms_rows = [], []
+    for i in range(rows):
+        last_daily = base + timedelta(minutes=i % 43200)
+        created_at = base - timedelta(seconds=i)
+        text_rows.append((i, i, last_daily.isoformat(), created_at.isoformat(sep=" ", timespec="seconds")))
+        ms_rows.append((i, i, datetime_to_ms(last_daily), datetime_to_ms(created_at)))
+    conn.executemany("INSERT INTO players_text VALUES (?, ?, ?, ?)", text_rows)
+    conn.executemany("INSERT INTO players_ms VALUES (?, ?, ?, ?)", ms_rows)
+    return conn
+
+
+def decode_text(conn: sqlite3.Connection) -> int:
+    claimable = 0
+    for row in conn.execute("SELECT * FROM players_text"):
+        player = TextPlayerData(
+            user_id=row["user_id"],
+            chips=row["chips"],
+            last_daily=datetime.fromisoformat(row["last_daily"]) if row["last_daily"] else None,
+            created_at=datetime.fromisoformat(row["created_at"])
+        )
+        claimable += player.can_claim_daily()
+    return claimable
+
+
+def decode_ms(conn: sqlite3.Connection) -> int:
+    claimable = 0
+    for row in conn.execute("SELECT * FROM players_ms"):
+        player = PlayerData(
+            user_id=row["user_id"],
+            chips=row["chips"],
+            last_daily_ms=row["last_daily"],
+            created_at_ms=row["created_at"]
+        )
+        claimable += player.can_claim_daily()
+    return claimable
+
+
+def bench(label: str, func, conn: sqlite3.Connection, rows: int, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(conn)
+        best = min(best, time.perf_counter() - start)
+    print(f"{label}: {best * 1000:.1f}ms / {rows} 行, 每行 {best / rows * 1e6:.2f}µs")
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="行解码基准测试")
+    parser.add_argument("--rows", type=int, default=100_000, help="行数")
+    parser.add_argument("--repeat", type=int, default=5, help="重复次数（取最快一次）")
+    args = parser.parse_args()
+    
+    conn = build(args.rows)
+    assert decode_text(conn) == decode_ms(conn)
+    before = bench("ISO文本 + fromisoformat", decode_text, conn, args.rows, args.repeat)
+    after = bench("INTEGER毫秒时间戳", decode_ms, conn, args.rows, args.repeat)
+    print(f"提升: {before / after:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
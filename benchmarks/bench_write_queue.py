@@ -0,0 +1,62 @@
+"""
+写队列基准测试
+
+对比开启/关闭合并提交写队列时的吞吐量和每秒提交次数。
+
+用法:
+    python benchmarks/bench_write_queue.py [--workers 50] [--ops 40]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.database import Database
+
+
+async def run(write_queue: bool, workers: int, ops: int, synchronous_full: bool) -> None:
+    """运行一轮基准测试"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "bench.db"), wal=True, write_queue=write_queue)
+        await db.connect()
+        if synchronous_full:
+            await db._connection.execute("PRAGMA synchronous=FULL")
+        
+        for user_id in range(workers):
+            await db.create_player(user_id, 1_000_000)
+        commits_before = db.commit_count
+        
+        async def worker(user_id: int) -> None:
+            for _ in range(ops):
+                await db.adjust_chips(user_id, 1, earned=1)
+        
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(workers)))
+        elapsed = time.perf_counter() - start
+        
+        total_ops = workers * ops
+        commits = db.commit_count - commits_before
+        label = "写队列开启" if write_queue else "写队列关闭"
+        print(f"{label}: {total_ops} 次操作, {commits} 次提交, 耗时 {elapsed:.2f}s | "
+              f"{total_ops / elapsed:,.0f} 操作/秒, {commits / elapsed:,.0f} 提交/秒, "
+              f"平均每次提交 {total_ops / max(commits, 1):.1f} 个操作")
+        await db.close()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="写队列基准测试")
+    parser.add_argument("--workers", type=int, default=50, help="并发协程数")
+    parser.add_argument("--ops", type=int, default=40, help="每个协程的写操作数")
+    parser.add_argument("--full-sync", action="store_true", help="使用 synchronous=FULL（每次提交fsync）")
+    args = parser.parse_args()
+    
+    await run(False, args.workers, args.ops, args.full_sync)
+    await run(True, args.workers, args.ops, args.full_sync)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -13,10 +13,18 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from config import Config
 from data.database import Database
+from data.record_writer import GameRecordWriter
 from core.economy import Economy
-from core.player_data import PlayerDataManager
+from core.locks import KeyedLockManager
+from core.scheduler import Scheduler
+from core.tasks import TaskSupervisor
+from core.message_deleter import MessageDeleter
+from core.player_data import PlayerCache, PlayerDataManager
 from core.daily import DailySystem
+from core.leaderboard import Leaderboard
+from core.user_names import UserNameResolver
 from games.buckshot_roulette import BuckshotRouletteGame
+from utils.helpers import now_ms
 
 # 配置日志
 logging.basicConfig(
@@ -46,9 +54,17 @@ class GameCenterBot(commands.Bot):
         
         # 核心系统
         self.database: Database = None
+        self.game_records: GameRecordWriter = None
+        self.scheduler: Scheduler = None
+        self.tasks: TaskSupervisor = None
+        self.deleter: MessageDeleter = None
         self.economy: Economy = None
+        self.locks: KeyedLockManager = None
+        self.player_cache: PlayerCache = None
         self.player_data: PlayerDataManager = None
         self.daily: DailySystem = None
+        self.leaderboard: Leaderboard = None
+        self.user_names: UserNameResolver = None
         
         # 游戏模块
         self.buckshot_roulette: BuckshotRouletteGame = None
@@ -58,20 +74,51 @@ class GameCenterBot(commands.Bot):
         logger.info("正在初始化Bot...")
         
         # 初始化数据库
-        self.database = Database(Config.DATABASE_PATH)
+        self.database = Database(
+            Config.DATABASE_PATH,
+            wal=Config.DATABASE_WAL,
+            readers=Config.DATABASE_READERS,
+            cache_size_kb=Config.DATABASE_CACHE_SIZE_KB,
+            mmap_size=Config.DATABASE_MMAP_SIZE,
+            write_queue=Config.DATABASE_WRITE_QUEUE,
+            flush_interval=Config.DATABASE_FLUSH_INTERVAL,
+            flush_max_ops=Config.DATABASE_FLUSH_MAX_OPS
+        )
         await self.database.connect()
         logger.info("数据库连接成功")
         
+        self.game_records = GameRecordWriter(
+            self.database,
+            max_pending=Config.GAME_RECORD_QUEUE_SIZE,
+            batch_size=Config.GAME_RECORD_BATCH_SIZE,
+            flush_interval=Config.GAME_RECORD_FLUSH_INTERVAL
+        )
+        self.game_records.start()
+        
         # 初始化核心系统
-        self.economy = Economy(self.database)
-        self.player_data = PlayerDataManager(self.database)
-        self.daily = DailySystem(self.database)
+        self.scheduler = Scheduler()
+        self.tasks = TaskSupervisor(Config.BACKGROUND_TASK_CONCURRENCY)
+        self.locks = KeyedLockManager()
+        self.player_cache = PlayerCache(self.database, Config.PLAYER_CACHE_SIZE)
+        self.economy = Economy(self.database, self.player_cache, self.locks)
+        self.player_data = PlayerDataManager(self.database, self.player_cache)
+        self.daily = DailySystem(self.database, self.player_cache)
+        self.leaderboard = Leaderboard(self.database)
+        await self.leaderboard.load()
+        self.user_names = UserNameResolver(self, self.database, self.tasks)
+        self.deleter = MessageDeleter(self, self.database, self.tasks)
+        await self.deleter.load()
         logger.info("核心系统初始化完成")
         
         # 初始化游戏模块
         self.buckshot_roulette = BuckshotRouletteGame(self)
         logger.info("游戏模块初始化完成")
         
+        # 启动定时任务（先补做一次日切，覆盖停机期间错过的0点）
+        await self.daily_rollover()
+        self.schedule_jobs()
+        self.scheduler.start()
+        
         # 加载Cogs
         await self.load_cogs()
         
@@ -94,6 +141,53 @@ class GameCenterBot(commands.Bot):
             except Exception as e:
                 logger.error(f"加载Cog失败 {cog}: {e}")
     
+    # ==================== 定时任务 ====================
+    
+    def schedule_jobs(self) -> None:
+        """注册定时任务"""
+        self.scheduler.daily(self.daily_rollover)
+        self.scheduler.every(Config.LEDGER_SNAPSHOT_INTERVAL, self.snapshot_ledger)
+        self.scheduler.every(Config.IDEMPOTENCY_PURGE_INTERVAL, self.purge_idempotency_keys)
+        self.scheduler.every(Config.SESSION_SWEEP_INTERVAL, self.sweep_sessions)
+        self.scheduler.every(Config.USER_NAME_PURGE_INTERVAL, self.user_names.purge_expired)
+        self.scheduler.every(Config.MESSAGE_DELETE_TICK, self.deleter.tick)
+        if Config.METRICS_LOG_INTERVAL > 0:
+            self.scheduler.every(Config.METRICS_LOG_INTERVAL, self.log_metrics)
+    
+    def delete_later(self, message: discord.Message, delay: float) -> None:
+        """延迟删除消息（记入持久化的删除时间轮，重启后继续删除）"""
+        self.deleter.schedule(message, delay)
+    
+    async def daily_rollover(self) -> None:
+        """每天0点：重置中断的连续签到"""
+        count = await self.daily.rollover()
+        logger.info(f"日切完成，{count} 名玩家的连续签到已重置")
+    
+    async def snapshot_ledger(self) -> None:
+        """定期写入余额快照，使账本重算只需读取快照之后的流水"""
+        count = await self.database.snapshot_balances()
+        if count:
+            logger.info(f"已写入 {count} 条余额快照")
+    
+    async def purge_idempotency_keys(self) -> None:
+        """定期清理过期的幂等键"""
+        count = await self.database.purge_idempotency_keys(
+            now_ms() - Config.IDEMPOTENCY_KEY_TTL * 1000
+        )
+        if count:
+            logger.info(f"已清理 {count} 个过期幂等键")
+    
+    def sweep_sessions(self) -> None:
+        """清理无人操作的游戏会话"""
+        count = self.buckshot_roulette.sweep_sessions()
+        if count:
+            logger.info(f"已清理 {count} 个无人操作的游戏会话")
+    
+    def log_metrics(self) -> None:
+        """定期输出运行统计（缓存命中率、锁等待）"""
+        logger.info(f"玩家缓存统计: {self.player_cache.get_metrics()}")
+        logger.info(f"用户锁等待统计: {self.locks.get_metrics()}")
+    
     async def on_ready(self) -> None:
         """Bot就绪事件"""
         logger.info(f"Bot已登录: {self.user} (ID: {self.user.id})")
@@ -118,6 +212,23 @@ class GameCenterBot(commands.Bot):
         """关闭Bot"""
         logger.info("正在关闭Bot...")
         
+        if self.player_cache:
+            logger.info(f"玩家缓存统计: {self.player_cache.get_metrics()}")
+        if self.locks:
+            logger.info(f"用户锁等待统计: {self.locks.get_metrics()}")
+        
+        if self.scheduler:
+            await self.scheduler.close()
+        if self.deleter:
+            await self.deleter.close()
+            logger.info(f"消息删除统计: {self.deleter.get_metrics()}")
+        if self.tasks:
+            await self.tasks.close(Config.BACKGROUND_TASK_DRAIN_TIMEOUT)
+            logger.info(f"后台任务统计: {self.tasks.get_metrics()}")
+        
+        if self.game_records:
+            await self.game_records.close()
+        
         if self.database:
             await self.database.close()
             logger.info("数据库连接已关闭")
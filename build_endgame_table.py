@@ -0,0 +1,36 @@
+"""
+生成恶魔轮盘赌AI的无道具残局表
+
+    python build_endgame_table.py
+    python build_endgame_table.py --max-hp 10 --max-rounds 8 --output /tmp/endgame.bin
+
+默认写入 games/buckshot_roulette/endgame.bin（随代码提交），修改残局规则后需要重新生成。
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from games.buckshot_roulette.endgame import DEFAULT_TABLE_PATH, MAX_HP, MAX_ROUNDS, build_table
+
+
+def _main() -> None:
+    parser = argparse.ArgumentParser(description="生成无道具残局表")
+    parser.add_argument("--output", default=DEFAULT_TABLE_PATH, help="输出路径")
+    parser.add_argument("--max-hp", type=int, default=MAX_HP, help="生命值上限")
+    parser.add_argument("--max-rounds", type=int, default=MAX_ROUNDS, help="每种子弹的数量上限")
+    args = parser.parse_args()
+
+    if not 0 < args.max_hp < 256 or not 0 < args.max_rounds < 256:
+        parser.error("上限必须在 1-255 之间")
+
+    start = time.perf_counter()
+    count = build_table(args.output, args.max_hp, args.max_rounds)
+    print(f"已生成 {count} 个状态 -> {args.output}（{os.path.getsize(args.output)} 字节），"
+          f"耗时 {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    _main()
@@ -1,6 +1,8 @@
 """
 游戏中心命令模块
 """
+import uuid
+
 import discord
 from discord import app_commands
 from discord.ext import commands
@@ -11,6 +13,7 @@ from ui.menus import MenuButton, BackButton
 from utils.constants import Emoji, Colors
 from utils.helpers import format_chips
 from config import Config
+from core.leaderboard import Leaderboard
 
 if TYPE_CHECKING:
     from bot import GameCenterBot
@@ -123,13 +126,19 @@ class GameCenterView(BaseView):
     
     async def on_leaderboard(self, interaction: discord.Interaction):
         """排行榜面板"""
-        # 先延迟响应，因为获取用户信息可能耗时较长
+        # 先延迟响应，名称缓存未命中时需要请求Discord
         await interaction.response.defer()
         
-        # 获取各项排行榜
-        chips_lb = await self.cog.bot.database.get_chips_leaderboard(5)
-        rounds_lb = await self.cog.bot.database.get_rounds_leaderboard(5)
-        reward_lb = await self.cog.bot.database.get_reward_leaderboard(5)
+        # 获取各项排行榜（内存索引，不访问数据库）
+        leaderboard = self.cog.bot.leaderboard
+        chips_lb = leaderboard.top(Leaderboard.CHIPS, 5)
+        rounds_lb = leaderboard.top(Leaderboard.ROUNDS, 5)
+        reward_lb = leaderboard.top(Leaderboard.REWARD, 5)
+        
+        # 一次并发解析所有上榜用户的名称
+        names = await self.cog.bot.user_names.resolve_many(
+            user_id for user_id, _ in chips_lb + rounds_lb + reward_lb
+        )
         
         embed = discord.Embed(
             title=f"{Emoji.TROPHY} 排行榜",
@@ -140,11 +149,7 @@ class GameCenterView(BaseView):
         chips_text = ""
         for i, (user_id, chips) in enumerate(chips_lb, 1):
             medal = ["🥇", "🥈", "🥉"][i-1] if i <= 3 else f"{i}."
-            try:
-                user = await self.cog.bot.fetch_user(user_id)
-                name = user.display_name
-            except:
-                name = f"用户{user_id}"
+            name = names.get(user_id, f"用户{user_id}")
             chips_text += f"{medal} {name}: {format_chips(chips)}\n"
         
         if not chips_text:
@@ -160,11 +165,7 @@ class GameCenterView(BaseView):
         rounds_text = ""
         for i, (user_id, rounds) in enumerate(rounds_lb, 1):
             medal = ["🥇", "🥈", "🥉"][i-1] if i <= 3 else f"{i}."
-            try:
-                user = await self.cog.bot.fetch_user(user_id)
-                name = user.display_name
-            except:
-                name = f"用户{user_id}"
+            name = names.get(user_id, f"用户{user_id}")
             rounds_text += f"{medal} {name}: {rounds}轮\n"
         
         if not rounds_text:
@@ -180,11 +181,7 @@ class GameCenterView(BaseView):
         reward_text = ""
         for i, (user_id, reward) in enumerate(reward_lb, 1):
             medal = ["🥇", "🥈", "🥉"][i-1] if i <= 3 else f"{i}."
-            try:
-                user = await self.cog.bot.fetch_user(user_id)
-                name = user.display_name
-            except:
-                name = f"用户{user_id}"
+            name = names.get(user_id, f"用户{user_id}")
             reward_text += f"{medal} {name}: {format_chips(reward)}\n"
         
         if not reward_text:
@@ -196,6 +193,22 @@ class GameCenterView(BaseView):
             inline=True
         )
         
+        # 自己的排名
+        rank_lines = []
+        for metric, label in [
+            (Leaderboard.CHIPS, "💰 筹码"),
+            (Leaderboard.ROUNDS, "🎯 最高轮数"),
+            (Leaderboard.REWARD, "💎 最大单局奖励"),
+        ]:
+            rank = leaderboard.rank(metric, self.user_id)
+            rank_text = f"第 {rank} 名 / {leaderboard.size(metric)}" if rank else "未上榜"
+            rank_lines.append(f"{label}: {rank_text}")
+        embed.add_field(
+            name="📍 我的排名",
+            value="\n".join(rank_lines),
+            inline=False
+        )
+        
         view = BackOnlyView(self.cog, self.user_id, self.balance)
         view.message = self.message
         await interaction.edit_original_response(embed=embed, view=view)
@@ -563,6 +576,8 @@ class TransferView(BaseView):
         self.balance = balance
         self.selected_user: Optional[discord.User] = None
         self.transfer_amount: int = Config.MIN_TRANSFER
+        # 转账幂等键：同一面板上的重复点击只转账一次，转账成功后换新面板
+        self.nonce = uuid.uuid4().hex
         self._setup_components()
     
     def _setup_components(self):
@@ -595,9 +610,25 @@ class TransferView(BaseView):
             row=2
         ))
         
+        # 转账记录按钮
+        self.add_item(MenuButton(
+            label="转账记录",
+            emoji="📜",
+            callback=self.on_history,
+            style=discord.ButtonStyle.secondary,
+            row=2
+        ))
+        
         # 返回按钮
         self.add_item(BackButton(callback=self.on_back, row=2))
     
+    async def on_history(self, interaction: discord.Interaction):
+        """转账记录"""
+        view = TransferHistoryView(self.cog, self.user_id, self.balance)
+        view.message = self.message
+        await view.load_page()
+        await interaction.response.edit_message(embed=view.create_embed(), view=view)
+    
     async def on_user_select(self, interaction: discord.Interaction, users: list):
         """选择用户"""
         if users:
@@ -633,7 +664,8 @@ class TransferView(BaseView):
         success, message = await self.cog.bot.economy.transfer(
             self.user_id,
             self.selected_user.id,
-            self.transfer_amount
+            self.transfer_amount,
+            key=f"transfer:{self.nonce}"
         )
         
         if success:
@@ -713,6 +745,92 @@ class TransferView(BaseView):
         return embed
 
 
+class TransferHistoryView(BaseView):
+    """转账记录分页View
+    
+    使用记录ID作为游标翻页，只保存已访问页的起始游标。
+    """
+    
+    def __init__(self, cog: 'GameCenterCog', user_id: int, balance: int):
+        super().__init__(user_id)
+        self.cog = cog
+        self.balance = balance
+        self.page_size = Config.TRANSFER_HISTORY_PAGE_SIZE
+        # 每页的起始游标（第一页为None）
+        self.cursors: list = [None]
+        self.records: list = []
+        self.has_next = False
+        
+        self.prev_button = MenuButton(
+            label="上一页",
+            emoji="⬅️",
+            callback=self.on_prev,
+            style=discord.ButtonStyle.secondary,
+            row=0
+        )
+        self.next_button = MenuButton(
+            label="下一页",
+            emoji="➡️",
+            callback=self.on_next,
+            style=discord.ButtonStyle.secondary,
+            row=0
+        )
+        self.add_item(self.prev_button)
+        self.add_item(self.next_button)
+        self.add_item(BackButton(callback=self.on_back, row=0))
+    
+    async def load_page(self):
+        """加载当前页（多取一条用于判断是否有下一页）"""
+        records = await self.cog.bot.economy.get_transfer_history(
+            self.user_id, self.page_size + 1, self.cursors[-1]
+        )
+        self.has_next = len(records) > self.page_size
+        self.records = records[:self.page_size]
+        self.prev_button.disabled = len(self.cursors) <= 1
+        self.next_button.disabled = not self.has_next
+    
+    async def on_prev(self, interaction: discord.Interaction):
+        """上一页"""
+        if len(self.cursors) > 1:
+            self.cursors.pop()
+        await self.load_page()
+        await interaction.response.edit_message(embed=self.create_embed(), view=self)
+    
+    async def on_next(self, interaction: discord.Interaction):
+        """下一页"""
+        if self.has_next and self.records:
+            self.cursors.append(self.records[-1].id)
+        await self.load_page()
+        await interaction.response.edit_message(embed=self.create_embed(), view=self)
+    
+    async def on_back(self, interaction: discord.Interaction):
+        """返回转账面板"""
+        view = TransferView(self.cog, self.user_id, self.balance)
+        view.message = self.message
+        await interaction.response.edit_message(embed=view._create_transfer_embed(), view=view)
+    
+    def create_embed(self) -> discord.Embed:
+        """创建转账记录Embed"""
+        embed = discord.Embed(
+            title="📜 转账记录",
+            color=Colors.PRIMARY
+        )
+        if not self.records:
+            embed.description = "暂无转账记录"
+            return embed
+        
+        lines = []
+        for record in self.records:
+            time_str = record.created_at.strftime("%m-%d %H:%M")
+            if record.from_user_id == self.user_id:
+                lines.append(f"`{time_str}` 📤 转给 <@{record.to_user_id}> **-{record.amount:,}** 🎰")
+            else:
+                lines.append(f"`{time_str}` 📥 来自 <@{record.from_user_id}> **+{record.amount:,}** 🎰")
+        embed.description = "\n".join(lines)
+        embed.set_footer(text=f"第 {len(self.cursors)} 页")
+        return embed
+
+
 class PvPSetupView(BaseView):
     """PvP设置面板View"""
     
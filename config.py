@@ -56,6 +56,46 @@ class Config:
         },
     }
     MIN_TRANSFER: int = 10            # 最低转账
+    TRANSFER_HISTORY_PAGE_SIZE: int = 10  # 转账记录每页条数
+    
+    # 游戏记录配置
+    GAME_RECORD_QUEUE_SIZE: int = 1000          # 待写入记录队列容量
+    GAME_RECORD_BATCH_SIZE: int = 100           # 单次批量写入条数
+    GAME_RECORD_FLUSH_INTERVAL: float = 1.0     # 攒批等待时间（秒）
+    
+    # 账本配置
+    LEDGER_SNAPSHOT_INTERVAL: int = 600         # 余额快照间隔（秒）
+    
+    # 幂等键配置
+    IDEMPOTENCY_KEY_TTL: int = 7 * 24 * 3600    # 幂等键保留时间（秒）
+    IDEMPOTENCY_PURGE_INTERVAL: int = 3600      # 清理间隔（秒）
+    
+    # 定时任务配置
+    SESSION_SWEEP_INTERVAL: int = 60            # 清理无人操作会话的间隔（秒）
+    USER_NAME_PURGE_INTERVAL: int = 600         # 清理过期用户名称缓存的间隔（秒）
+    METRICS_LOG_INTERVAL: int = 600             # 输出缓存命中率等运行统计的间隔（秒，0为不输出）
+    
+    # 后台任务配置
+    BACKGROUND_TASK_CONCURRENCY: int = 16       # 同时运行的后台任务数（如删除消息）
+    BACKGROUND_TASK_DRAIN_TIMEOUT: float = 5.0  # 关闭时等待后台任务完成的时间（秒）
+    
+    # 消息自动删除配置
+    MESSAGE_DELETE_TICK: float = 1.0            # 删除时间轮每格时长（秒）
+    MESSAGE_DELETE_WHEEL_SLOTS: int = 512       # 删除时间轮槽数量
+    MESSAGE_DELETE_INTERVAL: float = 0.25       # 删除请求之间的间隔（秒）
+    
+    # 批量发放配置
+    BULK_GRANT_CHUNK_SIZE: int = 500            # 每个事务处理的玩家数
+    BULK_GRANT_PAUSE: float = 0.01              # 块之间的等待时间（秒）
+    
+    # 玩家数据缓存配置
+    PLAYER_CACHE_SIZE: int = 2048               # 缓存的活跃玩家数
+    
+    # 用户名称缓存配置
+    USER_NAME_CACHE_TTL: int = 3600             # 内存缓存有效期（秒）
+    USER_NAME_CACHE_SIZE: int = 2048            # 内存缓存最大条目数
+    USER_NAME_FETCH_CONCURRENCY: int = 5        # 向Discord请求用户信息的最大并发数
+    USER_NAME_STORED_TTL: int = 7 * 24 * 3600   # 数据库中名称的有效期（秒）
     
     # 游戏配置
     TURN_TIMEOUT: int = 300           # 回合超时（秒）- 5分钟，给玩家足够思考时间
@@ -80,6 +120,9 @@ class Config:
     # AI配置
     DEMON_CHEAT_CHANCE: float = 0.15  # 恶魔AI作弊概率
     HARD_PLUS_CHEAT_CHANCE: float = 0.08  # 困难+AI作弊概率
+    AI_SEARCH_TIME_BUDGET: float = 0.05   # 困难/恶魔AI每步搜索时间上限（秒），0为只用启发式策略
+    AI_SEARCH_MAX_DEPTH: int = 12         # 搜索最大深度（动作数）
+    AI_SEARCH_TABLE_SIZE: int = 200_000   # 搜索置换表最大条目数
     
     # 消息清理配置
     AUTO_DELETE_MESSAGES: bool = True           # 是否自动删除消息
@@ -88,6 +131,13 @@ class Config:
     
     # 数据库配置
     DATABASE_PATH: str = os.getenv("DATABASE_PATH", "data/games.db")
+    DATABASE_WAL: bool = os.getenv("DATABASE_WAL", "1") != "0"  # WAL模式（读写并发）
+    DATABASE_READERS: int = int(os.getenv("DATABASE_READERS", "2"))  # 只读连接数量
+    DATABASE_CACHE_SIZE_KB: int = 16384         # 每个连接的页缓存（KB）
+    DATABASE_MMAP_SIZE: int = 64 * 1024 * 1024  # 内存映射大小（字节）
+    DATABASE_WRITE_QUEUE: bool = os.getenv("DATABASE_WRITE_QUEUE", "0") == "1"  # 合并提交写队列
+    DATABASE_FLUSH_INTERVAL: float = 0.005      # 写队列攒批时间（秒）
+    DATABASE_FLUSH_MAX_OPS: int = 128           # 写队列单批最大操作数
     
     @classmethod
     def validate(cls) -> bool:
@@ -2,5 +2,11 @@
 核心系统模块
 """
 from .economy import Economy
-from .player_data import PlayerDataManager
-from .daily import DailySystem
\ No newline at end of file
+from .locks import KeyedLockManager
+from .player_data import PlayerCache, PlayerDataManager
+from .daily import DailySystem
+from .leaderboard import Leaderboard
+from .user_names import UserNameResolver
+from .scheduler import Scheduler
+from .tasks import TaskSupervisor
+from .message_deleter import MessageDeleter
@@ -1,17 +1,20 @@
 """
 每日签到系统
 """
-from datetime import datetime, timedelta
-from typing import Tuple
+from typing import Optional, Tuple
 from data.database import Database
+from core.player_data import PlayerCache
 from config import Config
+from utils.helpers import local_day_bounds, now_ms
 
 
 class DailySystem:
     """每日签到系统"""
     
-    def __init__(self, database: Database):
+    def __init__(self, database: Database, cache: Optional[PlayerCache] = None):
         self.db = database
+        # 读取入口：有缓存时走缓存（接口与Database一致）
+        self.reader = cache if cache is not None else database
     
     async def claim_daily(self, user_id: int) -> Tuple[bool, int, str]:
         """领取每日奖励
@@ -22,25 +25,27 @@ class DailySystem:
         Returns:
             (是否成功, 奖励金额, 消息)
         """
-        player = await self.db.get_or_create_player(user_id)
-        
-        # 检查是否可以领取
-        if not player.can_claim_daily():
+        # 缓存中已是今天签到过的玩家直接返回，不开写事务
+        player = await self.reader.get_player(user_id)
+        if player is not None and not player.can_claim_daily():
             return False, 0, "今天已经签到过了，明天再来吧！"
         
-        # 发放奖励
+        # 是否可领取由条件UPDATE判断，连点或并发请求只有一次生效
         reward = Config.DAILY_REWARD
-        new_balance = player.chips + reward
-        
-        await self.db.update_chips(user_id, new_balance)
-        await self.db.update_last_daily(user_id)
+        result = await self.db.grant_daily(user_id, reward, local_day_bounds()[0])
+        if result is None:
+            return False, 0, "今天已经签到过了，明天再来吧！"
         
-        # 更新统计
-        stats = await self.db.get_player_stats(user_id)
-        stats.total_chips_earned += reward
-        await self.db.update_player_stats(stats)
+        _, streak = result
+        return True, reward, f"签到成功！获得 {reward} 🎰（已连续签到 {streak} 天）"
+    
+    async def rollover(self) -> int:
+        """日切任务（每天0点及启动时执行）：刷新当天边界，昨天未签到的玩家连续天数清零
         
-        return True, reward, f"签到成功！获得 {reward} 🎰"
+        Returns:
+            连续天数被清零的玩家数
+        """
+        return await self.db.reset_daily_streaks(local_day_bounds()[0])
     
     async def can_claim(self, user_id: int) -> bool:
         """检查是否可以签到
@@ -51,7 +56,7 @@ class DailySystem:
         Returns:
             是否可以签到
         """
-        player = await self.db.get_player(user_id)
+        player = await self.reader.get_player(user_id)
         if player is None:
             return True
         return player.can_claim_daily()
@@ -65,7 +70,7 @@ class DailySystem:
         Returns:
             下次可签到时间描述
         """
-        player = await self.db.get_player(user_id)
+        player = await self.reader.get_player(user_id)
         if player is None or player.last_daily is None:
             return "现在就可以签到！"
         
@@ -73,11 +78,8 @@ class DailySystem:
             return "现在就可以签到！"
         
         # 计算到明天0点的时间
-        now = datetime.now()
-        tomorrow = now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
-        
-        delta = tomorrow - now
-        hours = delta.seconds // 3600
-        minutes = (delta.seconds % 3600) // 60
+        seconds = (local_day_bounds()[1] - now_ms()) // 1000
+        hours = seconds // 3600
+        minutes = (seconds % 3600) // 60
         
         return f"{hours}小时{minutes}分钟后"
\ No newline at end of file
@@ -1,16 +1,24 @@
 """
 筹码经济系统
 """
-from typing import Optional, List, Tuple
-from data.database import Database
+from typing import Dict, Optional, List, Tuple
+from data.database import Database, DeductResult
+from data.models import GrantFilter
+from core.locks import KeyedLockManager
+from core.player_data import PlayerCache
 from config import Config
 
 
 class Economy:
     """筹码经济系统"""
     
-    def __init__(self, database: Database):
+    def __init__(self, database: Database, cache: Optional[PlayerCache] = None,
+                 locks: Optional[KeyedLockManager] = None):
         self.db = database
+        # 读取入口：有缓存时走缓存（接口与Database一致）
+        self.reader = cache if cache is not None else database
+        # 按用户加锁：同一用户的筹码操作串行执行
+        self.locks = locks if locks is not None else KeyedLockManager()
     
     async def get_balance(self, user_id: int) -> int:
         """获取用户余额
@@ -21,66 +29,84 @@ class Economy:
         Returns:
             筹码余额
         """
-        player = await self.db.get_player(user_id)
+        player = await self.reader.get_player(user_id)
         if player is None:
             return 0
         return player.chips
     
-    async def add_chips(self, user_id: int, amount: int, reason: str = "") -> int:
+    async def add_chips(self, user_id: int, amount: int, reason: str = "",
+                        session_id: Optional[str] = None,
+                        counterparty_id: Optional[int] = None,
+                        key: Optional[str] = None) -> int:
         """增加筹码
         
         Args:
             user_id: Discord用户ID
             amount: 增加数量
-            reason: 原因（用于日志）
+            reason: 原因（记入账本）
+            session_id: 关联的游戏会话ID
+            counterparty_id: 对方用户ID（如PvP输家）
+            key: 幂等键（如 payout:会话ID:用户ID），重复调用不会重复发放
             
         Returns:
             新余额
         """
-        player = await self.db.get_or_create_player(user_id)
-        new_balance = player.chips + amount
-        await self.db.update_chips(user_id, new_balance)
-        
-        # 更新统计
-        stats = await self.db.get_player_stats(user_id)
-        stats.total_chips_earned += amount
-        await self.db.update_player_stats(stats)
-        
-        return new_balance
+        # 余额、统计与账本在同一事务内原子更新
+        async with self.locks.hold(user_id):
+            return await self.db.adjust_chips(
+                user_id, amount, earned=amount, reason=reason,
+                session_id=session_id, counterparty_id=counterparty_id, key=key
+            )
     
-    async def deduct_chips(self, user_id: int, amount: int, reason: str = "") -> bool:
+    async def deduct_chips(self, user_id: int, amount: int, reason: str = "",
+                           session_id: Optional[str] = None,
+                           key: Optional[str] = None) -> bool:
         """扣除筹码
         
         Args:
             user_id: Discord用户ID
             amount: 扣除数量
-            reason: 原因（用于日志）
+            reason: 原因（记入账本）
+            session_id: 关联的游戏会话ID
+            key: 幂等键，重复调用不会重复扣除
             
         Returns:
             是否成功（余额不足返回False）
         """
-        player = await self.db.get_or_create_player(user_id)
-        
-        if player.chips < amount:
-            return False
-        
-        new_balance = player.chips - amount
-        await self.db.update_chips(user_id, new_balance)
-        
-        # 更新统计
-        stats = await self.db.get_player_stats(user_id)
-        stats.total_chips_spent += amount
-        await self.db.update_player_stats(stats)
+        # 余额检查在UPDATE条件中完成，不存在先读后写的竞争
+        async with self.locks.hold(user_id):
+            new_balance = await self.db.adjust_chips(
+                user_id, -amount, spent=amount, reason=reason,
+                session_id=session_id, key=key
+            )
+        return new_balance is not None
+    
+    async def deduct_many(self, amounts: Dict[int, int], reason: str = "",
+                          session_id: Optional[str] = None,
+                          key: Optional[str] = None) -> DeductResult:
+        """同时扣除多个用户的筹码（全部成功或全部不扣）
         
-        return True
+        Args:
+            amounts: {用户ID: 扣除数量}
+            reason: 原因（记入账本）
+            session_id: 关联的游戏会话ID
+            key: 幂等键，重复调用不会重复扣除
+            
+        Returns:
+            扣除结果（DEDUCTED / INSUFFICIENT / 键已使用过时为REPLAYED）
+        """
+        async with self.locks.hold(*amounts):
+            return await self.db.deduct_chips_many(amounts, reason, session_id, key)
     
-    async def transfer(self, from_id: int, to_id: int, amount: int) -> Tuple[bool, str]:
+    async def transfer(self, from_id: int, to_id: int, amount: int,
+                       key: Optional[str] = None) -> Tuple[bool, str]:
         """转账
         
         Args:
             from_id: 转出用户ID
             to_id: 转入用户ID
             amount: 转账金额
+            key: 幂等键，重复调用不会重复转账
             
         Returns:
             (是否成功, 消息)
@@ -93,37 +119,75 @@ class Economy:
         if from_id == to_id:
             return False, "不能转账给自己"
         
-        # 检查余额
-        from_player = await self.db.get_or_create_player(from_id)
-        if from_player.chips < amount:
+        # 扣款、入账、记录在同一事务内完成，余额不足时整体不生效
+        async with self.locks.hold(from_id, to_id):
+            new_balance = await self.db.transfer_chips(from_id, to_id, amount, key)
+        if new_balance is None:
             return False, "余额不足"
         
-        # 执行转账
-        await self.db.get_or_create_player(to_id)  # 确保接收者存在
-        
-        # 扣除发送者
-        await self.db.update_chips(from_id, from_player.chips - amount)
-        
-        # 增加接收者
-        to_player = await self.db.get_player(to_id)
-        await self.db.update_chips(to_id, to_player.chips + amount)
-        
-        # 记录转账
-        await self.db.add_transfer_record(from_id, to_id, amount)
-        
         return True, f"成功转账 {amount} 🎰"
     
-    async def get_transfer_history(self, user_id: int, limit: int = 10) -> List:
+    async def get_transfer_history(self, user_id: int, limit: int = 10,
+                                   before_id: Optional[int] = None) -> List:
         """获取转账历史
         
         Args:
             user_id: 用户ID
             limit: 返回数量限制
+            before_id: 分页游标（上一页最后一条记录的ID）
             
         Returns:
             转账记录列表
         """
-        return await self.db.get_transfer_history(user_id, limit)
+        return await self.db.get_transfer_history(user_id, limit, before_id)
+    
+    async def bulk_grant(self, grant_filter: Optional[GrantFilter], amount: int,
+                         reason: str) -> int:
+        """批量发放筹码（补偿、活动空投）
+        
+        按块提交，不持有用户锁：每块都是单条SQL增量更新，与其他筹码操作互不覆盖。
+        
+        Args:
+            grant_filter: 筛选条件（None表示所有玩家）
+            amount: 每人发放数量
+            reason: 原因（记入账本）
+            
+        Returns:
+            发放的玩家数
+        """
+        return await self.db.bulk_grant(
+            amount, reason, grant_filter,
+            chunk_size=Config.BULK_GRANT_CHUNK_SIZE,
+            pause=Config.BULK_GRANT_PAUSE
+        )
+    
+    async def get_ledger(self, user_id: int, limit: int = 20,
+                         before_id: Optional[int] = None) -> List:
+        """获取账本流水
+        
+        Args:
+            user_id: 用户ID
+            limit: 返回数量限制
+            before_id: 分页游标（上一页最后一条流水的ID）
+            
+        Returns:
+            账本流水列表
+        """
+        return await self.db.get_ledger(user_id, limit, before_id)
+    
+    async def audit_balance(self, user_id: int) -> Tuple[int, int]:
+        """核对余额与账本
+        
+        Args:
+            user_id: 用户ID
+            
+        Returns:
+            (当前余额, 由账本重算的余额)，两者不一致说明存在未记账的改动
+        """
+        async with self.locks.hold(user_id):
+            player = await self.db.get_player(user_id)
+            recomputed = await self.db.recompute_balance(user_id)
+        return (player.chips if player else 0), recomputed
     
     async def ensure_player_exists(self, user_id: int) -> bool:
         """确保玩家存在，如果是新玩家则发放新手礼包
@@ -134,12 +198,15 @@ class Economy:
         Returns:
             是否是新玩家
         """
-        player = await self.db.get_player(user_id)
+        player = await self.reader.get_player(user_id)
+        if player is not None:
+            return False
         
-        if player is None:
+        async with self.locks.hold(user_id):
+            # 加锁后再次确认，避免并发请求重复发放新手礼包
+            if await self.db.get_player(user_id) is not None:
+                return False
             # 新玩家，发放新手礼包
             await self.db.create_player(user_id, Config.NEW_PLAYER_BONUS)
-            await self.db.get_player_stats(user_id)  # 初始化统计
-            return True
-        
-        return False
\ No newline at end of file
+            await self.reader.get_player_stats(user_id)  # 初始化统计
+        return True
\ No newline at end of file
@@ -0,0 +1,130 @@
+"""
+排行榜系统
+
+启动时从数据库加载一次，之后通过数据库变更通知增量维护，
+查询前N名和个人排名都不再访问SQLite。
+"""
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Tuple
+
+from data.database import Database, DatabaseListener
+from data.models import PlayerStats
+
+
+class RankedIndex:
+    """单项指标的有序索引
+
+    按 (-分数, 用户ID) 升序保存，分数相同时用户ID小的在前。
+    定位和排名查询为二分查找 O(log n)。
+    """
+
+    def __init__(self, min_score: Optional[int] = None):
+        """
+        Args:
+            min_score: 进入排行的最低分数（None表示不限制）
+        """
+        self.min_score = min_score
+        self._keys: List[Tuple[int, int]] = []
+        self._scores: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def load(self, entries: List[Tuple[int, int]]) -> None:
+        """批量加载 (用户ID, 分数)"""
+        self._scores = {
+            user_id: score for user_id, score in entries
+            if self.min_score is None or score >= self.min_score
+        }
+        self._keys = sorted((-score, user_id) for user_id, score in self._scores.items())
+
+    def update(self, user_id: int, score: int) -> None:
+        """更新用户分数"""
+        old = self._scores.get(user_id)
+        if old == score:
+            return
+        if old is not None:
+            index = bisect_left(self._keys, (-old, user_id))
+            del self._keys[index]
+            del self._scores[user_id]
+        if self.min_score is None or score >= self.min_score:
+            insort(self._keys, (-score, user_id))
+            self._scores[user_id] = score
+
+    def top(self, limit: int) -> List[Tuple[int, int]]:
+        """前N名 [(用户ID, 分数)]"""
+        return [(user_id, -neg_score) for neg_score, user_id in self._keys[:limit]]
+
+    def rank(self, user_id: int) -> Optional[int]:
+        """用户排名（从1开始），未上榜返回None"""
+        score = self._scores.get(user_id)
+        if score is None:
+            return None
+        return bisect_left(self._keys, (-score, user_id)) + 1
+
+    def score(self, user_id: int) -> Optional[int]:
+        """用户当前分数"""
+        return self._scores.get(user_id)
+
+
+class Leaderboard(DatabaseListener):
+    """排行榜管理器"""
+
+    CHIPS = "chips"      # 筹码
+    WINS = "wins"        # 胜场
+    ROUNDS = "rounds"    # PvE最高轮数
+    REWARD = "reward"    # 最大单局奖励
+
+    def __init__(self, database: Database):
+        self.db = database
+        self.indexes: Dict[str, RankedIndex] = {
+            self.CHIPS: RankedIndex(),
+            self.WINS: RankedIndex(),
+            # 与原SQL查询保持一致：只统计大于0的记录
+            self.ROUNDS: RankedIndex(min_score=1),
+            self.REWARD: RankedIndex(min_score=1),
+        }
+
+    async def load(self) -> None:
+        """从数据库加载全部分数并注册变更监听"""
+        self.indexes[self.CHIPS].load(await self.db.get_all_chips())
+
+        stat_rows = await self.db.get_all_ranked_stats()
+        self.indexes[self.WINS].load([(row[0], row[1]) for row in stat_rows])
+        self.indexes[self.ROUNDS].load([(row[0], row[2]) for row in stat_rows])
+        self.indexes[self.REWARD].load([(row[0], row[3]) for row in stat_rows])
+
+        self.db.add_listener(self)
+
+    def top(self, metric: str, limit: int = 10) -> List[Tuple[int, int]]:
+        """获取前N名
+
+        Args:
+            metric: 指标（Leaderboard.CHIPS 等）
+            limit: 数量
+
+        Returns:
+            [(用户ID, 分数)]
+        """
+        return self.indexes[metric].top(limit)
+
+    def rank(self, metric: str, user_id: int) -> Optional[int]:
+        """获取用户排名（从1开始），未上榜返回None"""
+        return self.indexes[metric].rank(user_id)
+
+    def size(self, metric: str) -> int:
+        """上榜人数"""
+        return len(self.indexes[metric])
+
+    # ==================== 数据库变更通知 ====================
+
+    def on_chips_changed(self, user_id: int, chips: int) -> None:
+        self.indexes[self.CHIPS].update(user_id, chips)
+
+    def on_stats_changed(self, user_id: int, stats: Optional[PlayerStats]) -> None:
+        # 部分更新只涉及收支统计，不影响排行指标
+        if stats is None:
+            return
+        self.indexes[self.WINS].update(user_id, stats.games_won)
+        self.indexes[self.ROUNDS].update(user_id, stats.pve_best_rounds)
+        self.indexes[self.REWARD].update(user_id, stats.pve_best_reward)
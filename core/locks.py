@@ -0,0 +1,69 @@
+"""
+按用户加锁
+
+同一用户的筹码操作串行执行，避免连点导致的重复扣款/重复签到。
+锁对象按需创建，无人持有或等待时自动回收。
+"""
+import asyncio
+import time
+import weakref
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Hashable, List
+
+
+class KeyedLockManager:
+    """按键加锁的锁管理器"""
+
+    def __init__(self):
+        self._locks: "weakref.WeakValueDictionary[Hashable, asyncio.Lock]" = weakref.WeakValueDictionary()
+        # 等待统计
+        self.acquisitions = 0       # 获取次数
+        self.contended = 0          # 需要等待的次数
+        self.total_wait = 0.0       # 累计等待时间（秒）
+        self.max_wait = 0.0         # 最长等待时间（秒）
+
+    def _get_lock(self, key: Hashable) -> asyncio.Lock:
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[key] = lock
+        return lock
+
+    @asynccontextmanager
+    async def hold(self, *keys: Hashable) -> AsyncIterator[None]:
+        """持有一个或多个键的锁
+
+        多个键按排序后的顺序获取，不同调用之间不会死锁。
+        同一任务内不可重入。
+        """
+        # 持有强引用，保证使用期间锁不被回收
+        locks: List[asyncio.Lock] = [self._get_lock(key) for key in sorted(set(keys))]
+        acquired: List[asyncio.Lock] = []
+        try:
+            for lock in locks:
+                if lock.locked():
+                    start = time.perf_counter()
+                    await lock.acquire()
+                    waited = time.perf_counter() - start
+                    self.contended += 1
+                    self.total_wait += waited
+                    self.max_wait = max(self.max_wait, waited)
+                else:
+                    await lock.acquire()
+                self.acquisitions += 1
+                acquired.append(lock)
+            yield
+        finally:
+            for lock in reversed(acquired):
+                lock.release()
+
+    def get_metrics(self) -> Dict[str, float]:
+        """锁等待统计"""
+        return {
+            "acquisitions": self.acquisitions,
+            "contended": self.contended,
+            "total_wait_ms": self.total_wait * 1000,
+            "avg_wait_ms": self.total_wait * 1000 / self.contended if self.contended else 0.0,
+            "max_wait_ms": self.max_wait * 1000,
+            "active_keys": len(self._locks),
+        }
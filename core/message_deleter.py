@@ -0,0 +1,192 @@
+"""
+消息自动删除
+
+待删除消息放在哈希时间轮中，每个tick只检查一个槽；同时保存到数据库，重启后继续删除。
+到期的消息按频道合并，能批量删除时一次请求删除最多100条，请求之间按固定间隔排队发送。
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+import discord
+
+from config import Config
+from core.tasks import TaskSupervisor
+from data.database import Database
+from utils.helpers import now_ms
+
+if TYPE_CHECKING:
+    from bot import GameCenterBot
+
+logger = logging.getLogger(__name__)
+
+# 批量删除接口的单次上限
+BULK_DELETE_LIMIT = 100
+# 批量删除只接受14天内的消息（留出余量）
+BULK_DELETE_MAX_AGE = timedelta(days=13, hours=23)
+
+
+class TimerWheel:
+    """哈希时间轮
+
+    到期tick为 t 的条目放在第 t % slots 个槽里，时间推进一格只检查一个槽，
+    超过一圈的条目留在槽中等下一圈。条目为 (到期tick, 频道ID, 消息ID) 元组。
+    """
+
+    def __init__(self, slots: int, tick_ms: int):
+        """
+        Args:
+            slots: 槽数量
+            tick_ms: 每格时长（毫秒）
+        """
+        self.tick_ms = tick_ms
+        self._slots: List[List[Tuple[int, int, int]]] = [[] for _ in range(slots)]
+        self._current = now_ms() // tick_ms
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, due_ms: int, channel_id: int, message_id: int) -> None:
+        """加入条目（已过期的在下一格触发）"""
+        due_tick = max(-(-due_ms // self.tick_ms), self._current + 1)
+        self._slots[due_tick % len(self._slots)].append((due_tick, channel_id, message_id))
+        self._size += 1
+
+    def advance(self, now: int) -> List[Tuple[int, int]]:
+        """推进到当前时间，返回到期的 (频道ID, 消息ID)"""
+        due: List[Tuple[int, int]] = []
+        target = now // self.tick_ms
+        while self._current < target:
+            self._current += 1
+            index = self._current % len(self._slots)
+            slot = self._slots[index]
+            if not slot:
+                continue
+            remaining = []
+            for entry in slot:
+                if entry[0] <= self._current:
+                    due.append((entry[1], entry[2]))
+                else:
+                    remaining.append(entry)
+            self._slots[index] = remaining
+        self._size -= len(due)
+        return due
+
+
+class MessageDeleter:
+    """消息自动删除服务"""
+
+    def __init__(self, bot: 'GameCenterBot', database: Database, tasks: TaskSupervisor,
+                 tick: float = Config.MESSAGE_DELETE_TICK,
+                 slots: int = Config.MESSAGE_DELETE_WHEEL_SLOTS,
+                 interval: float = Config.MESSAGE_DELETE_INTERVAL):
+        """
+        Args:
+            bot: Bot实例
+            database: 数据库
+            tasks: 后台任务管理器（执行删除请求）
+            tick: 时间轮每格时长（秒），由调度器按此间隔调用 tick()
+            slots: 时间轮槽数量
+            interval: 两次删除请求之间的间隔（秒）
+        """
+        self.bot = bot
+        self.db = database
+        self.tasks = tasks
+        self.tick_interval = tick
+        self.interval = interval
+        self.wheel = TimerWheel(slots, int(tick * 1000))
+        self._unsaved: List[Tuple[int, int, int]] = []   # 尚未写入数据库的新条目
+        self._due: Dict[int, List[int]] = defaultdict(list)  # 频道ID -> 到期的消息ID
+        self._draining = False
+        # 统计
+        self.deleted = 0         # 已删除（或已不存在）的消息数
+        self.failed = 0          # 删除失败的消息数
+        self.requests = 0        # 发出的删除请求数
+
+    async def load(self) -> None:
+        """从数据库恢复待删除消息（停机期间到期的在第一个tick删除）"""
+        for channel_id, message_id, delete_at in await self.db.get_pending_deletions():
+            self.wheel.add(delete_at, channel_id, message_id)
+
+    def schedule(self, message: discord.Message, delay: float) -> None:
+        """计划在 delay 秒后删除消息"""
+        delete_at = now_ms() + int(delay * 1000)
+        self.wheel.add(delete_at, message.channel.id, message.id)
+        self._unsaved.append((message.channel.id, message.id, delete_at))
+
+    async def _save(self) -> None:
+        """把新条目写入数据库（每个tick合并为一次写入）"""
+        if self._unsaved:
+            rows, self._unsaved = self._unsaved, []
+            await self.db.add_pending_deletions(rows, wait=False)
+
+    async def tick(self) -> None:
+        """时间轮推进一格（由调度器定时调用）"""
+        await self._save()
+        for channel_id, message_id in self.wheel.advance(now_ms()):
+            self._due[channel_id].append(message_id)
+        if self._due and not self._draining:
+            self._draining = True
+            if not self.tasks.spawn(self._drain):
+                self._draining = False
+
+    async def _drain(self) -> None:
+        """按频道依次删除到期消息，请求之间保持间隔"""
+        try:
+            while self._due:
+                channel_id, message_ids = self._due.popitem()
+                for start in range(0, len(message_ids), BULK_DELETE_LIMIT):
+                    chunk = message_ids[start:start + BULK_DELETE_LIMIT]
+                    await self._delete_chunk(channel_id, chunk)
+                    await self.db.remove_pending_deletions(
+                        [(channel_id, message_id) for message_id in chunk], wait=False
+                    )
+        finally:
+            self._draining = False
+
+    async def _delete_chunk(self, channel_id: int, message_ids: List[int]) -> None:
+        """删除同一频道的一组消息：优先批量删除，没有权限或不支持时逐条删除"""
+        channel = self.bot.get_channel(channel_id)
+        oldest_allowed = discord.utils.utcnow() - BULK_DELETE_MAX_AGE
+        if (len(message_ids) > 1 and hasattr(channel, "delete_messages")
+                and all(discord.utils.snowflake_time(m) > oldest_allowed for m in message_ids)):
+            self.requests += 1
+            try:
+                await channel.delete_messages([discord.Object(id=m) for m in message_ids])
+                self.deleted += len(message_ids)
+                return
+            except discord.HTTPException:
+                pass  # 批量删除需要管理消息权限，失败时逐条删除
+            finally:
+                await asyncio.sleep(self.interval)
+
+        messageable = self.bot.get_partial_messageable(channel_id)
+        for message_id in message_ids:
+            self.requests += 1
+            try:
+                await messageable.get_partial_message(message_id).delete()
+                self.deleted += 1
+            except discord.NotFound:
+                self.deleted += 1  # 消息已被删除
+            except discord.HTTPException as e:
+                self.failed += 1
+                logger.debug(f"删除消息 {message_id} 失败: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def close(self) -> None:
+        """保存尚未写入的条目（未删除的消息在下次启动后继续删除）"""
+        if self._unsaved:
+            rows, self._unsaved = self._unsaved, []
+            await self.db.add_pending_deletions(rows)
+
+    def get_metrics(self) -> Dict[str, int]:
+        """删除统计"""
+        return {
+            "pending": len(self.wheel),
+            "deleted": self.deleted,
+            "failed": self.failed,
+            "requests": self.requests,
+        }
@@ -1,16 +1,142 @@
 """
 玩家数据管理
 """
-from typing import Optional
-from data.database import Database
-from data.models import PlayerData, PlayerStats
+from collections import OrderedDict
+from dataclasses import replace
+from typing import Awaitable, Callable, Dict, Optional, Union
+from data.database import Database, DatabaseListener
+from data.models import PlayerData, PlayerStats, StatsDelta
+
+
+class PlayerCache(DatabaseListener):
+    """活跃玩家的 PlayerData / PlayerStats 读穿透缓存（LRU）
+    
+    通过数据库变更通知保持一致：余额和统计在提交后直接更新缓存，
+    其他变更使对应条目失效。读取接口与 Database 相同，返回副本，
+    调用方修改返回值不会影响缓存。
+    """
+    
+    def __init__(self, database: Database, max_size: int = 1024):
+        """
+        Args:
+            database: 数据库
+            max_size: 每类数据最多缓存的玩家数
+        """
+        self.db = database
+        self.max_size = max_size
+        self._players: "OrderedDict[int, PlayerData]" = OrderedDict()
+        self._stats: "OrderedDict[int, PlayerStats]" = OrderedDict()
+        # 全局变更计数；只为正在读库的玩家记录最近一次变更时的计数，
+        # 读库期间发生了提交则不把读到的旧值放入缓存（读完即清除，不随玩家数增长）
+        self._version = 0
+        self._reading: Dict[int, int] = {}   # 玩家ID -> 进行中的读库次数
+        self._changed: Dict[int, int] = {}   # 玩家ID -> 读库期间最近一次变更的计数
+        self.hits = 0
+        self.misses = 0
+        database.add_listener(self)
+    
+    def _lookup(self, cache: OrderedDict, user_id: int):
+        """查询缓存并更新LRU顺序"""
+        value = cache.get(user_id)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        cache.move_to_end(user_id)
+        return replace(value)
+    
+    async def _read_through(self, cache: OrderedDict, user_id: int,
+                            load: Callable[[int], Awaitable[Optional[Union[PlayerData, PlayerStats]]]]):
+        """读库并写入缓存（读库期间该玩家有提交则不写入）"""
+        self._reading[user_id] = self._reading.get(user_id, 0) + 1
+        started = self._version
+        try:
+            value = await load(user_id)
+            if value is not None and self._changed.get(user_id, 0) <= started:
+                cache[user_id] = replace(value)
+                cache.move_to_end(user_id)
+                while len(cache) > self.max_size:
+                    cache.popitem(last=False)
+            return value
+        finally:
+            remaining = self._reading.pop(user_id) - 1
+            if remaining:
+                self._reading[user_id] = remaining
+            else:
+                self._changed.pop(user_id, None)
+    
+    def _bump(self, user_id: int) -> None:
+        self._version += 1
+        if user_id in self._reading:
+            self._changed[user_id] = self._version
+    
+    async def get_player(self, user_id: int) -> Optional[PlayerData]:
+        """获取玩家数据，不存在返回None（不缓存）"""
+        player = self._lookup(self._players, user_id)
+        if player is not None:
+            return player
+        
+        return await self._read_through(self._players, user_id, self.db.get_player)
+    
+    async def get_or_create_player(self, user_id: int, initial_chips: int = 0) -> PlayerData:
+        """获取或创建玩家"""
+        player = await self.get_player(user_id)
+        if player is None:
+            player = await self.db.create_player(user_id, initial_chips)
+        return player
+    
+    async def get_player_stats(self, user_id: int) -> PlayerStats:
+        """获取玩家统计"""
+        stats = self._lookup(self._stats, user_id)
+        if stats is not None:
+            return stats
+        
+        return await self._read_through(self._stats, user_id, self.db.get_player_stats)
+    
+    def invalidate(self, user_id: int) -> None:
+        """使玩家的缓存失效"""
+        self._bump(user_id)
+        self._players.pop(user_id, None)
+        self._stats.pop(user_id, None)
+    
+    def get_metrics(self) -> Dict[str, float]:
+        """缓存命中统计"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "players": len(self._players),
+            "stats": len(self._stats),
+        }
+    
+    # ==================== 数据库变更通知 ====================
+    
+    def on_chips_changed(self, user_id: int, chips: int) -> None:
+        self._bump(user_id)
+        player = self._players.get(user_id)
+        if player is not None:
+            player.chips = chips
+    
+    def on_player_changed(self, user_id: int) -> None:
+        self._bump(user_id)
+        self._players.pop(user_id, None)
+    
+    def on_stats_changed(self, user_id: int, stats: Optional[PlayerStats]) -> None:
+        self._bump(user_id)
+        if stats is None:
+            self._stats.pop(user_id, None)
+        elif user_id in self._stats:
+            self._stats[user_id] = replace(stats)
 
 
 class PlayerDataManager:
     """玩家数据管理器"""
     
-    def __init__(self, database: Database):
+    def __init__(self, database: Database, cache: Optional[PlayerCache] = None):
         self.db = database
+        # 读取入口：有缓存时走缓存（接口与Database一致）
+        self.reader = cache if cache is not None else database
     
     async def get_player(self, user_id: int) -> Optional[PlayerData]:
         """获取玩家数据
@@ -21,7 +147,7 @@ class PlayerDataManager:
         Returns:
             玩家数据，不存在返回None
         """
-        return await self.db.get_player(user_id)
+        return await self.reader.get_player(user_id)
     
     async def get_or_create_player(self, user_id: int, initial_chips: int = 0) -> PlayerData:
         """获取或创建玩家
@@ -33,7 +159,7 @@ class PlayerDataManager:
         Returns:
             玩家数据
         """
-        return await self.db.get_or_create_player(user_id, initial_chips)
+        return await self.reader.get_or_create_player(user_id, initial_chips)
     
     async def get_stats(self, user_id: int) -> PlayerStats:
         """获取玩家统计
@@ -44,7 +170,7 @@ class PlayerDataManager:
         Returns:
             玩家统计数据
         """
-        return await self.db.get_player_stats(user_id)
+        return await self.reader.get_player_stats(user_id)
     
     async def update_stats(self, stats: PlayerStats) -> None:
         """更新玩家统计
@@ -64,23 +190,17 @@ class PlayerDataManager:
             earnings: 获得的筹码
             total_rounds: 总轮数（用于PvE记录最高轮数）
         """
-        stats = await self.db.get_player_stats(user_id)
-        stats.games_played += 1
-        stats.games_won += 1
+        delta = StatsDelta(user_id=user_id, games_played=1, games_won=1)
         
         if mode == "pvp":
-            stats.pvp_wins += 1
-            stats.pvp_total_earnings += earnings
+            delta.pvp_wins = 1
+            delta.pvp_total_earnings = earnings
         elif mode == "pve":
-            stats.pve_total_earnings += earnings
-            # 更新最高轮数
-            if total_rounds > stats.pve_best_rounds:
-                stats.pve_best_rounds = total_rounds
-            # 更新最大单局奖励
-            if earnings > stats.pve_best_reward:
-                stats.pve_best_reward = earnings
+            delta.pve_total_earnings = earnings
+            delta.pve_best_rounds = total_rounds
+            delta.pve_best_reward = earnings
         
-        await self.db.update_player_stats(stats)
+        await self.db.apply_stats_deltas([delta])
     
     async def record_game_loss(self, user_id: int, mode: str) -> None:
         """记录游戏失败
@@ -89,13 +209,12 @@ class PlayerDataManager:
             user_id: 用户ID
             mode: 游戏模式
         """
-        stats = await self.db.get_player_stats(user_id)
-        stats.games_played += 1
+        delta = StatsDelta(user_id=user_id, games_played=1)
         
         if mode == "pvp":
-            stats.pvp_losses += 1
+            delta.pvp_losses = 1
         
-        await self.db.update_player_stats(stats)
+        await self.db.apply_stats_deltas([delta])
     
     async def update_pve_best_stage(self, user_id: int, stage: int) -> None:
         """更新PvE最佳阶段
@@ -104,7 +223,4 @@ class PlayerDataManager:
             user_id: 用户ID
             stage: 达到的阶段
         """
-        stats = await self.db.get_player_stats(user_id)
-        if stage > stats.pve_best_stage:
-            stats.pve_best_stage = stage
-            await self.db.update_player_stats(stats)
\ No newline at end of file
+        await self.db.apply_stats_deltas([StatsDelta(user_id=user_id, pve_best_stage=stage)])
@@ -0,0 +1,153 @@
+"""
+定时任务调度
+
+所有定时任务放在一个最小堆里，由单个后台任务按到期时间依次执行，
+代替分散的 asyncio.create_task(sleep...) 和多个 tasks.loop。
+任务在调度协程内直接执行，应保持简短。
+"""
+import asyncio
+import heapq
+import inspect
+import itertools
+import logging
+from typing import Any, Callable, List, Optional, Tuple
+
+from utils.helpers import local_day_bounds, now_ms
+
+logger = logging.getLogger(__name__)
+
+
+class ScheduledJob:
+    """已调度的任务"""
+
+    def __init__(self, when: int, callback: Callable[..., Any], args: tuple, name: str,
+                 next_run: Optional[Callable[[int], int]] = None):
+        """
+        Args:
+            when: 到期时间（毫秒时间戳）
+            callback: 回调（普通函数或协程函数）
+            args: 回调参数
+            name: 任务名称（用于日志）
+            next_run: 周期任务根据本次执行完成的时间计算下次到期时间，None表示一次性任务
+        """
+        self.when = when
+        self.callback = callback
+        self.args = args
+        self.name = name
+        self.next_run = next_run
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        """取消任务（留在堆中，到期时跳过）"""
+        self.cancelled = True
+
+
+class Scheduler:
+    """基于最小堆的定时任务调度器"""
+
+    def __init__(self):
+        self._heap: List[Tuple[int, int, ScheduledJob]] = []
+        self._counter = itertools.count()  # 到期时间相同时按加入顺序执行
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.executed = 0   # 已执行任务数
+        self.failed = 0     # 执行出错的任务数
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    # ==================== 调度 ====================
+
+    def _push(self, job: ScheduledJob) -> None:
+        heapq.heappush(self._heap, (job.when, next(self._counter), job))
+        # 新任务比当前等待的更早时唤醒调度协程
+        if self._heap[0][2] is job:
+            self._wakeup.set()
+
+    def call_at(self, when: int, callback: Callable[..., Any], *args: Any,
+                name: str = "") -> ScheduledJob:
+        """在指定时间（毫秒时间戳）执行一次"""
+        job = ScheduledJob(when, callback, args, name or getattr(callback, "__name__", "job"))
+        self._push(job)
+        return job
+
+    def call_later(self, delay: float, callback: Callable[..., Any], *args: Any,
+                   name: str = "") -> ScheduledJob:
+        """延迟指定秒数后执行一次"""
+        return self.call_at(now_ms() + int(delay * 1000), callback, *args, name=name)
+
+    def every(self, interval: float, callback: Callable[..., Any], *args: Any,
+              name: str = "", delay: Optional[float] = None) -> ScheduledJob:
+        """每隔 interval 秒执行一次
+
+        Args:
+            delay: 首次执行前的等待时间（秒），默认等于 interval
+        """
+        interval_ms = int(interval * 1000)
+        first_delay_ms = interval_ms if delay is None else int(delay * 1000)
+        job = ScheduledJob(
+            now_ms() + first_delay_ms, callback, args,
+            name or getattr(callback, "__name__", "job"),
+            next_run=lambda finished: finished + interval_ms
+        )
+        self._push(job)
+        return job
+
+    def daily(self, callback: Callable[..., Any], *args: Any, name: str = "") -> ScheduledJob:
+        """每天本地0点执行"""
+        job = ScheduledJob(
+            local_day_bounds()[1], callback, args,
+            name or getattr(callback, "__name__", "job"),
+            next_run=lambda finished: local_day_bounds(finished)[1]
+        )
+        self._push(job)
+        return job
+
+    # ==================== 运行 ====================
+
+    def start(self) -> None:
+        """启动调度协程"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """停止调度协程（未到期的任务不再执行）"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _execute(self, job: ScheduledJob) -> None:
+        """执行任务，异常只记录日志"""
+        try:
+            result = job.callback(*job.args)
+            if inspect.isawaitable(result):
+                await result
+            self.executed += 1
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"定时任务 {job.name} 执行失败: {e}", exc_info=e)
+
+    async def _run(self) -> None:
+        """调度协程：执行所有到期任务，然后睡到下一个任务到期或有新任务加入"""
+        while True:
+            self._wakeup.clear()
+            # 以墙上时间判断到期，提前醒来时不会提前执行
+            while self._heap and self._heap[0][0] <= now_ms():
+                _, _, job = heapq.heappop(self._heap)
+                if job.cancelled:
+                    continue
+                await self._execute(job)
+                if job.next_run is not None and not job.cancelled:
+                    job.when = job.next_run(now_ms())
+                    self._push(job)
+
+            timeout = (self._heap[0][0] - now_ms()) / 1000 if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,111 @@
+"""
+后台任务管理
+
+代替零散的 asyncio.create_task：任务由管理器持有强引用（不会在执行中被回收），
+同时运行的数量有上限，超出的排队等待；关闭时等待收尾或统一取消，并统计失败数。
+"""
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+TaskFactory = Callable[..., Awaitable[Any]]
+
+
+class TaskSupervisor:
+    """后台任务管理器"""
+
+    def __init__(self, max_concurrency: int = 16):
+        """
+        Args:
+            max_concurrency: 同时运行的最大任务数
+        """
+        self.max_concurrency = max_concurrency
+        self._running: Set[asyncio.Task] = set()
+        # 等待运行的任务：到轮到时才创建协程，排队期间不占用协程对象
+        self._queued: Deque[Tuple[TaskFactory, tuple, str]] = deque()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._closed = False
+        # 统计
+        self.spawned = 0      # 提交的任务数
+        self.completed = 0    # 正常完成数
+        self.failed = 0       # 抛出异常数
+        self.cancelled = 0    # 被取消或关闭时丢弃的任务数
+
+    @property
+    def pending(self) -> int:
+        """未完成的任务数（运行中 + 排队中）"""
+        return len(self._running) + len(self._queued)
+
+    def spawn(self, func: TaskFactory, *args: Any, name: str = "") -> bool:
+        """提交后台任务（不等待完成）
+
+        Args:
+            func: 协程函数
+            args: 参数
+            name: 任务名称（用于日志）
+
+        Returns:
+            是否已提交（关闭后返回False）
+        """
+        if self._closed:
+            return False
+        self.spawned += 1
+        self._queued.append((func, args, name or getattr(func, "__name__", "task")))
+        self._idle.clear()
+        self._start_queued()
+        return True
+
+    def _start_queued(self) -> None:
+        """在并发上限内启动排队的任务"""
+        while self._queued and len(self._running) < self.max_concurrency:
+            func, args, name = self._queued.popleft()
+            task = asyncio.create_task(func(*args), name=name)
+            self._running.add(task)
+            task.add_done_callback(self._on_done)
+
+    def _on_done(self, task: asyncio.Task) -> None:
+        self._running.discard(task)
+        if task.cancelled():
+            self.cancelled += 1
+        elif task.exception() is not None:
+            self.failed += 1
+            logger.error(f"后台任务 {task.get_name()} 执行失败: {task.exception()}",
+                         exc_info=task.exception())
+        else:
+            self.completed += 1
+        self._start_queued()
+        if not self._running and not self._queued:
+            self._idle.set()
+
+    async def close(self, timeout: float = 5.0) -> None:
+        """停止接收新任务，等待现有任务完成，超时后取消剩余任务
+
+        Args:
+            timeout: 最长等待时间（秒）
+        """
+        self._closed = True
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            self.cancelled += len(self._queued)
+            self._queued.clear()
+            tasks = list(self._running)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            logger.warning(f"关闭时取消了 {len(tasks)} 个未完成的后台任务")
+
+    def get_metrics(self) -> Dict[str, int]:
+        """任务统计"""
+        return {
+            "spawned": self.spawned,
+            "running": len(self._running),
+            "queued": len(self._queued),
+            "completed": self.completed,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+        }
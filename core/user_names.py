@@ -0,0 +1,165 @@
+"""
+用户名称解析
+
+按 内存缓存 → 网关用户缓存 → 本地 user_names 表 → Discord REST 的顺序查找，
+REST 请求并发执行并限制并发数，新的或有变化的名称在后台写回数据库，重启后仍可使用。
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, Iterable, Optional, Tuple
+
+import discord
+
+from config import Config
+from core.tasks import TaskSupervisor
+from data.database import Database
+from utils.helpers import now_ms
+
+if TYPE_CHECKING:
+    from bot import GameCenterBot
+
+logger = logging.getLogger(__name__)
+
+
+class UserNameResolver:
+    """用户显示名称解析器（TTL + LRU 缓存）"""
+
+    def __init__(self, bot: 'GameCenterBot', database: Database,
+                 tasks: Optional[TaskSupervisor] = None,
+                 ttl: float = Config.USER_NAME_CACHE_TTL,
+                 max_size: int = Config.USER_NAME_CACHE_SIZE,
+                 concurrency: int = Config.USER_NAME_FETCH_CONCURRENCY,
+                 stored_ttl: float = Config.USER_NAME_STORED_TTL):
+        """
+        Args:
+            bot: Bot实例
+            database: 数据库
+            tasks: 后台任务管理器（写回数据库），None则在解析时直接写入
+            ttl: 内存缓存有效期（秒）
+            max_size: 内存缓存最大条目数
+            concurrency: REST请求最大并发数
+            stored_ttl: 数据库中名称的有效期（秒），过期后重新向Discord请求
+        """
+        self.bot = bot
+        self.db = database
+        self.tasks = tasks
+        self.ttl = ttl
+        self.max_size = max_size
+        self.stored_ttl = stored_ttl
+        self._semaphore = asyncio.Semaphore(concurrency)
+        # user_id -> (名称, 过期时间)
+        self._cache: "OrderedDict[int, Tuple[str, float]]" = OrderedDict()
+
+    def _get_cached(self, user_id: int) -> Optional[str]:
+        """读取内存缓存"""
+        entry = self._cache.get(user_id)
+        if entry is None:
+            return None
+        name, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._cache[user_id]
+            return None
+        self._cache.move_to_end(user_id)
+        return name
+
+    def _put_cached(self, user_id: int, name: str) -> None:
+        """写入内存缓存，超出容量时淘汰最久未使用的条目"""
+        self._cache[user_id] = (name, time.monotonic() + self.ttl)
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    def purge_expired(self) -> int:
+        """清理已过期的内存缓存条目
+
+        Returns:
+            清理的条目数
+        """
+        now = time.monotonic()
+        expired = [user_id for user_id, (_, expires_at) in self._cache.items() if expires_at < now]
+        for user_id in expired:
+            del self._cache[user_id]
+        return len(expired)
+
+    async def _fetch(self, user_id: int) -> Optional[str]:
+        """通过REST获取用户名称，失败返回None"""
+        async with self._semaphore:
+            try:
+                user = await self.bot.fetch_user(user_id)
+            except discord.HTTPException:
+                return None
+        return user.display_name
+
+    async def _save(self, names: Dict[int, str]) -> None:
+        """写回数据库（失败只记录日志）"""
+        try:
+            await self.db.save_user_names(names, wait=False)
+        except Exception as e:
+            logger.warning(f"保存用户名称失败: {e}")
+
+    async def resolve_many(self, user_ids: Iterable[int]) -> Dict[int, str]:
+        """批量解析用户名称
+
+        Args:
+            user_ids: 用户ID列表
+
+        Returns:
+            {用户ID: 名称}，无法解析的用户不在结果中
+        """
+        names: Dict[int, str] = {}
+        gateway: Dict[int, str] = {}  # 网关缓存中找到的名称
+        fresh: Dict[int, str] = {}    # 需要写回数据库的名称
+        misses = []
+
+        for user_id in dict.fromkeys(user_ids):
+            name = self._get_cached(user_id)
+            if name is None:
+                user = self.bot.get_user(user_id)
+                if user is not None:
+                    name = gateway[user_id] = user.display_name
+            if name is None:
+                misses.append(user_id)
+            else:
+                names[user_id] = name
+
+        lookup = misses + list(gateway)
+        stored = await self.db.get_user_names(lookup) if lookup else {}
+        stale_before = now_ms() - int(self.stored_ttl * 1000)
+
+        # 网关中的名称只有在数据库中没有、不同或已过期时才写回
+        for user_id, name in gateway.items():
+            entry = stored.get(user_id)
+            if entry is None or entry[0] != name or entry[1] < stale_before:
+                fresh[user_id] = name
+
+        to_fetch = []
+        for user_id in misses:
+            entry = stored.get(user_id)
+            if entry is not None and entry[1] >= stale_before:
+                names[user_id] = entry[0]
+            else:
+                to_fetch.append(user_id)
+
+        if to_fetch:
+            results = await asyncio.gather(*(self._fetch(user_id) for user_id in to_fetch))
+            for user_id, name in zip(to_fetch, results):
+                if name is not None:
+                    names[user_id] = fresh[user_id] = name
+                elif user_id in stored:
+                    # 请求失败时使用过期的名称
+                    names[user_id] = stored[user_id][0]
+
+        for user_id, name in names.items():
+            self._put_cached(user_id, name)
+
+        # 写回不阻塞解析（写队列关闭时写入仍是一次同步事务）
+        if fresh and (self.tasks is None or not self.tasks.spawn(self._save, fresh, name="save_user_names")):
+            await self._save(fresh)
+
+        return names
+
+    async def resolve(self, user_id: int, default: Optional[str] = None) -> Optional[str]:
+        """解析单个用户名称"""
+        return (await self.resolve_many([user_id])).get(user_id, default)
@@ -1,5 +1,5 @@
 """
 数据存储模块
 """
-from .database import Database
-from .models import PlayerData, PlayerStats, GameRecord, TransferRecord
\ No newline at end of file
+from .database import Database, DatabaseListener, InsufficientChips
+from .models import PlayerData, PlayerStats, StatsDelta, GameRecord, TransferRecord, LedgerEntry, GrantFilter
\ No newline at end of file
@@ -2,18 +2,93 @@
 数据库连接和操作
 """
 import aiosqlite
+import asyncio
+import logging
 import os
-from datetime import datetime
-from typing import Optional, List
-from .models import PlayerData, PlayerStats, TransferRecord, GameRecord
+from contextlib import asynccontextmanager
+from enum import Enum
+from pathlib import Path
+from typing import Optional, Dict, List, AsyncIterator, Awaitable, Callable, Tuple, TypeVar
+from utils.helpers import MS_PER_DAY, now_ms
+from .models import PlayerData, PlayerStats, StatsDelta, TransferRecord, GameRecord, LedgerEntry, GrantFilter
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+# 写操作：接收写连接，在调用方的事务内执行
+WriteOp = Callable[[aiosqlite.Connection], Awaitable[T]]
+
+# SQLite 最大 rowid，用作游标分页的初始上界
+MAX_ROWID = 2 ** 63 - 1
+
+
+class InsufficientChips(Exception):
+    """余额不足（事务内抛出以回滚整个操作）"""
+
+
+class IdempotencyKeyConflict(Exception):
+    """幂等键已被其他用户的操作使用（键构造有误，不能当作重复调用）"""
+
+
+class DeductResult(Enum):
+    """批量扣除结果"""
+    DEDUCTED = "deducted"          # 本次扣除成功
+    INSUFFICIENT = "insufficient"  # 余额不足，全部未扣
+    REPLAYED = "replayed"          # 幂等键已使用过，本次没有扣除
+
+
+class DatabaseListener:
+    """数据变更监听器（事务提交后回调，子类按需覆盖）"""
+    
+    def on_chips_changed(self, user_id: int, chips: int) -> None:
+        """玩家余额变为 chips"""
+    
+    def on_player_changed(self, user_id: int) -> None:
+        """玩家数据（余额以外的字段）发生变化"""
+    
+    def on_stats_changed(self, user_id: int, stats: Optional[PlayerStats]) -> None:
+        """玩家统计发生变化，stats为None表示只更新了部分字段"""
 
 
 class Database:
     """数据库管理类"""
     
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, wal: bool = False, readers: int = 0,
+                 cache_size_kb: int = 8192, mmap_size: int = 0,
+                 write_queue: bool = False, flush_interval: float = 0.005,
+                 flush_max_ops: int = 128):
+        """
+        Args:
+            db_path: 数据库文件路径
+            wal: 是否启用WAL模式（读写互不阻塞）
+            readers: 只读连接数量（仅WAL模式生效，0表示读写共用写连接）
+            cache_size_kb: 每个连接的页缓存大小（KB）
+            mmap_size: 内存映射大小（字节，0为关闭）
+            write_queue: 是否启用合并提交写队列
+            flush_interval: 写队列最长攒批时间（秒）
+            flush_max_ops: 写队列单批最大操作数
+        """
         self.db_path = db_path
+        self.wal = wal
+        self.reader_count = readers if wal else 0
+        self.cache_size_kb = cache_size_kb
+        self.mmap_size = mmap_size
         self._connection: Optional[aiosqlite.Connection] = None
+        # 写事务锁：所有协程共享同一连接，事务期间必须独占
+        self._write_lock = asyncio.Lock()
+        # 只读连接池
+        self._readers: List[aiosqlite.Connection] = []
+        self._reader_pool: Optional[asyncio.Queue] = None
+        # 合并提交写队列
+        self.write_queue_enabled = write_queue
+        self.flush_interval = flush_interval
+        self.flush_max_ops = flush_max_ops
+        self._write_queue: Optional[asyncio.Queue] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self.commit_count = 0             # 已提交事务数（用于监控/基准测试）
+        # 变更监听器，以及当前事务中待通知的事件
+        self._listeners: List[DatabaseListener] = []
+        self._pending_events: List[Tuple[str, tuple]] = []
     
     async def connect(self) -> None:
         """连接数据库"""
@@ -22,90 +97,225 @@ class Database:
         
         self._connection = await aiosqlite.connect(self.db_path)
         self._connection.row_factory = aiosqlite.Row
-        await self._create_tables()
+        await self._configure_connection(self._connection)
+        if self.wal:
+            await self._connection.execute("PRAGMA journal_mode=WAL")
+            await self._connection.execute("PRAGMA synchronous=NORMAL")
+        await self._migrate()
+        
+        # 只读连接在迁移之后打开（只读连接无法创建WAL文件）
+        if self.reader_count > 0:
+            self._reader_pool = asyncio.Queue()
+            uri = Path(self.db_path).resolve().as_uri() + "?mode=ro"
+            for _ in range(self.reader_count):
+                reader = await aiosqlite.connect(uri, uri=True)
+                reader.row_factory = aiosqlite.Row
+                await self._configure_connection(reader)
+                await reader.execute("PRAGMA query_only=ON")
+                self._readers.append(reader)
+                self._reader_pool.put_nowait(reader)
+        
+        if self.write_queue_enabled:
+            self._write_queue = asyncio.Queue()
+            self._flush_task = asyncio.create_task(self._flush_loop())
+    
+    async def _configure_connection(self, conn: aiosqlite.Connection) -> None:
+        """设置连接级PRAGMA"""
+        await conn.execute("PRAGMA busy_timeout=5000")
+        await conn.execute(f"PRAGMA cache_size=-{int(self.cache_size_kb)}")
+        if self.mmap_size > 0:
+            await conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
     
     async def close(self) -> None:
         """关闭数据库连接"""
+        # 先把写队列中剩余的操作提交
+        if self._flush_task is not None:
+            await self.flush()
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+            self._write_queue = None
+        
+        for reader in self._readers:
+            await reader.close()
+        self._readers.clear()
+        self._reader_pool = None
+        
         if self._connection:
             await self._connection.close()
             self._connection = None
     
-    async def _create_tables(self) -> None:
-        """创建数据表"""
-        async with self._connection.cursor() as cursor:
-            # 玩家数据表
-            await cursor.execute("""
-                CREATE TABLE IF NOT EXISTS players (
-                    user_id INTEGER PRIMARY KEY,
-                    chips INTEGER DEFAULT 0,
-                    last_daily TEXT,
-                    created_at TEXT DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # 玩家统计表
-            await cursor.execute("""
-                CREATE TABLE IF NOT EXISTS player_stats (
-                    user_id INTEGER PRIMARY KEY,
-                    games_played INTEGER DEFAULT 0,
-                    games_won INTEGER DEFAULT 0,
-                    pve_best_stage INTEGER DEFAULT 0,
-                    pve_total_earnings INTEGER DEFAULT 0,
-                    pve_best_rounds INTEGER DEFAULT 0,
-                    pve_best_reward INTEGER DEFAULT 0,
-                    pvp_wins INTEGER DEFAULT 0,
-                    pvp_losses INTEGER DEFAULT 0,
-                    pvp_total_earnings INTEGER DEFAULT 0,
-                    total_chips_earned INTEGER DEFAULT 0,
-                    total_chips_spent INTEGER DEFAULT 0
-                )
-            """)
-            
-            # 添加新列（如果不存在）- 用于数据库升级
-            try:
-                await cursor.execute("ALTER TABLE player_stats ADD COLUMN pve_best_rounds INTEGER DEFAULT 0")
-            except:
-                pass  # 列已存在
+    @asynccontextmanager
+    async def _reader(self) -> AsyncIterator[aiosqlite.Connection]:
+        """借出一个只读连接（未配置只读连接时使用写连接）
+        
+        读连接不会排在写连接的执行线程后面，适合排行榜、历史记录等查询。
+        """
+        if self._reader_pool is None:
+            yield self._connection
+            return
+        
+        conn = await self._reader_pool.get()
+        try:
+            yield conn
+        finally:
+            self._reader_pool.put_nowait(conn)
+    
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[aiosqlite.Connection]:
+        """写事务（BEGIN IMMEDIATE）
+        
+        进入时立即获取写锁，正常退出提交，异常时回滚。
+        同一连接上的所有写操作都必须经过这里，避免事务交错。
+        """
+        async with self._write_lock:
+            await self._connection.execute("BEGIN IMMEDIATE")
             try:
-                await cursor.execute("ALTER TABLE player_stats ADD COLUMN pve_best_reward INTEGER DEFAULT 0")
-            except:
-                pass  # 列已存在
+                yield self._connection
+            except BaseException:
+                self._pending_events.clear()
+                await self._connection.rollback()
+                raise
+            else:
+                await self._connection.commit()
+                self.commit_count += 1
+                self._dispatch_events()
+    
+    # ==================== 变更通知 ====================
+    
+    def add_listener(self, listener: DatabaseListener) -> None:
+        """注册数据变更监听器"""
+        self._listeners.append(listener)
+    
+    def remove_listener(self, listener: DatabaseListener) -> None:
+        """移除数据变更监听器"""
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+    
+    def _emit(self, event: str, *args) -> None:
+        """记录变更事件（事务内调用），提交成功后才通知监听器"""
+        if self._listeners:
+            self._pending_events.append((event, args))
+    
+    def _dispatch_events(self) -> None:
+        """通知监听器本次提交的变更"""
+        events, self._pending_events = self._pending_events, []
+        for event, args in events:
+            for listener in self._listeners:
+                try:
+                    getattr(listener, event)(*args)
+                except Exception as e:
+                    logger.error(f"数据变更监听器出错 ({event}): {e}")
+    
+    # ==================== 写队列（合并提交） ====================
+    
+    async def _write(self, op: WriteOp, wait: bool = True):
+        """执行一个写操作
+        
+        未启用写队列时，操作在独立事务中立即执行。
+        启用写队列时，操作进入队列，由后台任务与其他协程的写操作合并为
+        一个事务提交；每个操作包在SAVEPOINT中，失败只回滚自身。
+        
+        Args:
+            op: 写操作
+            wait: 是否等待提交完成
             
-            # 转账记录表
-            await cursor.execute("""
-                CREATE TABLE IF NOT EXISTS transfers (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    from_user_id INTEGER,
-                    to_user_id INTEGER,
-                    amount INTEGER,
-                    created_at TEXT DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
+        Returns:
+            wait为True时返回操作结果；否则返回提交完成时结束的Future
+        """
+        if self._write_queue is None:
+            async with self.transaction() as conn:
+                return await op(conn)
+        
+        future = asyncio.get_running_loop().create_future()
+        self._write_queue.put_nowait((op, future))
+        if wait:
+            return await future
+        future.add_done_callback(self._log_write_error)
+        return future
+    
+    async def flush(self) -> None:
+        """等待写队列中已提交的所有操作落盘"""
+        if self._write_queue is None:
+            return
+        
+        async def noop(conn: aiosqlite.Connection) -> None:
+            return None
+        
+        # 队列先进先出，哨兵操作完成即表示之前的操作都已提交
+        await self._write(noop)
+    
+    @staticmethod
+    def _log_write_error(future: "asyncio.Future") -> None:
+        """记录后台写操作的异常（避免异常无人读取）"""
+        if not future.cancelled() and future.exception() is not None:
+            logger.error(f"后台写入失败: {future.exception()}")
+    
+    async def _flush_loop(self) -> None:
+        """写队列后台任务：攒批后一次事务提交"""
+        while True:
+            batch = [await self._write_queue.get()]
             
-            # 游戏记录表
-            await cursor.execute("""
-                CREATE TABLE IF NOT EXISTS game_records (
-                    id TEXT PRIMARY KEY,
-                    mode TEXT,
-                    player1_id INTEGER,
-                    player2_id INTEGER,
-                    winner_id INTEGER,
-                    bet_amount INTEGER DEFAULT 0,
-                    reward_amount INTEGER DEFAULT 0,
-                    stages_completed INTEGER DEFAULT 0,
-                    total_rounds INTEGER DEFAULT 0,
-                    duration INTEGER DEFAULT 0,
-                    created_at TEXT DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
+            # 等待一个攒批窗口，让并发协程的写操作进入同一批
+            if self._write_queue.qsize() < self.flush_max_ops - 1:
+                await asyncio.sleep(self.flush_interval)
+            
+            while len(batch) < self.flush_max_ops and not self._write_queue.empty():
+                batch.append(self._write_queue.get_nowait())
             
-            await self._connection.commit()
+            await self._run_batch(batch)
+    
+    async def _run_batch(self, batch: List[Tuple[WriteOp, "asyncio.Future"]]) -> None:
+        """在一个事务中执行一批写操作"""
+        results = []
+        try:
+            async with self.transaction() as conn:
+                for op, future in batch:
+                    await conn.execute("SAVEPOINT write_op")
+                    mark = len(self._pending_events)
+                    try:
+                        result = await op(conn)
+                    except Exception as e:
+                        # 丢弃被回滚操作产生的事件
+                        del self._pending_events[mark:]
+                        await conn.execute("ROLLBACK TO write_op")
+                        await conn.execute("RELEASE write_op")
+                        results.append((future, None, e))
+                    else:
+                        await conn.execute("RELEASE write_op")
+                        results.append((future, result, None))
+        except Exception as e:
+            logger.error(f"写队列提交失败: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        # 提交成功后再通知调用方
+        for future, result, error in results:
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+    
+    async def _migrate(self) -> None:
+        """执行待执行的结构迁移"""
+        # 延迟导入，避免 python -m data.migrations 时模块被重复加载
+        from .migrations import migrate
+        applied = await migrate(self._connection)
+        for migration in applied:
+            logger.info(f"数据库迁移 v{migration.version}: {migration.description}")
     
     # ==================== 玩家数据操作 ====================
     
     async def get_player(self, user_id: int) -> Optional[PlayerData]:
         """获取玩家数据"""
-        async with self._connection.cursor() as cursor:
+        async with self._reader() as conn, conn.cursor() as cursor:
             await cursor.execute(
                 "SELECT * FROM players WHERE user_id = ?",
                 (user_id,)
@@ -118,20 +328,26 @@ class Database:
             return PlayerData(
                 user_id=row["user_id"],
                 chips=row["chips"],
-                last_daily=datetime.fromisoformat(row["last_daily"]) if row["last_daily"] else None,
-                created_at=datetime.fromisoformat(row["created_at"])
+                last_daily_ms=row["last_daily"],
+                created_at_ms=row["created_at"],
+                daily_streak=row["daily_streak"]
             )
     
-    async def create_player(self, user_id: int, initial_chips: int = 0) -> PlayerData:
+    async def create_player(self, user_id: int, initial_chips: int = 0,
+                            reason: str = "初始筹码") -> PlayerData:
         """创建新玩家"""
-        async with self._connection.cursor() as cursor:
-            await cursor.execute(
-                "INSERT INTO players (user_id, chips) VALUES (?, ?)",
-                (user_id, initial_chips)
+        async def op(conn: aiosqlite.Connection):
+            await conn.execute(
+                "INSERT INTO players (user_id, chips, created_at) VALUES (?, ?, ?)",
+                (user_id, initial_chips, player.created_at_ms)
             )
-            await self._connection.commit()
+            if initial_chips:
+                await self._record_ledger(conn, user_id, initial_chips, reason)
+            self._emit("on_chips_changed", user_id, initial_chips)
         
-        return PlayerData(user_id=user_id, chips=initial_chips)
+        player = PlayerData(user_id=user_id, chips=initial_chips)
+        await self._write(op)
+        return player
     
     async def get_or_create_player(self, user_id: int, initial_chips: int = 0) -> PlayerData:
         """获取或创建玩家"""
@@ -140,63 +356,506 @@ class Database:
             player = await self.create_player(user_id, initial_chips)
         return player
     
-    async def update_chips(self, user_id: int, chips: int) -> None:
-        """更新玩家筹码"""
-        async with self._connection.cursor() as cursor:
-            await cursor.execute(
+    async def update_chips(self, user_id: int, chips: int, wait: bool = True,
+                           reason: str = "余额调整") -> None:
+        """更新玩家筹码（直接设置余额，差额记入账本）
+        
+        Args:
+            wait: 是否等待写入提交（启用写队列时False表示后台合并提交）
+            reason: 账本记录原因
+        """
+        async def op(conn: aiosqlite.Connection):
+            async with conn.execute(
+                "SELECT chips FROM players WHERE user_id = ?", (user_id,)
+            ) as cursor:
+                row = await cursor.fetchone()
+            if row is None:
+                return
+            await conn.execute(
                 "UPDATE players SET chips = ? WHERE user_id = ?",
                 (chips, user_id)
             )
-            await self._connection.commit()
+            if chips != row["chips"]:
+                await self._record_ledger(conn, user_id, chips - row["chips"], reason)
+            self._emit("on_chips_changed", user_id, chips)
+        
+        await self._write(op, wait=wait)
     
-    async def update_last_daily(self, user_id: int) -> None:
-        """更新签到时间"""
-        async with self._connection.cursor() as cursor:
-            await cursor.execute(
+    async def update_last_daily(self, user_id: int, wait: bool = True) -> None:
+        """更新签到时间
+        
+        Args:
+            wait: 是否等待写入提交（启用写队列时False表示后台合并提交）
+        """
+        async def op(conn: aiosqlite.Connection):
+            await conn.execute(
                 "UPDATE players SET last_daily = ? WHERE user_id = ?",
-                (datetime.now().isoformat(), user_id)
+                (now_ms(), user_id)
+            )
+            self._emit("on_player_changed", user_id)
+        
+        await self._write(op, wait=wait)
+    
+    # ==================== 原子余额操作 ====================
+    
+    async def _ensure_rows(self, conn: aiosqlite.Connection, user_id: int) -> None:
+        """确保玩家和统计行存在（事务内调用）"""
+        await conn.execute(
+            "INSERT INTO players (user_id) VALUES (?) ON CONFLICT(user_id) DO NOTHING",
+            (user_id,)
+        )
+        await conn.execute(
+            "INSERT INTO player_stats (user_id) VALUES (?) ON CONFLICT(user_id) DO NOTHING",
+            (user_id,)
+        )
+    
+    async def _record_ledger(self, conn: aiosqlite.Connection, user_id: int, delta: int,
+                             reason: str = "", session_id: Optional[str] = None,
+                             counterparty_id: Optional[int] = None) -> None:
+        """追加一条账本流水（事务内调用，与余额变动同一事务）"""
+        await conn.execute(
+            """INSERT INTO ledger (user_id, delta, reason, session_id, counterparty_id, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)""",
+            (user_id, delta, reason, session_id, counterparty_id, now_ms())
+        )
+    
+    async def _apply_chips(self, conn: aiosqlite.Connection, user_id: int, delta: int,
+                           reason: str = "", session_id: Optional[str] = None,
+                           counterparty_id: Optional[int] = None) -> Optional[int]:
+        """单语句调整余额并记账（事务内调用），余额不足时不修改并返回None"""
+        async with conn.execute(
+            "UPDATE players SET chips = chips + ? WHERE user_id = ? AND chips >= ? RETURNING chips",
+            (delta, user_id, max(0, -delta))
+        ) as cursor:
+            row = await cursor.fetchone()
+        if row is None:
+            return None
+        await self._record_ledger(conn, user_id, delta, reason, session_id, counterparty_id)
+        self._emit("on_chips_changed", user_id, row["chips"])
+        return row["chips"]
+    
+    async def _add_chip_stats(self, conn: aiosqlite.Connection, user_id: int,
+                              earned: int = 0, spent: int = 0) -> None:
+        """累加筹码收支统计（事务内调用）"""
+        if not earned and not spent:
+            return
+        await conn.execute(
+            """UPDATE player_stats SET
+                total_chips_earned = total_chips_earned + ?,
+                total_chips_spent = total_chips_spent + ?
+            WHERE user_id = ?""",
+            (earned, spent, user_id)
+        )
+        self._emit("on_stats_changed", user_id, None)
+    
+    async def _replayed(self, conn: aiosqlite.Connection,
+                        key: Optional[str], user_id: int) -> Optional[int]:
+        """查询幂等键（事务内调用），已执行过时返回当时的结果，否则返回None
+        
+        Raises:
+            IdempotencyKeyConflict: 键属于其他用户
+        """
+        if key is None:
+            return None
+        async with conn.execute(
+            "SELECT result, user_id FROM idempotency_keys WHERE key = ?", (key,)
+        ) as cursor:
+            row = await cursor.fetchone()
+        if row is None:
+            return None
+        # 旧版本记录没有用户ID，无法校验
+        if row["user_id"] is not None and row["user_id"] != user_id:
+            raise IdempotencyKeyConflict(f"幂等键 {key} 属于用户 {row['user_id']}，本次为 {user_id}")
+        return row["result"]
+    
+    async def _remember(self, conn: aiosqlite.Connection,
+                        key: Optional[str], user_id: int, result: int) -> None:
+        """记录幂等键、所属用户及结果（事务内调用，与筹码变动同一事务提交）"""
+        if key is None:
+            return
+        await conn.execute(
+            "INSERT INTO idempotency_keys (key, user_id, result, created_at) VALUES (?, ?, ?, ?)",
+            (key, user_id, result, now_ms())
+        )
+    
+    async def adjust_chips(self, user_id: int, delta: int,
+                           earned: int = 0, spent: int = 0, reason: str = "",
+                           session_id: Optional[str] = None,
+                           counterparty_id: Optional[int] = None,
+                           key: Optional[str] = None) -> Optional[int]:
+        """原子调整玩家筹码（一个事务、一次提交）
+        
+        Args:
+            user_id: Discord用户ID
+            delta: 筹码变化量（负数为扣除）
+            earned: 计入总获得的数量
+            spent: 计入总消费的数量
+            reason: 账本记录原因
+            session_id: 关联的游戏会话ID
+            counterparty_id: 对方用户ID
+            key: 幂等键，同一键只生效一次，重复调用返回首次的结果
+            
+        Returns:
+            新余额，余额不足返回None（不做任何修改）
+        
+        Raises:
+            IdempotencyKeyConflict: 键已被其他用户使用
+        """
+        async def op(conn: aiosqlite.Connection):
+            replayed = await self._replayed(conn, key, user_id)
+            if replayed is not None:
+                return replayed
+            await self._ensure_rows(conn, user_id)
+            new_balance = await self._apply_chips(
+                conn, user_id, delta, reason, session_id, counterparty_id
             )
-            await self._connection.commit()
+            if new_balance is None:
+                return None
+            await self._add_chip_stats(conn, user_id, earned, spent)
+            await self._remember(conn, key, user_id, new_balance)
+            return new_balance
+        
+        return await self._write(op)
+    
+    async def deduct_chips_many(self, amounts: Dict[int, int], reason: str = "",
+                                session_id: Optional[str] = None,
+                                key: Optional[str] = None) -> DeductResult:
+        """在同一事务内扣除多个玩家的筹码，任一余额不足则全部不扣
+        
+        Args:
+            amounts: {user_id: 扣除数量}
+            reason: 账本记录原因
+            session_id: 关联的游戏会话ID
+            key: 幂等键，同一键只扣除一次，重复调用返回REPLAYED
+            
+        Returns:
+            扣除结果
+        """
+        async def op(conn: aiosqlite.Connection):
+            # 多人扣除的键记在ID最小的用户名下
+            if await self._replayed(conn, key, min(amounts)) is not None:
+                return DeductResult.REPLAYED
+            for user_id, amount in amounts.items():
+                await self._ensure_rows(conn, user_id)
+                if await self._apply_chips(conn, user_id, -amount, reason, session_id) is None:
+                    raise InsufficientChips(user_id)
+                await self._add_chip_stats(conn, user_id, spent=amount)
+            await self._remember(conn, key, min(amounts), 1)
+            return DeductResult.DEDUCTED
+        
+        try:
+            return await self._write(op)
+        except InsufficientChips:
+            return DeductResult.INSUFFICIENT
+    
+    async def transfer_chips(self, from_id: int, to_id: int, amount: int,
+                             key: Optional[str] = None) -> Optional[int]:
+        """原子转账：扣款、入账、转账记录在同一事务内完成
+        
+        Args:
+            from_id: 转出用户ID
+            to_id: 转入用户ID
+            amount: 转账金额
+            key: 幂等键，同一键只转账一次，重复调用返回首次的结果
+            
+        Returns:
+            转出方新余额，余额不足返回None
+        """
+        async def op(conn: aiosqlite.Connection):
+            replayed = await self._replayed(conn, key, from_id)
+            if replayed is not None:
+                return replayed
+            await self._ensure_rows(conn, from_id)
+            await self._ensure_rows(conn, to_id)
+            new_balance = await self._apply_chips(conn, from_id, -amount, "转账", counterparty_id=to_id)
+            if new_balance is None:
+                return None
+            await self._apply_chips(conn, to_id, amount, "转账", counterparty_id=from_id)
+            await conn.execute(
+                "INSERT INTO transfers (from_user_id, to_user_id, amount) VALUES (?, ?, ?)",
+                (from_id, to_id, amount)
+            )
+            await self._remember(conn, key, from_id, new_balance)
+            return new_balance
+        
+        return await self._write(op)
+    
+    async def grant_daily(self, user_id: int, reward: int,
+                          day_start: int) -> Optional[Tuple[int, int]]:
+        """发放签到奖励：条件UPDATE一条语句完成检查和发放，账本和统计在同一事务内更新
+        
+        Args:
+            user_id: Discord用户ID
+            reward: 奖励金额
+            day_start: 当天0点的毫秒时间戳，上次签到早于此时间才发放
+            
+        Returns:
+            (新余额, 连续签到天数)，今天已签到返回None（不做任何修改）
+        """
+        async def op(conn: aiosqlite.Connection):
+            await self._ensure_rows(conn, user_id)
+            # 昨天签到过则连续天数+1，否则从1开始（0点的重置任务尚未执行时也正确）
+            async with conn.execute(
+                """UPDATE players SET chips = chips + ?, last_daily = ?,
+                    daily_streak = CASE WHEN last_daily >= ? THEN daily_streak + 1 ELSE 1 END
+                WHERE user_id = ? AND (last_daily IS NULL OR last_daily < ?)
+                RETURNING chips, daily_streak""",
+                (reward, now_ms(), day_start - MS_PER_DAY, user_id, day_start)
+            ) as cursor:
+                row = await cursor.fetchone()
+            if row is None:
+                return None
+            await self._record_ledger(conn, user_id, reward, "每日签到")
+            self._emit("on_chips_changed", user_id, row["chips"])
+            self._emit("on_player_changed", user_id)
+            await self._add_chip_stats(conn, user_id, earned=reward)
+            return row["chips"], row["daily_streak"]
+        
+        return await self._write(op)
+    
+    async def reset_daily_streaks(self, day_start: int) -> int:
+        """日切：昨天没有签到的玩家连续天数清零（一条UPDATE）
+        
+        Args:
+            day_start: 当天0点的毫秒时间戳
+            
+        Returns:
+            清零的玩家数
+        """
+        async def op(conn: aiosqlite.Connection):
+            async with conn.execute(
+                """UPDATE players SET daily_streak = 0
+                WHERE daily_streak > 0 AND (last_daily IS NULL OR last_daily < ?)
+                RETURNING user_id""",
+                (day_start - MS_PER_DAY,)
+            ) as cursor:
+                rows = await cursor.fetchall()
+            for row in rows:
+                self._emit("on_player_changed", row["user_id"])
+            return len(rows)
+        
+        return await self._write(op)
+    
+    async def purge_idempotency_keys(self, before_ms: int) -> int:
+        """删除早于指定时间的幂等键
+        
+        Returns:
+            删除的数量
+        """
+        async def op(conn: aiosqlite.Connection):
+            async with conn.execute(
+                "DELETE FROM idempotency_keys WHERE created_at < ?", (before_ms,)
+            ) as cursor:
+                return cursor.rowcount
+        
+        return await self._write(op)
+    
+    # ==================== 批量发放 ====================
+    
+    @staticmethod
+    def _grant_filter_sql(grant_filter: Optional[GrantFilter]) -> Tuple[str, list]:
+        """把筛选条件转成追加在WHERE后的SQL片段和参数"""
+        if grant_filter is None:
+            return "", []
+        clauses, params = [], []
+        if grant_filter.user_ids is not None:
+            clauses.append(f"user_id IN ({', '.join('?' * len(grant_filter.user_ids))})")
+            params.extend(grant_filter.user_ids)
+        if grant_filter.min_chips is not None:
+            clauses.append("chips >= ?")
+            params.append(grant_filter.min_chips)
+        if grant_filter.max_chips is not None:
+            clauses.append("chips <= ?")
+            params.append(grant_filter.max_chips)
+        if grant_filter.created_before_ms is not None:
+            clauses.append("created_at < ?")
+            params.append(grant_filter.created_before_ms)
+        return "".join(f" AND {clause}" for clause in clauses), params
+    
+    async def count_grant_targets(self, grant_filter: Optional[GrantFilter] = None) -> int:
+        """统计满足筛选条件的玩家数"""
+        where, params = self._grant_filter_sql(grant_filter)
+        async with self._reader() as conn, conn.cursor() as cursor:
+            await cursor.execute(f"SELECT COUNT(*) FROM players WHERE 1{where}", params)
+            row = await cursor.fetchone()
+        return row[0]
+    
+    async def bulk_grant(self, amount: int, reason: str,
+                         grant_filter: Optional[GrantFilter] = None,
+                         chunk_size: int = 500, pause: float = 0.0) -> int:
+        """批量发放筹码
+        
+        按user_id分块，每块一个事务：一条 INSERT ... SELECT 写账本，
+        一条 UPDATE ... WHERE 加余额。块之间释放写锁，其他写操作可以插入执行。
+        
+        Args:
+            amount: 每人发放数量（必须为正数）
+            reason: 账本记录原因
+            grant_filter: 筛选条件（None表示所有玩家）
+            chunk_size: 每个事务处理的玩家数
+            pause: 块之间的等待时间（秒），给其他进程的写入让出时间
+            
+        Returns:
+            发放的玩家数
+        """
+        if amount <= 0:
+            raise ValueError("发放数量必须为正数")
+        where, params = self._grant_filter_sql(grant_filter)
+        
+        async def grant_chunk(conn: aiosqlite.Connection, after: int) -> Tuple[Optional[int], int]:
+            async with conn.execute(
+                f"""SELECT MAX(user_id) FROM (
+                    SELECT user_id FROM players WHERE user_id > ?{where}
+                    ORDER BY user_id LIMIT ?
+                )""",
+                (after, *params, chunk_size)
+            ) as cursor:
+                upper = (await cursor.fetchone())[0]
+            if upper is None:
+                return None, 0
+            
+            # 账本先写：筛选条件可能依赖余额，必须在加余额之前求值
+            bounds = f"user_id > ? AND user_id <= ?{where}"
+            await conn.execute(
+                f"""INSERT INTO ledger (user_id, delta, reason, created_at)
+                SELECT user_id, ?, ?, ? FROM players WHERE {bounds}""",
+                (amount, reason, now_ms(), after, upper, *params)
+            )
+            async with conn.execute(
+                f"UPDATE players SET chips = chips + ? WHERE {bounds} RETURNING user_id, chips",
+                (amount, after, upper, *params)
+            ) as cursor:
+                rows = await cursor.fetchall()
+            for row in rows:
+                self._emit("on_chips_changed", row["user_id"], row["chips"])
+            return upper, len(rows)
+        
+        total = 0
+        after = -MAX_ROWID - 1
+        while True:
+            upper, count = await self._write(lambda conn, after=after: grant_chunk(conn, after))
+            if upper is None:
+                return total
+            total += count
+            after = upper
+            await asyncio.sleep(pause)
+    
+    # ==================== 账本 ====================
+    
+    async def get_ledger(self, user_id: int, limit: int = 20,
+                         before_id: Optional[int] = None) -> List[LedgerEntry]:
+        """获取用户账本流水（按ID倒序的游标分页）"""
+        cursor_id = before_id if before_id is not None else MAX_ROWID
+        async with self._reader() as conn, conn.cursor() as cursor:
+            await cursor.execute(
+                """SELECT * FROM ledger WHERE user_id = ? AND id < ?
+                ORDER BY id DESC LIMIT ?""",
+                (user_id, cursor_id, limit)
+            )
+            rows = await cursor.fetchall()
+        return [
+            LedgerEntry(
+                id=row["id"],
+                user_id=row["user_id"],
+                delta=row["delta"],
+                reason=row["reason"],
+                session_id=row["session_id"],
+                counterparty_id=row["counterparty_id"],
+                created_at_ms=row["created_at"]
+            )
+            for row in rows
+        ]
+    
+    async def recompute_balance(self, user_id: int) -> int:
+        """由账本重新计算余额：最近一次快照 + 之后的流水
+        
+        只读取快照之后的尾部流水，开销与历史总长度无关。
+        """
+        async with self._reader() as conn, conn.cursor() as cursor:
+            await cursor.execute(
+                """SELECT ledger_id, balance FROM ledger_snapshots
+                WHERE user_id = ? ORDER BY ledger_id DESC LIMIT 1""",
+                (user_id,)
+            )
+            snapshot = await cursor.fetchone()
+            ledger_id, balance = (snapshot["ledger_id"], snapshot["balance"]) if snapshot else (0, 0)
+            await cursor.execute(
+                "SELECT COALESCE(SUM(delta), 0) FROM ledger WHERE user_id = ? AND id > ?",
+                (user_id, ledger_id)
+            )
+            row = await cursor.fetchone()
+        return balance + row[0]
+    
+    async def snapshot_balances(self) -> int:
+        """为上次快照之后有流水的用户写入余额快照
+        
+        快照余额取自同一事务内的 players.chips，与账本一致。
+        
+        Returns:
+            写入的快照数
+        """
+        async def op(conn: aiosqlite.Connection):
+            async with conn.execute("""
+                INSERT INTO ledger_snapshots (user_id, ledger_id, balance, created_at)
+                SELECT l.user_id, MAX(l.id), p.chips, ?
+                FROM ledger l JOIN players p ON p.user_id = l.user_id
+                WHERE l.id > (SELECT COALESCE(MAX(ledger_id), 0) FROM ledger_snapshots)
+                GROUP BY l.user_id
+            """, (now_ms(),)) as cursor:
+                return cursor.rowcount
+        
+        return await self._write(op)
     
     # ==================== 玩家统计操作 ====================
     
     async def get_player_stats(self, user_id: int) -> PlayerStats:
         """获取玩家统计"""
-        async with self._connection.cursor() as cursor:
+        async with self._reader() as conn, conn.cursor() as cursor:
             await cursor.execute(
                 "SELECT * FROM player_stats WHERE user_id = ?",
                 (user_id,)
             )
             row = await cursor.fetchone()
-            
-            if row is None:
-                # 创建默认统计
-                await cursor.execute(
-                    "INSERT INTO player_stats (user_id) VALUES (?)",
+        
+        if row is None:
+            # 创建默认统计
+            async def op(conn: aiosqlite.Connection):
+                await conn.execute(
+                    "INSERT INTO player_stats (user_id) VALUES (?) ON CONFLICT(user_id) DO NOTHING",
                     (user_id,)
                 )
-                await self._connection.commit()
-                return PlayerStats(user_id=user_id)
             
-            return PlayerStats(
-                user_id=row["user_id"],
-                games_played=row["games_played"],
-                games_won=row["games_won"],
-                pve_best_stage=row["pve_best_stage"],
-                pve_total_earnings=row["pve_total_earnings"],
-                pve_best_rounds=row["pve_best_rounds"] if "pve_best_rounds" in row.keys() else 0,
-                pve_best_reward=row["pve_best_reward"] if "pve_best_reward" in row.keys() else 0,
-                pvp_wins=row["pvp_wins"],
-                pvp_losses=row["pvp_losses"],
-                pvp_total_earnings=row["pvp_total_earnings"],
-                total_chips_earned=row["total_chips_earned"],
-                total_chips_spent=row["total_chips_spent"]
-            )
+            await self._write(op)
+            return PlayerStats(user_id=user_id)
+        
+        return self._row_to_stats(row)
     
-    async def update_player_stats(self, stats: PlayerStats) -> None:
-        """更新玩家统计"""
-        async with self._connection.cursor() as cursor:
-            await cursor.execute("""
+    @staticmethod
+    def _row_to_stats(row: aiosqlite.Row) -> PlayerStats:
+        """数据行转换为PlayerStats"""
+        return PlayerStats(
+            user_id=row["user_id"],
+            games_played=row["games_played"],
+            games_won=row["games_won"],
+            pve_best_stage=row["pve_best_stage"],
+            pve_total_earnings=row["pve_total_earnings"],
+            pve_best_rounds=row["pve_best_rounds"],
+            pve_best_reward=row["pve_best_reward"],
+            pvp_wins=row["pvp_wins"],
+            pvp_losses=row["pvp_losses"],
+            pvp_total_earnings=row["pvp_total_earnings"],
+            total_chips_earned=row["total_chips_earned"],
+            total_chips_spent=row["total_chips_spent"]
+        )
+    
+    async def update_player_stats(self, stats: PlayerStats, wait: bool = True) -> None:
+        """更新玩家统计
+        
+        Args:
+            wait: 是否等待写入提交（启用写队列时False表示后台合并提交）
+        """
+        async def op(conn: aiosqlite.Connection):
+            await conn.execute("""
                 UPDATE player_stats SET
                     games_played = ?,
                     games_won = ?,
@@ -224,28 +883,89 @@ class Database:
                 stats.total_chips_spent,
                 stats.user_id
             ))
-            await self._connection.commit()
+            self._emit("on_stats_changed", stats.user_id, stats)
+        
+        await self._write(op, wait=wait)
+    
+    async def apply_stats_deltas(self, deltas: List[StatsDelta], wait: bool = True) -> None:
+        """以增量方式更新多个玩家的统计（同一事务）
+        
+        计数字段 col = col + ?，最佳记录字段 col = MAX(col, ?)，
+        并发结算的对局不会互相覆盖。
+        
+        Args:
+            deltas: 统计增量列表
+            wait: 是否等待写入提交（启用写队列时False表示后台合并提交）
+        """
+        assignments = [f"{col} = {col} + ?" for col in StatsDelta.COUNTERS]
+        assignments += [f"{col} = MAX({col}, ?)" for col in StatsDelta.MAXIMA]
+        sql = f"UPDATE player_stats SET {', '.join(assignments)} WHERE user_id = ? RETURNING *"
+        params = [
+            tuple(getattr(delta, col) for col in StatsDelta.COUNTERS + StatsDelta.MAXIMA)
+            + (delta.user_id,)
+            for delta in deltas
+        ]
+        
+        async def op(conn: aiosqlite.Connection):
+            await conn.executemany(
+                "INSERT INTO player_stats (user_id) VALUES (?) ON CONFLICT(user_id) DO NOTHING",
+                [(delta.user_id,) for delta in deltas]
+            )
+            for param in params:
+                async with conn.execute(sql, param) as cursor:
+                    row = await cursor.fetchone()
+                self._emit("on_stats_changed", row["user_id"], self._row_to_stats(row))
+        
+        await self._write(op, wait=wait)
     
     # ==================== 转账记录操作 ====================
     
-    async def add_transfer_record(self, from_id: int, to_id: int, amount: int) -> None:
-        """添加转账记录"""
-        async with self._connection.cursor() as cursor:
-            await cursor.execute(
+    async def add_transfer_record(self, from_id: int, to_id: int, amount: int, wait: bool = True) -> None:
+        """添加转账记录
+        
+        Args:
+            wait: 是否等待写入提交（启用写队列时False表示后台合并提交）
+        """
+        async def op(conn: aiosqlite.Connection):
+            await conn.execute(
                 "INSERT INTO transfers (from_user_id, to_user_id, amount) VALUES (?, ?, ?)",
                 (from_id, to_id, amount)
             )
-            await self._connection.commit()
+        
+        await self._write(op, wait=wait)
     
-    async def get_transfer_history(self, user_id: int, limit: int = 10) -> List[TransferRecord]:
-        """获取转账历史"""
-        async with self._connection.cursor() as cursor:
+    async def get_transfer_history(self, user_id: int, limit: int = 10,
+                                   before_id: Optional[int] = None) -> List[TransferRecord]:
+        """获取转账历史（按记录ID倒序的游标分页）
+        
+        转出、转入两侧分别走 (from_user_id, id) / (to_user_id, id) 索引，
+        各取一页后合并，每页开销与历史总量无关。
+        
+        Args:
+            user_id: 用户ID
+            limit: 每页数量
+            before_id: 只返回ID小于该值的记录（上一页最后一条的ID），None表示第一页
+            
+        Returns:
+            转账记录列表（新记录在前）
+        """
+        cursor_id = before_id if before_id is not None else MAX_ROWID
+        async with self._reader() as conn, conn.cursor() as cursor:
             await cursor.execute("""
-                SELECT * FROM transfers 
-                WHERE from_user_id = ? OR to_user_id = ?
-                ORDER BY created_at DESC
+                SELECT * FROM (
+                    SELECT * FROM transfers
+                    WHERE from_user_id = ? AND id < ?
+                    ORDER BY id DESC LIMIT ?
+                )
+                UNION
+                SELECT * FROM (
+                    SELECT * FROM transfers
+                    WHERE to_user_id = ? AND id < ?
+                    ORDER BY id DESC LIMIT ?
+                )
+                ORDER BY id DESC
                 LIMIT ?
-            """, (user_id, user_id, limit))
+            """, (user_id, cursor_id, limit, user_id, cursor_id, limit, limit))
             
             rows = await cursor.fetchall()
             return [
@@ -254,45 +974,123 @@ class Database:
                     from_user_id=row["from_user_id"],
                     to_user_id=row["to_user_id"],
                     amount=row["amount"],
-                    created_at=datetime.fromisoformat(row["created_at"])
+                    created_at_ms=row["created_at"]
                 )
                 for row in rows
             ]
     
-    # ==================== 排行榜 ====================
+    # ==================== 游戏记录 ====================
     
-    async def get_chips_leaderboard(self, limit: int = 10) -> List[tuple]:
-        """获取筹码排行榜"""
-        async with self._connection.cursor() as cursor:
-            await cursor.execute(
-                "SELECT user_id, chips FROM players ORDER BY chips DESC LIMIT ?",
-                (limit,)
+    async def insert_game_records(self, records: List[GameRecord]) -> int:
+        """批量写入游戏记录（ID已存在的记录不覆盖）
+        
+        Returns:
+            实际写入的记录数
+        """
+        params = [
+            (
+                record.id, record.mode, record.player1_id, record.player2_id,
+                record.winner_id, record.bet_amount, record.reward_amount,
+                record.stages_completed, record.total_rounds, record.duration,
+                record.created_at_ms
             )
-            return await cursor.fetchall()
+            for record in records
+        ]
+        
+        async def op(conn: aiosqlite.Connection) -> int:
+            cursor = await conn.executemany("""
+                INSERT INTO game_records (
+                    id, mode, player1_id, player2_id, winner_id, bet_amount, reward_amount,
+                    stages_completed, total_rounds, duration, created_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO NOTHING
+            """, params)
+            return cursor.rowcount
+        
+        return await self._write(op)
+    
+    # ==================== 用户名称 ====================
     
-    async def get_wins_leaderboard(self, limit: int = 10) -> List[tuple]:
-        """获取胜场排行榜"""
-        async with self._connection.cursor() as cursor:
+    async def get_user_names(self, user_ids: List[int]) -> Dict[int, Tuple[str, int]]:
+        """批量获取已保存的用户名称
+        
+        Returns:
+            {user_id: (名称, 更新时间毫秒时间戳)}
+        """
+        placeholders = ",".join("?" * len(user_ids))
+        async with self._reader() as conn, conn.cursor() as cursor:
             await cursor.execute(
-                "SELECT user_id, games_won FROM player_stats ORDER BY games_won DESC LIMIT ?",
-                (limit,)
+                f"SELECT user_id, name, updated_at FROM user_names WHERE user_id IN ({placeholders})",
+                list(user_ids)
             )
-            return await cursor.fetchall()
+            rows = await cursor.fetchall()
+        return {
+            row["user_id"]: (row["name"], row["updated_at"])
+            for row in rows
+        }
     
-    async def get_rounds_leaderboard(self, limit: int = 10) -> List[tuple]:
-        """获取最高轮数排行榜"""
-        async with self._connection.cursor() as cursor:
-            await cursor.execute(
-                "SELECT user_id, pve_best_rounds FROM player_stats WHERE pve_best_rounds > 0 ORDER BY pve_best_rounds DESC LIMIT ?",
-                (limit,)
+    async def save_user_names(self, names: Dict[int, str], wait: bool = True) -> None:
+        """保存用户名称
+        
+        Args:
+            names: {user_id: 名称}
+            wait: 是否等待写入提交（启用写队列时False表示后台合并提交）
+        """
+        now = now_ms()
+        params = [(user_id, name, now) for user_id, name in names.items()]
+        
+        async def op(conn: aiosqlite.Connection):
+            await conn.executemany(
+                """INSERT INTO user_names (user_id, name, updated_at) VALUES (?, ?, ?)
+                ON CONFLICT(user_id) DO UPDATE SET name = excluded.name, updated_at = excluded.updated_at""",
+                params
             )
-            return await cursor.fetchall()
+        
+        await self._write(op, wait=wait)
+    
+    # ==================== 待删除消息 ====================
+    
+    async def get_pending_deletions(self) -> List[Tuple[int, int, int]]:
+        """获取所有待删除消息 (channel_id, message_id, delete_at)"""
+        async with self._reader() as conn, conn.cursor() as cursor:
+            await cursor.execute("SELECT channel_id, message_id, delete_at FROM pending_deletions")
+            return [tuple(row) for row in await cursor.fetchall()]
+    
+    async def add_pending_deletions(self, rows: List[Tuple[int, int, int]],
+                                    wait: bool = True) -> None:
+        """批量保存待删除消息 (channel_id, message_id, delete_at)"""
+        async def op(conn: aiosqlite.Connection):
+            await conn.executemany(
+                """INSERT INTO pending_deletions (channel_id, message_id, delete_at) VALUES (?, ?, ?)
+                ON CONFLICT(channel_id, message_id) DO UPDATE SET delete_at = excluded.delete_at""",
+                rows
+            )
+        
+        await self._write(op, wait=wait)
+    
+    async def remove_pending_deletions(self, keys: List[Tuple[int, int]],
+                                       wait: bool = True) -> None:
+        """批量移除已处理的待删除消息 (channel_id, message_id)"""
+        async def op(conn: aiosqlite.Connection):
+            await conn.executemany(
+                "DELETE FROM pending_deletions WHERE channel_id = ? AND message_id = ?",
+                keys
+            )
+        
+        await self._write(op, wait=wait)
+    
+    # ==================== 排行榜 ====================
+    
+    async def get_all_chips(self) -> List[tuple]:
+        """获取所有玩家余额 (user_id, chips)，用于加载内存排行榜"""
+        async with self._reader() as conn, conn.cursor() as cursor:
+            await cursor.execute("SELECT user_id, chips FROM players")
+            return [tuple(row) for row in await cursor.fetchall()]
     
-    async def get_reward_leaderboard(self, limit: int = 10) -> List[tuple]:
-        """获取最大单局奖励排行榜"""
-        async with self._connection.cursor() as cursor:
+    async def get_all_ranked_stats(self) -> List[tuple]:
+        """获取所有玩家排行指标 (user_id, games_won, pve_best_rounds, pve_best_reward)"""
+        async with self._reader() as conn, conn.cursor() as cursor:
             await cursor.execute(
-                "SELECT user_id, pve_best_reward FROM player_stats WHERE pve_best_reward > 0 ORDER BY pve_best_reward DESC LIMIT ?",
-                (limit,)
+                "SELECT user_id, games_won, pve_best_rounds, pve_best_reward FROM player_stats"
             )
-            return await cursor.fetchall()
\ No newline at end of file
+            return [tuple(row) for row in await cursor.fetchall()]
@@ -0,0 +1,390 @@
+"""
+数据库版本迁移
+
+基于 PRAGMA user_version 记录当前结构版本，启动时只执行尚未应用的迁移步骤，
+全部待执行步骤在同一个事务中完成，失败整体回滚。
+
+用法（在项目根目录）:
+    python -m data.migrations --dry-run     # 只打印待执行的迁移
+    python -m data.migrations               # 执行迁移
+"""
+import argparse
+import asyncio
+from dataclasses import dataclass
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+import aiosqlite
+
+
+@dataclass(frozen=True)
+class Migration:
+    """单个迁移步骤"""
+    version: int                      # 应用后的结构版本
+    description: str                  # 说明
+    statements: Tuple[str, ...] = ()  # 依次执行的SQL
+    # 需要根据现有结构判断的步骤（如补列），在SQL之后执行
+    apply: Optional[Callable[[aiosqlite.Connection], Awaitable[None]]] = None
+
+
+async def _column_exists(conn: aiosqlite.Connection, table: str, column: str) -> bool:
+    """检查列是否存在"""
+    async with conn.execute(f"PRAGMA table_info({table})") as cursor:
+        return any(row[1] == column for row in await cursor.fetchall())
+
+
+async def _add_pve_record_columns(conn: aiosqlite.Connection) -> None:
+    """为旧版数据库补充 pve_best_rounds / pve_best_reward 列"""
+    for column in ("pve_best_rounds", "pve_best_reward"):
+        if not await _column_exists(conn, "player_stats", column):
+            await conn.execute(f"ALTER TABLE player_stats ADD COLUMN {column} INTEGER DEFAULT 0")
+
+
+# 当前时间（毫秒时间戳）的SQL表达式，用作列默认值
+NOW_MS_SQL = "(CAST(ROUND((julianday('now') - 2440587.5) * 86400000) AS INTEGER))"
+
+
+def _text_to_ms_sql(column: str, local: bool) -> str:
+    """TEXT时间列转换为毫秒时间戳的SQL表达式
+
+    Args:
+        column: 列名
+        local: 是否为本地时间（Python isoformat 写入）；否则为 CURRENT_TIMESTAMP 写入的UTC时间
+    """
+    modifier = ", 'utc'" if local else ""
+    return (f"CASE WHEN {column} IS NULL THEN NULL ELSE "
+            f"CAST(ROUND((julianday({column}{modifier}) - 2440587.5) * 86400000) AS INTEGER) END")
+
+
+async def _rebuild_table(conn: aiosqlite.Connection, table: str, create_sql: str,
+                         columns: List[str], select_exprs: List[str]) -> None:
+    """重建表（修改列类型），保留原有索引
+
+    Args:
+        table: 表名
+        create_sql: 新表建表语句（表名使用 {table}）
+        columns: 新表列名
+        select_exprs: 从旧表取值的表达式（与columns一一对应）
+    """
+    async with conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+        (table,)
+    ) as cursor:
+        index_sqls = [row[0] for row in await cursor.fetchall()]
+
+    new_table = f"{table}_new"
+    await conn.execute(create_sql.format(table=new_table))
+    await conn.execute(
+        f"INSERT INTO {new_table} ({', '.join(columns)}) "
+        f"SELECT {', '.join(select_exprs)} FROM {table}"
+    )
+    await conn.execute(f"DROP TABLE {table}")
+    await conn.execute(f"ALTER TABLE {new_table} RENAME TO {table}")
+    for index_sql in index_sqls:
+        await conn.execute(index_sql)
+
+
+async def _convert_timestamps_to_ms(conn: aiosqlite.Connection) -> None:
+    """时间列由ISO文本改为INTEGER毫秒时间戳"""
+    await _rebuild_table(
+        conn, "players",
+        f"""CREATE TABLE {{table}} (
+            user_id INTEGER PRIMARY KEY,
+            chips INTEGER DEFAULT 0,
+            last_daily INTEGER,
+            created_at INTEGER DEFAULT {NOW_MS_SQL}
+        )""",
+        ["user_id", "chips", "last_daily", "created_at"],
+        ["user_id", "chips", _text_to_ms_sql("last_daily", local=True),
+         _text_to_ms_sql("created_at", local=False)],
+    )
+    await _rebuild_table(
+        conn, "transfers",
+        f"""CREATE TABLE {{table}} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            from_user_id INTEGER,
+            to_user_id INTEGER,
+            amount INTEGER,
+            created_at INTEGER DEFAULT {NOW_MS_SQL}
+        )""",
+        ["id", "from_user_id", "to_user_id", "amount", "created_at"],
+        ["id", "from_user_id", "to_user_id", "amount", _text_to_ms_sql("created_at", local=False)],
+    )
+    game_columns = ["id", "mode", "player1_id", "player2_id", "winner_id", "bet_amount",
+                    "reward_amount", "stages_completed", "total_rounds", "duration"]
+    await _rebuild_table(
+        conn, "game_records",
+        f"""CREATE TABLE {{table}} (
+            id TEXT PRIMARY KEY,
+            mode TEXT,
+            player1_id INTEGER,
+            player2_id INTEGER,
+            winner_id INTEGER,
+            bet_amount INTEGER DEFAULT 0,
+            reward_amount INTEGER DEFAULT 0,
+            stages_completed INTEGER DEFAULT 0,
+            total_rounds INTEGER DEFAULT 0,
+            duration INTEGER DEFAULT 0,
+            created_at INTEGER DEFAULT {NOW_MS_SQL}
+        )""",
+        game_columns + ["created_at"],
+        game_columns + [_text_to_ms_sql("created_at", local=True)],
+    )
+    await _rebuild_table(
+        conn, "user_names",
+        f"""CREATE TABLE {{table}} (
+            user_id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            updated_at INTEGER DEFAULT {NOW_MS_SQL}
+        )""",
+        ["user_id", "name", "updated_at"],
+        ["user_id", "name", _text_to_ms_sql("updated_at", local=True)],
+    )
+
+
+# 迁移列表（按版本递增，只能追加，不能修改已发布的步骤）
+MIGRATIONS: List[Migration] = [
+    Migration(
+        version=1,
+        description="创建基础数据表",
+        statements=(
+            """CREATE TABLE IF NOT EXISTS players (
+                user_id INTEGER PRIMARY KEY,
+                chips INTEGER DEFAULT 0,
+                last_daily TEXT,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )""",
+            """CREATE TABLE IF NOT EXISTS player_stats (
+                user_id INTEGER PRIMARY KEY,
+                games_played INTEGER DEFAULT 0,
+                games_won INTEGER DEFAULT 0,
+                pve_best_stage INTEGER DEFAULT 0,
+                pve_total_earnings INTEGER DEFAULT 0,
+                pve_best_rounds INTEGER DEFAULT 0,
+                pve_best_reward INTEGER DEFAULT 0,
+                pvp_wins INTEGER DEFAULT 0,
+                pvp_losses INTEGER DEFAULT 0,
+                pvp_total_earnings INTEGER DEFAULT 0,
+                total_chips_earned INTEGER DEFAULT 0,
+                total_chips_spent INTEGER DEFAULT 0
+            )""",
+            """CREATE TABLE IF NOT EXISTS transfers (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                from_user_id INTEGER,
+                to_user_id INTEGER,
+                amount INTEGER,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )""",
+            """CREATE TABLE IF NOT EXISTS game_records (
+                id TEXT PRIMARY KEY,
+                mode TEXT,
+                player1_id INTEGER,
+                player2_id INTEGER,
+                winner_id INTEGER,
+                bet_amount INTEGER DEFAULT 0,
+                reward_amount INTEGER DEFAULT 0,
+                stages_completed INTEGER DEFAULT 0,
+                total_rounds INTEGER DEFAULT 0,
+                duration INTEGER DEFAULT 0,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )""",
+        ),
+    ),
+    Migration(
+        version=2,
+        description="旧版 player_stats 补充最高轮数和最大单局奖励列",
+        apply=_add_pve_record_columns,
+    ),
+    Migration(
+        version=3,
+        description="排行榜索引",
+        statements=(
+            "CREATE INDEX IF NOT EXISTS idx_players_chips ON players (chips DESC)",
+            "CREATE INDEX IF NOT EXISTS idx_stats_games_won ON player_stats (games_won DESC)",
+            "CREATE INDEX IF NOT EXISTS idx_stats_best_rounds ON player_stats (pve_best_rounds DESC) "
+            "WHERE pve_best_rounds > 0",
+            "CREATE INDEX IF NOT EXISTS idx_stats_best_reward ON player_stats (pve_best_reward DESC) "
+            "WHERE pve_best_reward > 0",
+        ),
+    ),
+    Migration(
+        version=4,
+        description="转账记录索引（按转出/转入方分页）",
+        statements=(
+            "CREATE INDEX IF NOT EXISTS idx_transfers_from ON transfers (from_user_id, id)",
+            "CREATE INDEX IF NOT EXISTS idx_transfers_to ON transfers (to_user_id, id)",
+        ),
+    ),
+    Migration(
+        version=5,
+        description="用户名称缓存表",
+        statements=(
+            """CREATE TABLE IF NOT EXISTS user_names (
+                user_id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )""",
+        ),
+    ),
+    Migration(
+        version=6,
+        description="游戏记录索引（玩家历史、按模式统计）",
+        statements=(
+            "CREATE INDEX IF NOT EXISTS idx_game_records_player1 ON game_records (player1_id, created_at)",
+            "CREATE INDEX IF NOT EXISTS idx_game_records_player2 ON game_records (player2_id, created_at) "
+            "WHERE player2_id IS NOT NULL",
+            "CREATE INDEX IF NOT EXISTS idx_game_records_mode ON game_records (mode, created_at)",
+        ),
+    ),
+    Migration(
+        version=7,
+        description="时间列改为INTEGER毫秒时间戳（重建表）",
+        apply=_convert_timestamps_to_ms,
+    ),
+    Migration(
+        version=8,
+        description="筹码流水账本和余额快照（现有余额作为期初快照）",
+        statements=(
+            f"""CREATE TABLE IF NOT EXISTS ledger (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                delta INTEGER NOT NULL,
+                reason TEXT NOT NULL DEFAULT '',
+                session_id TEXT,
+                counterparty_id INTEGER,
+                created_at INTEGER DEFAULT {NOW_MS_SQL}
+            )""",
+            "CREATE INDEX IF NOT EXISTS idx_ledger_user ON ledger (user_id, id)",
+            f"""CREATE TABLE IF NOT EXISTS ledger_snapshots (
+                user_id INTEGER NOT NULL,
+                ledger_id INTEGER NOT NULL,
+                balance INTEGER NOT NULL,
+                created_at INTEGER DEFAULT {NOW_MS_SQL},
+                PRIMARY KEY (user_id, ledger_id)
+            )""",
+            "CREATE INDEX IF NOT EXISTS idx_ledger_snapshots_ledger_id ON ledger_snapshots (ledger_id)",
+            "INSERT OR IGNORE INTO ledger_snapshots (user_id, ledger_id, balance) "
+            "SELECT user_id, 0, chips FROM players",
+        ),
+    ),
+    Migration(
+        version=9,
+        description="筹码操作幂等键",
+        statements=(
+            """CREATE TABLE IF NOT EXISTS idempotency_keys (
+                key TEXT PRIMARY KEY,
+                result INTEGER,
+                created_at INTEGER NOT NULL
+            )""",
+            "CREATE INDEX IF NOT EXISTS idx_idempotency_keys_created_at ON idempotency_keys (created_at)",
+        ),
+    ),
+    Migration(
+        version=10,
+        description="连续签到天数",
+        statements=(
+            "ALTER TABLE players ADD COLUMN daily_streak INTEGER NOT NULL DEFAULT 0",
+        ),
+    ),
+    Migration(
+        version=11,
+        description="待删除消息（重启后继续删除）",
+        statements=(
+            """CREATE TABLE IF NOT EXISTS pending_deletions (
+                channel_id INTEGER NOT NULL,
+                message_id INTEGER NOT NULL,
+                delete_at INTEGER NOT NULL,
+                PRIMARY KEY (channel_id, message_id)
+            ) WITHOUT ROWID""",
+        ),
+    ),
+    Migration(
+        version=12,
+        description="幂等键记录所属用户",
+        statements=(
+            "ALTER TABLE idempotency_keys ADD COLUMN user_id INTEGER",
+        ),
+    ),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+async def get_schema_version(conn: aiosqlite.Connection) -> int:
+    """获取当前结构版本"""
+    async with conn.execute("PRAGMA user_version") as cursor:
+        row = await cursor.fetchone()
+    return row[0]
+
+
+def get_pending(current_version: int) -> List[Migration]:
+    """获取待执行的迁移"""
+    return [m for m in MIGRATIONS if m.version > current_version]
+
+
+async def migrate(conn: aiosqlite.Connection) -> List[Migration]:
+    """执行所有待执行的迁移（单事务）
+
+    Args:
+        conn: 写连接（调用时不能处于事务中）
+
+    Returns:
+        本次执行的迁移列表
+    """
+    pending = get_pending(await get_schema_version(conn))
+    if not pending:
+        return []
+
+    await conn.execute("BEGIN IMMEDIATE")
+    try:
+        # 在事务内再次读取版本，避免多进程同时迁移
+        pending = get_pending(await get_schema_version(conn))
+        for migration in pending:
+            for statement in migration.statements:
+                await conn.execute(statement)
+            if migration.apply is not None:
+                await migration.apply(conn)
+        if pending:
+            await conn.execute(f"PRAGMA user_version = {pending[-1].version}")
+    except BaseException:
+        await conn.rollback()
+        raise
+    else:
+        await conn.commit()
+    return pending
+
+
+def format_plan(current_version: int, pending: List[Migration]) -> str:
+    """格式化迁移计划"""
+    lines = [f"当前版本: {current_version}，最新版本: {LATEST_VERSION}"]
+    if not pending:
+        lines.append("没有待执行的迁移")
+        return "\n".join(lines)
+
+    for migration in pending:
+        lines.append(f"[v{migration.version}] {migration.description}")
+        for statement in migration.statements:
+            lines.append("    " + " ".join(statement.split()))
+        if migration.apply is not None:
+            lines.append(f"    <{migration.apply.__name__}>")
+    return "\n".join(lines)
+
+
+async def _main() -> None:
+    from config import Config
+
+    parser = argparse.ArgumentParser(description="数据库结构迁移")
+    parser.add_argument("--db", default=Config.DATABASE_PATH, help="数据库路径")
+    parser.add_argument("--dry-run", action="store_true", help="只打印待执行的迁移步骤")
+    args = parser.parse_args()
+
+    async with aiosqlite.connect(args.db) as conn:
+        current = await get_schema_version(conn)
+        print(format_plan(current, get_pending(current)))
+        if args.dry_run:
+            return
+        applied = await migrate(conn)
+        print(f"已应用 {len(applied)} 个迁移，当前版本: {await get_schema_version(conn)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -3,7 +3,9 @@
 """
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Optional
+from typing import ClassVar, Optional, Tuple
+
+from utils.helpers import local_day_bounds, ms_to_datetime, now_ms
 
 
 @dataclass
@@ -11,15 +13,27 @@ class PlayerData:
     """玩家基础数据"""
     user_id: int                          # Discord用户ID
     chips: int = 0                        # 筹码余额
-    last_daily: Optional[datetime] = None # 上次签到时间
-    created_at: datetime = field(default_factory=datetime.now)
+    last_daily_ms: Optional[int] = None   # 上次签到时间（毫秒时间戳）
+    created_at_ms: int = field(default_factory=now_ms)
+    daily_streak: int = 0                 # 连续签到天数
+    
+    @property
+    def last_daily(self) -> Optional[datetime]:
+        """上次签到时间（显示用，按需转换）"""
+        if self.last_daily_ms is None:
+            return None
+        return ms_to_datetime(self.last_daily_ms)
+    
+    @property
+    def created_at(self) -> datetime:
+        return ms_to_datetime(self.created_at_ms)
     
     def can_claim_daily(self) -> bool:
-        """检查是否可以领取每日奖励"""
-        if self.last_daily is None:
+        """检查是否可以领取每日奖励（按本地自然日）"""
+        if self.last_daily_ms is None:
             return True
-        now = datetime.now()
-        return now.date() > self.last_daily.date()
+        today_start, _ = local_day_bounds()
+        return self.last_daily_ms < today_start
 
 
 @dataclass
@@ -54,6 +68,34 @@ class PlayerStats:
         return self.pvp_wins / total * 100
 
 
+@dataclass
+class StatsDelta:
+    """玩家统计增量
+    
+    计数字段在数据库中累加，最佳记录字段与数据库中的值取最大值，
+    不需要先读出整行。
+    """
+    user_id: int
+    games_played: int = 0
+    games_won: int = 0
+    pve_total_earnings: int = 0
+    pvp_wins: int = 0
+    pvp_losses: int = 0
+    pvp_total_earnings: int = 0
+    total_chips_earned: int = 0
+    total_chips_spent: int = 0
+    pve_best_stage: int = 0          # 取最大值
+    pve_best_rounds: int = 0         # 取最大值
+    pve_best_reward: int = 0         # 取最大值
+    
+    COUNTERS: ClassVar[Tuple[str, ...]] = (
+        "games_played", "games_won", "pve_total_earnings",
+        "pvp_wins", "pvp_losses", "pvp_total_earnings",
+        "total_chips_earned", "total_chips_spent",
+    )
+    MAXIMA: ClassVar[Tuple[str, ...]] = ("pve_best_stage", "pve_best_rounds", "pve_best_reward")
+
+
 @dataclass
 class TransferRecord:
     """转账记录"""
@@ -61,7 +103,36 @@ class TransferRecord:
     from_user_id: int = 0
     to_user_id: int = 0
     amount: int = 0
-    created_at: datetime = field(default_factory=datetime.now)
+    created_at_ms: int = field(default_factory=now_ms)
+    
+    @property
+    def created_at(self) -> datetime:
+        return ms_to_datetime(self.created_at_ms)
+
+
+@dataclass
+class LedgerEntry:
+    """账本流水"""
+    id: Optional[int] = None
+    user_id: int = 0
+    delta: int = 0                          # 余额变化（负数为支出）
+    reason: str = ""
+    session_id: Optional[str] = None        # 关联的游戏会话
+    counterparty_id: Optional[int] = None   # 对方用户（系统发放/扣除时为None）
+    created_at_ms: int = field(default_factory=now_ms)
+    
+    @property
+    def created_at(self) -> datetime:
+        return ms_to_datetime(self.created_at_ms)
+
+
+@dataclass
+class GrantFilter:
+    """批量发放的玩家筛选条件（同时满足，全部为None表示所有玩家）"""
+    user_ids: Optional[Tuple[int, ...]] = None  # 指定玩家
+    min_chips: Optional[int] = None             # 余额下限（含）
+    max_chips: Optional[int] = None             # 余额上限（含）
+    created_before_ms: Optional[int] = None     # 注册时间早于
 
 
 @dataclass
@@ -77,4 +148,8 @@ class GameRecord:
     stages_completed: int = 0
     total_rounds: int = 0
     duration: int = 0                 # 游戏时长（秒）
-    created_at: datetime = field(default_factory=datetime.now)
\ No newline at end of file
+    created_at_ms: int = field(default_factory=now_ms)
+    
+    @property
+    def created_at(self) -> datetime:
+        return ms_to_datetime(self.created_at_ms)
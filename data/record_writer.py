@@ -0,0 +1,94 @@
+"""
+游戏记录异步写入
+
+游戏结束时只把记录放入有界队列，由后台任务批量写入数据库，
+不增加结束界面的响应延迟。
+"""
+import asyncio
+import logging
+from typing import List, Optional
+
+from .database import Database
+from .models import GameRecord
+
+logger = logging.getLogger(__name__)
+
+
+class GameRecordWriter:
+    """游戏记录批量写入器"""
+
+    def __init__(self, database: Database, max_pending: int = 1000,
+                 batch_size: int = 100, flush_interval: float = 1.0):
+        """
+        Args:
+            database: 数据库
+            max_pending: 队列容量，写满时丢弃新记录
+            batch_size: 单次写入的最大记录数
+            flush_interval: 攒批等待时间（秒）
+        """
+        self.db = database
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "asyncio.Queue[Optional[GameRecord]]" = asyncio.Queue(maxsize=max_pending)
+        self._task: Optional[asyncio.Task] = None
+        self.written = 0    # 已写入记录数
+        self.dropped = 0    # 队列已满丢弃的记录数
+        self.conflicts = 0  # ID已存在、未写入的记录数
+
+    def start(self) -> None:
+        """启动后台写入任务"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def submit(self, record: GameRecord) -> bool:
+        """提交一条记录（不等待写入）
+
+        Returns:
+            是否已入队（队列已满返回False）
+        """
+        try:
+            self._queue.put_nowait(record)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.warning(f"游戏记录队列已满，丢弃记录 {record.id}")
+            return False
+        return True
+
+    async def _write_batch(self, batch: List[GameRecord]) -> None:
+        """写入一批记录，失败只记录日志"""
+        try:
+            inserted = await self.db.insert_game_records(batch)
+            self.written += inserted
+            if inserted < len(batch):
+                self.conflicts += len(batch) - inserted
+                logger.warning(f"{len(batch) - inserted} 条游戏记录ID已存在，未写入（本批: "
+                               f"{', '.join(record.id for record in batch)}）")
+        except Exception as e:
+            logger.error(f"写入游戏记录失败（{len(batch)}条）: {e}")
+
+    async def _run(self) -> None:
+        """后台任务：攒批后批量写入，遇到停止标记(None)时写完当前批次退出"""
+        stopping = False
+        while not stopping:
+            first = await self._queue.get()
+            if first is None:
+                break
+            if self._queue.qsize() < self.batch_size - 1:
+                await asyncio.sleep(self.flush_interval)
+
+            batch = [first]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                record = self._queue.get_nowait()
+                if record is None:
+                    stopping = True
+                    break
+                batch.append(record)
+            await self._write_batch(batch)
+
+    async def close(self) -> None:
+        """写入队列中剩余的记录并停止后台任务"""
+        if self._task is None:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
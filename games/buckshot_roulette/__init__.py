@@ -3,6 +3,7 @@
 """
 from .game import BuckshotRouletteGame
 from .session import GameSession
+from .engine import Action, ActionKind, Event, EventType, IllegalActionError, step, legal_actions
 from .player import Player
 from .shotgun import Shotgun, BulletType
 from .items import Item, ItemType, get_item, generate_items
@@ -12,6 +13,13 @@ from .ai import AIPlayer
 __all__ = [
     'BuckshotRouletteGame',
     'GameSession',
+    'Action',
+    'ActionKind',
+    'Event',
+    'EventType',
+    'IllegalActionError',
+    'step',
+    'legal_actions',
     'Player',
     'Shotgun',
     'BulletType',
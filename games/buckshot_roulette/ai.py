@@ -6,6 +6,9 @@ from typing import Dict, Any, Optional, List, TYPE_CHECKING
 
 from .items import Item, ItemType
 from .shotgun import BulletType
+from .belief import certain_bullet, live_probability
+from .solver import ExpectimaxSolver, root_state
+from .endgame import endgame_action
 from utils.constants import AIDifficulty
 from config import Config
 
@@ -13,6 +16,20 @@ if TYPE_CHECKING:
     from .session import GameSession
 
 
+# 所有搜索AI共享一个求解器（置换表可以跨对局复用）
+_solver: Optional[ExpectimaxSolver] = None
+
+
+def get_solver() -> ExpectimaxSolver:
+    """获取共享的搜索求解器"""
+    global _solver
+    if _solver is None:
+        _solver = ExpectimaxSolver(
+            Config.AI_SEARCH_TIME_BUDGET, Config.AI_SEARCH_MAX_DEPTH, Config.AI_SEARCH_TABLE_SIZE
+        )
+    return _solver
+
+
 class AIPlayer:
     """AI玩家决策系统（增强版）"""
     
@@ -28,6 +45,25 @@ class AIPlayer:
         Returns:
             动作字典 {"type": "shoot_opponent"|"shoot_self"|"use_item", ...}
         """
+        # 双方都没有道具时直接查预计算的残局表（简单AI保留失误）
+        if self.difficulty != AIDifficulty.EASY:
+            action = endgame_action(session)
+            if action is not None:
+                return {"type": action}
+        
+        # 困难及以上的AI优先使用搜索，时间预算内没有结果时使用启发式策略；
+        # 难度之间只差作弊概率（作弊时搜索中已知当前子弹），保持 困难 < 困难+ < 恶魔
+        cheat_chance = {
+            AIDifficulty.HARD: 0.0,
+            AIDifficulty.HARD_PLUS: Config.HARD_PLUS_CHEAT_CHANCE,
+            AIDifficulty.DEMON: Config.DEMON_CHEAT_CHANCE,
+        }.get(self.difficulty)
+        if cheat_chance is not None and Config.AI_SEARCH_TIME_BUDGET > 0:
+            reveal = random.random() < cheat_chance
+            decision = self._search_strategy(session, reveal)
+            if decision is not None:
+                return decision
+        
         # 根据难度决定策略
         if self.difficulty == AIDifficulty.EASY:
             return self._easy_strategy(session)
@@ -48,15 +84,10 @@ class AIPlayer:
         opponent = session.opponent
         shotgun = session.shotgun
         
-        live_prob = shotgun.get_probability_live()
+        # 当前子弹的精确后验概率（结合所有已知位置）
+        live_prob = live_probability(shotgun)
         remaining = shotgun.remaining_count()
-        
-        # 推断当前子弹
-        current_bullet = shotgun.known_bullets.get(0)
-        
-        # 如果知道其他位置的子弹，可以进行推理
-        if current_bullet is None and remaining > 0:
-            current_bullet = self._infer_current_bullet(shotgun)
+        current_bullet = certain_bullet(shotgun)
         
         # 计算双方血量危险程度
         ai_danger = ai.health <= 1
@@ -75,36 +106,6 @@ class AIPlayer:
             "is_sawed": shotgun.is_sawed,
         }
     
-    def _infer_current_bullet(self, shotgun) -> Optional[BulletType]:
-        """根据已知信息推断当前子弹"""
-        if not shotgun.magazine:
-            return None
-        
-        remaining = shotgun.remaining_count()
-        known = shotgun.known_bullets
-        
-        # 统计已知的实弹和空包弹数量
-        known_live = sum(1 for b in known.values() if b == BulletType.LIVE)
-        known_blank = sum(1 for b in known.values() if b == BulletType.BLANK)
-        
-        # 如果已知所有实弹的位置，其他位置都是空包弹
-        if known_live == shotgun.live_count and 0 not in known:
-            return BulletType.BLANK
-        
-        # 如果已知所有空包弹的位置，其他位置都是实弹
-        if known_blank == shotgun.blank_count and 0 not in known:
-            return BulletType.LIVE
-        
-        # 如果只剩一种子弹
-        if shotgun.live_count == 0:
-            return BulletType.BLANK
-        if shotgun.blank_count == 0:
-            return BulletType.LIVE
-        
-        return None
-    
-    # ============ 道具使用策略 ============
-    
     def _should_use_saw(self, session: 'GameSession', situation: Dict) -> bool:
         """判断是否应该使用手锯"""
         ai = session.current_player
@@ -400,8 +401,8 @@ class AIPlayer:
         situation = self._analyze_situation(session)
         
         # 作弊：小概率直接知道答案
-        if random.random() < Config.HARD_PLUS_CHEAT_CHANCE and shotgun.magazine:
-            actual_bullet = shotgun.magazine[0]
+        if random.random() < Config.HARD_PLUS_CHEAT_CHANCE and not shotgun.is_empty():
+            actual_bullet = shotgun.bullet_at(0)
             situation["current_bullet"] = actual_bullet
         
         # 如果对手有好道具，优先使用肾上腺素偷取
@@ -433,8 +434,8 @@ class AIPlayer:
         situation = self._analyze_situation(session)
         
         # 高概率作弊
-        if random.random() < Config.DEMON_CHEAT_CHANCE and shotgun.magazine:
-            actual_bullet = shotgun.magazine[0]
+        if random.random() < Config.DEMON_CHEAT_CHANCE and not shotgun.is_empty():
+            actual_bullet = shotgun.bullet_at(0)
             
             if actual_bullet == BulletType.BLANK:
                 # 确定是空包弹 - 考虑逆转
@@ -458,6 +459,24 @@ class AIPlayer:
         # 非作弊时使用困难+策略
         return self._hard_plus_strategy(session)
     
+    def _search_strategy(self, session: 'GameSession', reveal_current: bool = False) -> Optional[Dict[str, Any]]:
+        """搜索策略 - 期望极小极大搜索，超出时间预算返回None"""
+        action = get_solver().search(root_state(session, reveal_current))
+        if action is None:
+            return None
+        if action[0] != "use_item":
+            return {"type": action[0]}
+        
+        _, item_type, stolen_type = action
+        item = self._get_items_by_type(session.current_player.items, [item_type])[0]
+        if stolen_type is None:
+            return {"type": "use_item", "item": item}
+        
+        # 肾上腺素：目标为对手可偷取道具中的位置
+        stealable = [i for i in session.opponent.items if i.can_be_stolen]
+        target = next(i for i, stolen in enumerate(stealable) if stolen.item_type == stolen_type)
+        return {"type": "use_item", "item": item, "target": target}
+    
     # ============ 工具方法 ============
     
     def _get_items_by_type(self, items: List[Item], types: List[ItemType]) -> List[Item]:
@@ -0,0 +1,68 @@
+"""
+子弹推断 - 恶魔轮盘赌
+
+根据剩余实弹/空包弹数量和已知位置（放大镜、窃贼电话、望远镜等）计算每个位置是实弹的精确后验概率。
+
+已知位置的子弹确定；其余位置的排列在已知条件下等可能，
+因此每个未知位置是实弹的概率都等于 未知实弹数 / 未知位置数。
+结果按 (剩余数, 实弹数, 已知位图, 已知实弹位图) 缓存，AI每一步都可以直接调用。
+"""
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional, Tuple
+
+from .shotgun import BulletType
+
+if TYPE_CHECKING:
+    from .shotgun import Shotgun
+
+
+@lru_cache(maxsize=4096)
+def posterior(size: int, live: int, known_mask: int, known_live_mask: int) -> Tuple[float, ...]:
+    """每个位置是实弹的后验概率
+    
+    Args:
+        size: 剩余子弹数
+        live: 剩余实弹数
+        known_mask: 已知位置位图
+        known_live_mask: 已知位置中实弹的位图
+    """
+    unknown = size - bin(known_mask).count("1")
+    unknown_live = live - bin(known_live_mask).count("1")
+    # 已知信息与计数矛盾时（理论上不会发生）按边界截断
+    unknown_live = min(max(unknown_live, 0), unknown)
+    p = unknown_live / unknown if unknown > 0 else 0.0
+    
+    return tuple(
+        float(known_live_mask >> i & 1) if known_mask >> i & 1 else p
+        for i in range(size)
+    )
+
+
+def live_probabilities(shotgun: 'Shotgun', use_known: bool = True) -> Tuple[float, ...]:
+    """每个剩余位置是实弹的概率（0为当前子弹）
+    
+    Args:
+        shotgun: 霰弹枪
+        use_known: 是否使用已知位置信息（公开显示时应为False，避免泄露私密信息）
+    """
+    known_mask = shotgun.known_mask if use_known else 0
+    return posterior(shotgun.size, shotgun.live_count, known_mask, shotgun.pattern & known_mask)
+
+
+def live_probability(shotgun: 'Shotgun', position: int = 0, use_known: bool = True) -> float:
+    """指定位置是实弹的概率，位置无效返回0"""
+    if not 0 <= position < shotgun.size:
+        return 0.0
+    return live_probabilities(shotgun, use_known)[position]
+
+
+def certain_bullet(shotgun: 'Shotgun', position: int = 0) -> Optional[BulletType]:
+    """能够确定的子弹类型（已知或可由计数推出），无法确定返回None"""
+    if not 0 <= position < shotgun.size:
+        return None
+    p = live_probabilities(shotgun)[position]
+    if p == 1.0:
+        return BulletType.LIVE
+    if p == 0.0:
+        return BulletType.BLANK
+    return None
@@ -8,9 +8,11 @@ from typing import TYPE_CHECKING, Optional
 from utils.constants import Emoji, Colors, GameState, GameMode
 from utils.helpers import format_chips, format_duration
 from config import Config
+from .belief import live_probability
 
 if TYPE_CHECKING:
     from .session import GameSession
+    from .shotgun import Shotgun
 
 
 def create_shotgun_ascii(is_sawed: bool = False) -> str:
@@ -44,6 +46,16 @@ def create_shotgun_ascii(is_sawed: bool = False) -> str:
         )
 
 
+def format_live_hint(shotgun: 'Shotgun') -> str:
+    """当前子弹的实弹概率提示
+    
+    只使用公开的剩余数量，不使用道具查看到的位置，避免在公开消息中泄露私密信息。
+    """
+    if shotgun.is_empty():
+        return ""
+    return f" · 当前实弹概率 {live_probability(shotgun, use_known=False):.0%}"
+
+
 def create_game_embed(session: 'GameSession') -> discord.Embed:
     """创建游戏主界面Embed"""
     
@@ -98,10 +110,10 @@ def create_pve_embed(session: 'GameSession') -> discord.Embed:
     
     # 弹夹 - 普通文本
     magazine_display = shotgun.format_magazine()
-    bullet_count = len(shotgun.magazine)
+    bullet_count = shotgun.remaining_count()
     embed.add_field(
         name="💎 弹夹",
-        value=f"{magazine_display}  ({bullet_count}发)",
+        value=f"{magazine_display}  ({bullet_count}发){format_live_hint(shotgun)}",
         inline=False
     )
     
@@ -173,10 +185,10 @@ def create_pvp_embed(session: 'GameSession') -> discord.Embed:
     
     # 弹夹 - 普通文本
     magazine_display = shotgun.format_magazine()
-    bullet_count = len(shotgun.magazine)
+    bullet_count = shotgun.remaining_count()
     embed.add_field(
         name="💎 弹夹",
-        value=f"{magazine_display}  ({bullet_count}发)",
+        value=f"{magazine_display}  ({bullet_count}发){format_live_hint(shotgun)}",
         inline=False
     )
     
@@ -249,10 +261,10 @@ def create_quick_embed(session: 'GameSession') -> discord.Embed:
     
     # 弹夹 - 普通文本
     magazine_display = shotgun.format_magazine()
-    bullet_count = len(shotgun.magazine)
+    bullet_count = shotgun.remaining_count()
     embed.add_field(
         name="💎 弹夹",
-        value=f"{magazine_display}  ({bullet_count}发)",
+        value=f"{magazine_display}  ({bullet_count}发){format_live_hint(shotgun)}",
         inline=False
     )
     
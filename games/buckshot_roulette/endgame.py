@@ -0,0 +1,210 @@
+"""
+无道具残局表 - 恶魔轮盘赌
+
+双方都没有道具、没有防弹背心和手铐、也不知道任何子弹位置时，一轮游戏只剩
+(行动方生命, 对手生命, 实弹数, 空包弹数, 是否锯短) 五个变量，只能选择射击对手或射击自己。
+这个子博弈由 build_table() 用动态规划精确求解（行动方视角，换手时交换双方），
+结果写成二进制表随代码发布（endgame.bin，由 build_endgame_table.py 生成），
+运行时通过 mmap 只读映射，查一次表即可得到最优动作。
+
+弹夹打空（双方都存活）时下一轮的装填是随机的，以生命差估值：(我方 - 对方) / (我方 + 对方) / 2。
+
+文件格式（小端）：头部 "<4sHBB"（魔数、版本、生命上限、每种子弹数上限），
+随后是每个状态的最优动作（1字节，1=射击对手）和值（int16，乘以 32767）。
+"""
+import logging
+import mmap
+import os
+import struct
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional, Tuple
+
+if TYPE_CHECKING:
+    from .session import GameSession
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"BRET"
+VERSION = 1
+MAX_HP = 8          # 表中的生命值上限
+MAX_ROUNDS = 8      # 表中每种子弹的数量上限
+DEFAULT_TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "endgame.bin")
+
+_HEADER = struct.Struct("<4sHBB")
+_VALUE = struct.Struct("<h")
+_VALUE_SCALE = 32767
+
+
+def _index(hp: int, opp_hp: int, live: int, blank: int, sawed: bool, max_hp: int, max_rounds: int) -> int:
+    return (((hp * (max_hp + 1) + opp_hp) * (max_rounds + 1) + live) * (max_rounds + 1) + blank) * 2 + sawed
+
+
+def _round_end_value(hp: int, opp_hp: int) -> float:
+    """弹夹打空、双方存活时的估值（行动方视角）"""
+    return 0.5 * (hp - opp_hp) / (hp + opp_hp)
+
+
+def solve(max_hp: int = MAX_HP, max_rounds: int = MAX_ROUNDS):
+    """动态规划求解无道具残局
+    
+    Returns:
+        函数 (生命, 对手生命, 实弹, 空包弹, 锯短) -> (值, 是否射击对手)
+    """
+    @lru_cache(maxsize=None)
+    def value(hp: int, opp_hp: int, live: int, blank: int, sawed: bool) -> Tuple[float, bool]:
+        total = live + blank
+        if total == 0:
+            return _round_end_value(hp, opp_hp), True
+        p_live = live / total
+        damage = 2 if sawed else 1
+        last = total == 1
+        
+        # 射击对手：无论结果如何都换手
+        shoot_opponent = 0.0
+        if live:
+            hit = opp_hp - damage
+            if hit <= 0:
+                outcome = 1.0
+            elif last:
+                outcome = _round_end_value(hp, hit)
+            else:
+                outcome = -value(hit, hp, live - 1, blank, False)[0]
+            shoot_opponent += p_live * outcome
+        if blank:
+            if last:
+                outcome = _round_end_value(hp, opp_hp)
+            else:
+                outcome = -value(opp_hp, hp, live, blank - 1, False)[0]
+            shoot_opponent += (1 - p_live) * outcome
+        
+        # 射击自己：实弹换手，空包弹继续行动
+        shoot_self = 0.0
+        if live:
+            hurt = hp - damage
+            if hurt <= 0:
+                outcome = -1.0
+            elif last:
+                outcome = _round_end_value(hurt, opp_hp)
+            else:
+                outcome = -value(opp_hp, hurt, live - 1, blank, False)[0]
+            shoot_self += p_live * outcome
+        if blank:
+            if last:
+                outcome = _round_end_value(hp, opp_hp)
+            else:
+                outcome = value(hp, opp_hp, live, blank - 1, False)[0]
+            shoot_self += (1 - p_live) * outcome
+        
+        if shoot_opponent >= shoot_self:
+            return shoot_opponent, True
+        return shoot_self, False
+    
+    return value
+
+
+def build_table(path: str = DEFAULT_TABLE_PATH, max_hp: int = MAX_HP, max_rounds: int = MAX_ROUNDS) -> int:
+    """求解并写出残局表
+    
+    Returns:
+        状态数
+    """
+    value = solve(max_hp, max_rounds)
+    count = (max_hp + 1) ** 2 * (max_rounds + 1) ** 2 * 2
+    actions = bytearray(count)
+    values = bytearray(count * _VALUE.size)
+    for hp in range(1, max_hp + 1):
+        for opp_hp in range(1, max_hp + 1):
+            for live in range(max_rounds + 1):
+                for blank in range(max_rounds + 1):
+                    for sawed in (False, True):
+                        index = _index(hp, opp_hp, live, blank, sawed, max_hp, max_rounds)
+                        v, shoot_opponent = value(hp, opp_hp, live, blank, sawed)
+                        actions[index] = shoot_opponent
+                        _VALUE.pack_into(values, index * _VALUE.size, round(v * _VALUE_SCALE))
+    
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, max_hp, max_rounds))
+        f.write(actions)
+        f.write(values)
+    os.replace(tmp_path, path)
+    return count
+
+
+class EndgameTable:
+    """mmap 映射的残局表"""
+    
+    def __init__(self, path: str = DEFAULT_TABLE_PATH):
+        """
+        Raises:
+            OSError: 文件不存在或无法读取
+            ValueError: 文件格式不正确
+        """
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.max_hp, self.max_rounds = _HEADER.unpack_from(self._map)
+        self._count = (self.max_hp + 1) ** 2 * (self.max_rounds + 1) ** 2 * 2
+        if magic != MAGIC or version != VERSION or len(self._map) != _HEADER.size + self._count * 3:
+            self._map.close()
+            raise ValueError(f"残局表格式不正确: {path}")
+    
+    def lookup(self, hp: int, opp_hp: int, live: int, blank: int, sawed: bool) -> Optional[Tuple[bool, float]]:
+        """查询最优动作
+        
+        Returns:
+            (是否射击对手, 行动方视角的值)，超出表范围返回None
+        """
+        if not (0 < hp <= self.max_hp and 0 < opp_hp <= self.max_hp
+                and 0 <= live <= self.max_rounds and 0 <= blank <= self.max_rounds
+                and live + blank > 0):
+            return None
+        index = _index(hp, opp_hp, live, blank, sawed, self.max_hp, self.max_rounds)
+        shoot_opponent = self._map[_HEADER.size + index] == 1
+        value = _VALUE.unpack_from(self._map, _HEADER.size + self._count + index * _VALUE.size)[0]
+        return shoot_opponent, value / _VALUE_SCALE
+    
+    def close(self) -> None:
+        self._map.close()
+
+
+_table: Optional[EndgameTable] = None
+_load_failed = False
+
+
+def get_table() -> Optional[EndgameTable]:
+    """获取残局表（首次调用时映射，文件缺失时返回None）"""
+    global _table, _load_failed
+    if _table is None and not _load_failed:
+        try:
+            _table = EndgameTable()
+        except (OSError, ValueError) as e:
+            _load_failed = True
+            logger.warning(f"无法加载残局表，AI将使用启发式策略（运行 build_endgame_table.py 生成）: {e}")
+    return _table
+
+
+def endgame_action(session: 'GameSession') -> Optional[str]:
+    """无道具残局的最优动作
+    
+    Returns:
+        "shoot_opponent" / "shoot_self"，不属于无道具残局时返回None
+    """
+    me, opponent, shotgun = session.current_player, session.opponent, session.shotgun
+    if (me.items or opponent.items or me.has_vest or opponent.has_vest
+            or me.is_handcuffed or opponent.is_handcuffed or shotgun.is_empty()):
+        return None
+    
+    # 当前子弹已知时直接决定：实弹打对手，空包弹打自己（额外回合）
+    if shotgun.known_mask & 1:
+        return "shoot_opponent" if shotgun.pattern & 1 else "shoot_self"
+    if shotgun.known_mask:
+        return None
+    
+    table = get_table()
+    if table is None:
+        return None
+    result = table.lookup(me.health + me.overheal, opponent.health + opponent.overheal,
+                          shotgun.live_count, shotgun.blank_count, shotgun.is_sawed)
+    if result is None:
+        return None
+    return "shoot_opponent" if result[0] else "shoot_self"
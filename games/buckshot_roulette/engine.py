@@ -0,0 +1,224 @@
+"""
+游戏引擎 - 恶魔轮盘赌
+
+不依赖Discord的纯逻辑入口：step(session, action) 执行一个动作，返回发生的事件列表。
+回合切换、装填、阶段完成和游戏结束都在这里推进；game.py 只负责把事件渲染成界面、
+发放奖励和记录统计。模拟、压测和AI自我对弈直接循环调用 step 即可。
+
+轮次结束（弹夹打空或有人死亡）后引擎停在装填状态，需要再执行一次 RELOAD 动作
+才会结算并开始下一轮，界面层借此在两者之间停顿展示结果。
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from enum import Enum
+from typing import List, Optional
+
+from .session import GameSession, ActionResult
+from .items import Item
+from utils.constants import GameMode, GameState
+
+
+class ActionKind(Enum):
+    """动作类型"""
+    SHOOT_OPPONENT = "shoot_opponent"
+    SHOOT_SELF = "shoot_self"
+    USE_ITEM = "use_item"
+    RELOAD = "reload"        # 轮次结束后结算并装填
+    CONTINUE = "continue"    # PvE阶段完成后继续挑战
+    RETREAT = "retreat"      # PvE阶段完成后撤离
+
+
+@dataclass(frozen=True)
+class Action:
+    """玩家动作（道具按当前玩家道具栏中的位置引用）"""
+    kind: ActionKind
+    item_index: Optional[int] = None    # 使用的道具位置
+    target_index: Optional[int] = None  # 道具目标（肾上腺素偷取的道具位置）
+    
+    @classmethod
+    def shoot_opponent(cls) -> 'Action':
+        return cls(ActionKind.SHOOT_OPPONENT)
+    
+    @classmethod
+    def shoot_self(cls) -> 'Action':
+        return cls(ActionKind.SHOOT_SELF)
+    
+    @classmethod
+    def use_item(cls, item_index: int, target_index: Optional[int] = None) -> 'Action':
+        return cls(ActionKind.USE_ITEM, item_index, target_index)
+    
+    @classmethod
+    def reload(cls) -> 'Action':
+        return cls(ActionKind.RELOAD)
+    
+    @classmethod
+    def continue_(cls) -> 'Action':
+        return cls(ActionKind.CONTINUE)
+    
+    @classmethod
+    def retreat(cls) -> 'Action':
+        return cls(ActionKind.RETREAT)
+
+
+class EventType(Enum):
+    """事件类型"""
+    ACTION = "action"                  # 动作结果（result）
+    TURN_CHANGED = "turn_changed"      # 轮到 player_index 行动（包括额外回合）
+    ROUND_OVER = "round_over"          # 轮次结束，等待 RELOAD
+    RELOADED = "reloaded"              # 新一轮装填完成（live, blank）
+    STAGE_COMPLETE = "stage_complete"  # PvE阶段完成，等待 CONTINUE 或 RETREAT
+    GAME_OVER = "game_over"            # 游戏结束（player_index 为胜者，None表示无胜者）
+
+
+@dataclass(frozen=True)
+class Event:
+    """引擎事件"""
+    type: EventType
+    player_index: Optional[int] = None
+    result: Optional[ActionResult] = None
+    live: int = 0
+    blank: int = 0
+    reward: int = 0           # 撤离奖励
+    retreated: bool = False
+
+
+class IllegalActionError(Exception):
+    """当前状态下不允许的动作"""
+    pass
+
+
+def item_action(session: GameSession, item: Item, target_index: Optional[int] = None) -> Action:
+    """把道具对象转换为使用道具的动作
+    
+    按对象身份查找位置（同类道具相等，但被干扰的只有其中一个）
+    """
+    for index, owned in enumerate(session.current_player.items):
+        if owned is item:
+            return Action.use_item(index, target_index)
+    raise IllegalActionError("当前玩家没有这个道具")
+
+
+def legal_actions(session: GameSession) -> List[Action]:
+    """当前状态下可以执行的动作"""
+    if session.state == GameState.STAGE_COMPLETE:
+        return [Action.continue_(), Action.retreat()]
+    if session.state != GameState.PLAYING:
+        return []
+    if session.is_reloading:
+        return [Action.reload()]
+    actions = [Action.shoot_opponent(), Action.shoot_self()]
+    actions.extend(Action.use_item(i) for i in range(len(session.current_player.items)))
+    return actions
+
+
+def ai_level(session: GameSession) -> str:
+    """当前AI难度（快速模式使用指定难度，其他模式使用阶段难度）"""
+    if session.mode == GameMode.QUICK and session.ai_difficulty:
+        return session.ai_difficulty
+    return session.stage_manager.get_ai_level()
+
+
+def ai_action(session: GameSession, level: Optional[str] = None) -> Action:
+    """由AI为当前玩家决定动作
+    
+    Args:
+        session: 游戏会话
+        level: AI难度，默认按 ai_level(session)
+    """
+    from .ai import AIPlayer
+    
+    decision = AIPlayer(level or ai_level(session)).decide_action(session)
+    if decision["type"] == "shoot_self":
+        return Action.shoot_self()
+    if decision["type"] == "use_item":
+        return item_action(session, decision["item"], decision.get("target"))
+    # 默认射击对手
+    return Action.shoot_opponent()
+
+
+def step(session: GameSession, action: Action) -> List[Event]:
+    """执行一个动作并推进游戏状态
+    
+    Args:
+        session: 游戏会话（原地修改）
+        action: 动作
+    
+    Returns:
+        按发生顺序排列的事件
+    
+    Raises:
+        IllegalActionError: 当前状态下不允许该动作
+    """
+    kind = action.kind
+    
+    if kind in (ActionKind.CONTINUE, ActionKind.RETREAT):
+        if session.state != GameState.STAGE_COMPLETE:
+            raise IllegalActionError("只能在阶段完成后继续或撤离")
+        if kind == ActionKind.RETREAT:
+            reward = session.handle_retreat()
+            return [Event(EventType.GAME_OVER, _winner_index(session), reward=reward, retreated=True)]
+        session.handle_continue()
+        return [
+            Event(EventType.RELOADED, live=session.shotgun.live_count, blank=session.shotgun.blank_count),
+            Event(EventType.TURN_CHANGED, session.current_turn),
+        ]
+    
+    if session.state != GameState.PLAYING:
+        raise IllegalActionError("游戏不在进行中")
+    
+    if kind == ActionKind.RELOAD:
+        if not session.is_reloading:
+            raise IllegalActionError("当前不需要装填")
+        session.is_reloading = False
+        session.handle_round_end()
+        return _after_round_end(session)
+    
+    if session.is_reloading:
+        raise IllegalActionError("正在装填")
+    
+    actor = session.current_turn
+    if kind == ActionKind.SHOOT_OPPONENT:
+        result = session.shoot_opponent()
+    elif kind == ActionKind.SHOOT_SELF:
+        result = session.shoot_self()
+    else:
+        items = session.current_player.items
+        if action.item_index is None or not 0 <= action.item_index < len(items):
+            raise IllegalActionError("道具位置无效")
+        result = session.use_item(items[action.item_index], action.target_index)
+    
+    events = [Event(EventType.ACTION, actor, result=result)]
+    
+    if result.game_over:
+        session.state = GameState.ENDED
+        session.ended_at = datetime.now()
+        events.append(Event(EventType.GAME_OVER, _winner_index(session)))
+        return events
+    
+    # 切换回合（除非获得额外回合），弹夹打空时也先切换，保证回合顺序一致
+    if not result.extra_turn:
+        session.next_turn()
+    
+    if result.round_over:
+        session.is_reloading = True
+        events.append(Event(EventType.ROUND_OVER, session.current_turn))
+    else:
+        events.append(Event(EventType.TURN_CHANGED, session.current_turn))
+    return events
+
+
+def _after_round_end(session: GameSession) -> List[Event]:
+    """轮次结算后的事件"""
+    if session.state == GameState.STAGE_COMPLETE:
+        return [Event(EventType.STAGE_COMPLETE, session.current_turn)]
+    if session.state == GameState.ENDED:
+        return [Event(EventType.GAME_OVER, _winner_index(session))]
+    return [
+        Event(EventType.RELOADED, live=session.shotgun.live_count, blank=session.shotgun.blank_count),
+        Event(EventType.TURN_CHANGED, session.current_turn),
+    ]
+
+
+def _winner_index(session: GameSession) -> Optional[int]:
+    winner = session.get_winner()
+    return session.players.index(winner) if winner is not None else None
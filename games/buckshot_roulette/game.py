@@ -1,16 +1,24 @@
 """
 游戏主逻辑 - 恶魔轮盘赌
+
+Discord适配层：把按钮操作转换为引擎动作，渲染引擎返回的事件，并处理奖励和统计。
+游戏规则本身在 engine.py / session.py 中，不依赖Discord。
 """
 import discord
 import asyncio
-from typing import Dict, Optional, TYPE_CHECKING
+from typing import Dict, List, Optional, TYPE_CHECKING
+
+from discord import ui
 
-from .session import GameSession, ActionResult
+from .session import GameSession
+from .engine import Action, Event, EventType, IllegalActionError, ai_action, item_action, step
 from .player import Player
 from .items import Item
 from .embeds import create_game_embed, create_stage_complete_embed, create_game_over_embed
 from .views import GameView, StageCompleteView, GameOverView
 from utils.constants import GameMode, GameState
+from data.database import DeductResult
+from data.models import GameRecord, StatsDelta
 from config import Config
 
 if TYPE_CHECKING:
@@ -24,6 +32,7 @@ class BuckshotRouletteGame:
         self.bot = bot
         self.sessions: Dict[str, GameSession] = {}  # session_id -> session
         self.user_sessions: Dict[int, str] = {}     # user_id -> session_id
+        self.views: Dict[str, ui.View] = {}         # session_id -> 当前活动的视图
     
     def get_session_by_user(self, user_id: int) -> Optional[GameSession]:
         """通过用户ID获取会话"""
@@ -32,16 +41,50 @@ class BuckshotRouletteGame:
             return self.sessions.get(session_id)
         return None
     
+    def _start_lock(self, *user_ids: int):
+        """开局锁：从检查是否已在游戏中一直持有到登记会话，防止连点开出两局、扣两次入场费"""
+        return self.bot.locks.hold(*(("start", user_id) for user_id in user_ids))
+    
     def create_session(self, mode: str) -> GameSession:
         """创建新会话"""
         session = GameSession(mode=mode)
         self.sessions[session.id] = session
         return session
     
+    def set_current_view(self, session: GameSession, view: ui.View) -> None:
+        """设置会话当前活动的视图，并停止旧视图（防止旧视图超时触发删除）
+        
+        Args:
+            session: 游戏会话
+            view: 新的视图
+        """
+        old_view = self.views.get(session.id)
+        if old_view is not None:
+            try:
+                old_view.stop()
+            except:
+                pass
+        self.views[session.id] = view
+    
+    def sweep_sessions(self) -> int:
+        """清理无人操作的会话（当前界面已超时），释放玩家占用
+        
+        Returns:
+            清理的会话数
+        """
+        abandoned = [
+            session for session in self.sessions.values()
+            if session.id in self.views and self.views[session.id].is_finished()
+        ]
+        for session in abandoned:
+            self.remove_session(session)
+        return len(abandoned)
+    
     def remove_session(self, session: GameSession) -> None:
         """移除会话"""
         if session.id in self.sessions:
             del self.sessions[session.id]
+        self.views.pop(session.id, None)
         
         for player in session.players:
             if player.user_id in self.user_sessions:
@@ -51,43 +94,48 @@ class BuckshotRouletteGame:
         """开始PvE游戏"""
         user_id = interaction.user.id
         
-        # 检查是否已在游戏中
-        existing = self.get_session_by_user(user_id)
-        if existing:
-            await interaction.response.send_message(
-                "你已经在一局游戏中了！",
-                ephemeral=True
-            )
-            return
-        
-        # 检查并扣除入场费
-        success = await self.bot.economy.deduct_chips(user_id, Config.PVE_ENTRY_FEE, "PvE入场费")
-        if not success:
-            await interaction.response.send_message(
-                f"余额不足！需要 {Config.PVE_ENTRY_FEE} 🎰 入场费",
-                ephemeral=True
+        async with self._start_lock(user_id):
+            # 检查是否已在游戏中
+            existing = self.get_session_by_user(user_id)
+            if existing:
+                await interaction.response.send_message(
+                    "你已经在一局游戏中了！",
+                    ephemeral=True
+                )
+                return
+            
+            # 创建会话（账本流水关联会话ID）
+            session = self.create_session(GameMode.PVE)
+            
+            # 检查并扣除入场费（每次点击都是新的交互，没有可复用的幂等键；
+            # 重复扣费由开局锁和上面的会话检查避免）
+            success = await self.bot.economy.deduct_chips(
+                user_id, Config.PVE_ENTRY_FEE, "PvE入场费",
+                session_id=session.id
             )
-            return
-        
-        # 创建会话
-        session = self.create_session(GameMode.PVE)
-        session.initialize_pve(user_id, interaction.user.display_name)
-        session.channel_id = interaction.channel_id
-        
-        # 记录用户会话
-        self.user_sessions[user_id] = session.id
-        
-        # 开始第一轮
-        session.start_round()
-        
-        # 发送游戏界面
-        embed = create_game_embed(session)
-        view = GameView(self, session, user_id)
-        session.set_current_view(view)  # 注册当前视图
-        
-        await interaction.response.send_message(embed=embed, view=view)
-        view.message = await interaction.original_response()
-        session.message_id = view.message.id
+            if not success:
+                self.remove_session(session)
+                await interaction.response.send_message(
+                    f"余额不足！需要 {Config.PVE_ENTRY_FEE} 🎰 入场费",
+                    ephemeral=True
+                )
+                return
+            
+            session.initialize_pve(user_id, interaction.user.display_name)
+            
+            # 记录用户会话
+            self.user_sessions[user_id] = session.id
+            
+            # 开始第一轮
+            session.start_round()
+            
+            # 发送游戏界面
+            embed = create_game_embed(session)
+            view = GameView(self, session, user_id)
+            self.set_current_view(session, view)  # 注册当前视图
+            
+            await interaction.response.send_message(embed=embed, view=view)
+            view.message = await interaction.original_response()
     
     async def start_quick_game(self, interaction: discord.Interaction, difficulty: str = "normal") -> None:
         """开始快速游戏
@@ -98,99 +146,117 @@ class BuckshotRouletteGame:
         """
         user_id = interaction.user.id
         
-        # 检查是否已在游戏中
-        existing = self.get_session_by_user(user_id)
-        if existing:
-            await interaction.response.send_message(
-                "你已经在一局游戏中了！",
-                ephemeral=True
-            )
-            return
-        
-        # 获取难度配置
-        diff_config = Config.QUICK_DIFFICULTY_CONFIG.get(difficulty, Config.QUICK_DIFFICULTY_CONFIG["normal"])
-        entry_fee = diff_config["entry_fee"]
-        
-        # 检查并扣除入场费
-        success = await self.bot.economy.deduct_chips(user_id, entry_fee, f"快速模式入场费({diff_config['name']})")
-        if not success:
-            await interaction.response.send_message(
-                f"余额不足！需要 {entry_fee} 🎰 入场费",
-                ephemeral=True
+        async with self._start_lock(user_id):
+            # 检查是否已在游戏中
+            existing = self.get_session_by_user(user_id)
+            if existing:
+                await interaction.response.send_message(
+                    "你已经在一局游戏中了！",
+                    ephemeral=True
+                )
+                return
+            
+            # 获取难度配置
+            diff_config = Config.QUICK_DIFFICULTY_CONFIG.get(difficulty, Config.QUICK_DIFFICULTY_CONFIG["normal"])
+            entry_fee = diff_config["entry_fee"]
+            
+            # 创建会话（账本流水关联会话ID）
+            session = self.create_session(GameMode.QUICK)
+            
+            # 检查并扣除入场费（重复扣费由开局锁避免，同上）
+            success = await self.bot.economy.deduct_chips(
+                user_id, entry_fee, f"快速模式入场费({diff_config['name']})",
+                session_id=session.id
             )
-            return
-        
-        # 创建会话
-        session = self.create_session(GameMode.QUICK)
-        session.initialize_quick(user_id, interaction.user.display_name, difficulty)
-        session.channel_id = interaction.channel_id
-        
-        # 记录用户会话
-        self.user_sessions[user_id] = session.id
-        
-        # 开始游戏
-        session.start_round()
-        
-        # 发送游戏界面
-        embed = create_game_embed(session)
-        view = GameView(self, session, user_id)
-        session.set_current_view(view)  # 注册当前视图
-        
-        await interaction.response.send_message(embed=embed, view=view)
-        view.message = await interaction.original_response()
-        session.message_id = view.message.id
+            if not success:
+                self.remove_session(session)
+                await interaction.response.send_message(
+                    f"余额不足！需要 {entry_fee} 🎰 入场费",
+                    ephemeral=True
+                )
+                return
+            
+            session.initialize_quick(user_id, interaction.user.display_name, difficulty)
+            
+            # 记录用户会话
+            self.user_sessions[user_id] = session.id
+            
+            # 开始游戏
+            session.start_round()
+            
+            # 发送游戏界面
+            embed = create_game_embed(session)
+            view = GameView(self, session, user_id)
+            self.set_current_view(session, view)  # 注册当前视图
+            
+            await interaction.response.send_message(embed=embed, view=view)
+            view.message = await interaction.original_response()
     
     async def start_pvp_game(self, interaction: discord.Interaction,
-                             player1_id: int, player2_id: int, bet: int) -> None:
-        """开始PvP游戏"""
-        # 扣除双方押注
-        success1 = await self.bot.economy.deduct_chips(player1_id, bet, "PvP押注")
-        success2 = await self.bot.economy.deduct_chips(player2_id, bet, "PvP押注")
+                             player1_id: int, player2_id: int, bet: int,
+                             challenge_id: Optional[int] = None) -> None:
+        """开始PvP游戏
         
-        if not success1 or not success2:
-            # 退还已扣除的
-            if success1:
-                await self.bot.economy.add_chips(player1_id, bet, "PvP押注退还")
-            if success2:
-                await self.bot.economy.add_chips(player2_id, bet, "PvP押注退还")
-            
-            await interaction.followup.send(
-                "押注失败，余额不足！",
-                ephemeral=True
+        Args:
+            challenge_id: 挑战消息ID，作为押注的幂等键，重复接受同一挑战只扣一次
+        """
+        async with self._start_lock(player1_id, player2_id):
+            if self.get_session_by_user(player1_id) or self.get_session_by_user(player2_id):
+                await interaction.followup.send(
+                    "有玩家已经在一局游戏中了！",
+                    ephemeral=True
+                )
+                return
+            
+            # 创建会话（账本流水关联会话ID）
+            session = self.create_session(GameMode.PVP)
+            
+            # 扣除双方押注（同一事务，任一方余额不足则都不扣）
+            stake_key = f"pvp-stake:{challenge_id}" if challenge_id is not None else f"stake:{session.id}"
+            result = await self.bot.economy.deduct_many(
+                {player1_id: bet, player2_id: bet}, "PvP押注",
+                session_id=session.id, key=stake_key
             )
-            return
-        
-        # 获取玩家名称
-        try:
-            user1 = await self.bot.fetch_user(player1_id)
-            user2 = await self.bot.fetch_user(player2_id)
-            name1 = user1.display_name
-            name2 = user2.display_name
-        except:
-            name1 = f"玩家{player1_id}"
-            name2 = f"玩家{player2_id}"
-        
-        # 创建会话
-        session = self.create_session(GameMode.PVP)
-        session.initialize_pvp(player1_id, name1, player2_id, name2, bet)
-        session.channel_id = interaction.channel_id
-        
-        # 记录用户会话
-        self.user_sessions[player1_id] = session.id
-        self.user_sessions[player2_id] = session.id
-        
-        # 开始第一轮
-        session.start_round()
-        
-        # 发送游戏界面
-        embed = create_game_embed(session)
-        current_user_id = session.current_player.user_id
-        view = GameView(self, session, current_user_id)
-        session.set_current_view(view)  # 注册当前视图
-        
-        message = await interaction.followup.send(embed=embed, view=view)
-        view.message = message
-        session.message_id = message.id
+            
+            if result == DeductResult.INSUFFICIENT:
+                self.remove_session(session)
+                await interaction.followup.send(
+                    "押注失败，余额不足！",
+                    ephemeral=True
+                )
+                return
+            
+            # 同一挑战被重复接受时押注没有再扣，不能开局（否则会凭空支付奖池）
+            if result == DeductResult.REPLAYED:
+                self.remove_session(session)
+                await interaction.followup.send(
+                    "这个挑战已经被接受过了！",
+                    ephemeral=True
+                )
+                return
+            
+            # 记录用户会话
+            self.user_sessions[player1_id] = session.id
+            self.user_sessions[player2_id] = session.id
+            
+            # 获取玩家名称
+            names = await self.bot.user_names.resolve_many([player1_id, player2_id])
+            name1 = names.get(player1_id, f"玩家{player1_id}")
+            name2 = names.get(player2_id, f"玩家{player2_id}")
+            
+            session.initialize_pvp(player1_id, name1, player2_id, name2, bet)
+            
+            # 开始第一轮
+            session.start_round()
+            
+            # 发送游戏界面
+            embed = create_game_embed(session)
+            current_user_id = session.current_player.user_id
+            view = GameView(self, session, current_user_id)
+            self.set_current_view(session, view)  # 注册当前视图
+            
+            message = await interaction.followup.send(embed=embed, view=view)
+            view.message = message
     
     async def start_new_game(self, interaction: discord.Interaction, mode: str) -> None:
         """开始新游戏（再来一局）"""
@@ -207,92 +273,84 @@ class BuckshotRouletteGame:
     async def handle_shoot_opponent(self, session: GameSession, 
                                     interaction: discord.Interaction) -> None:
         """处理射击对手"""
-        result = session.shoot_opponent()
-        
-        await self._process_action_result(session, interaction, result)
+        await self._apply_action(session, interaction, Action.shoot_opponent())
     
     async def handle_shoot_self(self, session: GameSession,
                                 interaction: discord.Interaction) -> None:
         """处理射击自己"""
-        result = session.shoot_self()
-        
-        await self._process_action_result(session, interaction, result)
+        await self._apply_action(session, interaction, Action.shoot_self())
     
     async def handle_use_item(self, session: GameSession,
                               interaction: discord.Interaction,
                               item: Item, target_index: Optional[int] = None) -> None:
         """处理使用道具"""
-        result = session.use_item(item, target_index)
-        
-        # 如果有私密信息，通过 ephemeral 消息发送给使用者
-        if result.private_info:
-            try:
-                await interaction.followup.send(
-                    f"🔒 **私密信息**\n{result.private_info}",
-                    ephemeral=True
-                )
-            except:
-                pass
+        try:
+            action = item_action(session, item, target_index)
+        except IllegalActionError:
+            return
         
-        await self._process_action_result(session, interaction, result)
+        await self._apply_action(session, interaction, action)
     
-    async def _process_action_result(self, session: GameSession,
-                                     interaction: discord.Interaction,
-                                     result: ActionResult) -> None:
-        """处理动作结果"""
-        if result.game_over:
-            await self._handle_game_over(session, interaction)
+    async def _apply_action(self, session: GameSession,
+                            interaction: discord.Interaction,
+                            action: Action) -> None:
+        """执行引擎动作并渲染事件"""
+        try:
+            events = step(session, action)
+        except IllegalActionError:
+            # 旧界面上的操作（如装填中、游戏已结束），忽略
             return
         
-        if result.round_over:
-            # 弹夹打空时，先切换回合（除非获得额外回合）
-            # 这确保了无论弹夹是否打空，回合切换逻辑都一致
-            if not result.extra_turn:
-                session.next_turn()
-            
-            # 设置装填状态，锁定按钮
-            session.is_reloading = True
-            
-            # 先更新一次界面，显示最后的动作结果（按钮已禁用）
-            await self._update_game_view(session, interaction)
-            
-            # 等待一段时间让玩家看到结果，再进行装填
-            await asyncio.sleep(Config.RELOAD_DELAY)
-            
-            stage_complete = session.handle_round_end()
+        await self._render_events(session, interaction, events)
+    
+    async def _render_events(self, session: GameSession,
+                             interaction: discord.Interaction,
+                             events: List[Event]) -> None:
+        """渲染引擎事件"""
+        reloaded = False
+        for event in events:
+            if event.type == EventType.ACTION:
+                # 如果有私密信息，通过 ephemeral 消息发送给使用者（AI的不发送）
+                result = event.result
+                if result.private_info and not session.players[event.player_index].is_ai:
+                    try:
+                        await interaction.followup.send(
+                            f"🔒 **私密信息**\n{result.private_info}",
+                            ephemeral=True
+                        )
+                    except:
+                        pass
             
-            # 装填完成，解除锁定
-            session.is_reloading = False
+            elif event.type == EventType.GAME_OVER:
+                await self._handle_game_over(session, interaction)
+                return
             
-            if session.state == GameState.STAGE_COMPLETE:
+            elif event.type == EventType.STAGE_COMPLETE:
                 await self._show_stage_complete(session, interaction)
                 return
-            elif session.state == GameState.ENDED:
-                await self._handle_game_over(session, interaction)
-                return
             
-            # 发送装填通知消息（30秒后删除）
-            await self._send_reload_notification(session, interaction)
+            elif event.type == EventType.ROUND_OVER:
+                # 先更新一次界面，显示最后的动作结果（装填中按钮已禁用）
+                await self._update_game_view(session, interaction)
+                
+                # 等待一段时间让玩家看到结果，再进行装填
+                await asyncio.sleep(Config.RELOAD_DELAY)
+                await self._apply_action(session, interaction, Action.reload())
+                return
             
-            # 新一轮已经开始，直接更新界面
-            await self._update_game_view(session, interaction)
+            elif event.type == EventType.RELOADED:
+                # 发送装填通知消息（30秒后删除）
+                await self._send_reload_notification(interaction, event.live, event.blank)
+                reloaded = True
             
-            # 如果是AI回合，先等待让玩家看到装填信息，再执行AI动作
-            if session.current_player.is_ai:
-                await asyncio.sleep(Config.RELOAD_DELAY)  # 额外等待让玩家看到装填信息
-                await self._execute_ai_turn(session, interaction)
-            return
-        
-        # 切换回合（除非获得额外回合）
-        if not result.extra_turn:
-            session.next_turn()
-        
-        # 更新界面
-        await self._update_game_view(session, interaction)
-        
-        # 如果是AI回合，执行AI动作
-        if session.current_player.is_ai:
-            await self._execute_ai_turn(session, interaction)
+            elif event.type == EventType.TURN_CHANGED:
+                await self._update_game_view(session, interaction)
+                
+                # 如果是AI回合，执行AI动作
+                if session.current_player.is_ai:
+                    if reloaded:
+                        await asyncio.sleep(Config.RELOAD_DELAY)  # 额外等待让玩家看到装填信息
+                    await self._execute_ai_turn(session, interaction)
     
     async def _update_game_view(self, session: GameSession,
                                 interaction: discord.Interaction) -> None:
@@ -303,7 +361,7 @@ class BuckshotRouletteGame:
             current_user_id = session.human_player.user_id
         
         view = GameView(self, session, current_user_id)
-        session.set_current_view(view)  # 注册当前视图，停止旧视图
+        self.set_current_view(session, view)  # 注册当前视图，停止旧视图
         
         try:
             await interaction.edit_original_response(embed=embed, view=view)
@@ -320,28 +378,18 @@ class BuckshotRouletteGame:
                             f"🔔 <@{current_player.user_id}> 轮到你行动了！"
                         )
                         # 5秒后自动删除提醒消息
-                        asyncio.create_task(self._delete_after(mention_msg, 5))
+                        self.bot.delete_later(mention_msg, 5)
                 except:
                     pass
         except:
             pass
     
-    async def _delete_after(self, message: discord.Message, delay: int) -> None:
-        """延迟删除消息"""
-        await asyncio.sleep(delay)
-        try:
-            await message.delete()
-        except:
-            pass
-    
-    async def _send_reload_notification(self, session: GameSession,
-                                        interaction: discord.Interaction) -> None:
+    async def _send_reload_notification(self, interaction: discord.Interaction,
+                                        live: int, blank: int) -> None:
         """发送装填通知消息（30秒后删除）"""
         try:
             channel = interaction.channel
             if channel:
-                live = session.shotgun.live_count
-                blank = session.shotgun.blank_count
                 total = live + blank
                 
                 # 创建装填通知嵌入消息
@@ -354,7 +402,7 @@ class BuckshotRouletteGame:
                 
                 reload_msg = await channel.send(embed=embed)
                 # 30秒后自动删除
-                asyncio.create_task(self._delete_after(reload_msg, 30))
+                self.bot.delete_later(reload_msg, 30)
         except:
             pass
     
@@ -363,7 +411,7 @@ class BuckshotRouletteGame:
         """显示阶段完成界面"""
         embed = create_stage_complete_embed(session)
         view = StageCompleteView(self, session, session.human_player.user_id)
-        session.set_current_view(view)  # 注册当前视图
+        self.set_current_view(session, view)  # 注册当前视图
         
         try:
             await interaction.edit_original_response(embed=embed, view=view)
@@ -378,23 +426,31 @@ class BuckshotRouletteGame:
         
         winner = session.get_winner()
         human = session.human_player
+        reward = 0
         
         # 计算奖励
         if session.mode == GameMode.PVE:
             won = winner and not winner.is_ai
             if won and session.accumulated_reward > 0:
+                reward = session.accumulated_reward
                 await self.bot.economy.add_chips(
                     human.user_id, 
                     session.accumulated_reward,
-                    "PvE奖励"
+                    "PvE奖励",
+                    session_id=session.id,
+                    key=f"payout:{session.id}:{human.user_id}"
                 )
         elif session.mode == GameMode.PVP:
             if winner:
-                total_pot = session.bet_amount * 2
+                total_pot = reward = session.bet_amount * 2
+                loser = next((p for p in session.players if p.user_id != winner.user_id), None)
                 await self.bot.economy.add_chips(
                     winner.user_id,
                     total_pot,
-                    "PvP胜利奖励"
+                    "PvP胜利奖励",
+                    session_id=session.id,
+                    counterparty_id=loser.user_id if loser else None,
+                    key=f"payout:{session.id}:{winner.user_id}"
                 )
         else:  # QUICK
             won = winner and not winner.is_ai
@@ -406,11 +462,14 @@ class BuckshotRouletteGame:
                 await self.bot.economy.add_chips(
                     human.user_id,
                     reward,
-                    f"快速模式奖励({diff_config['name']})"
+                    f"快速模式奖励({diff_config['name']})",
+                    session_id=session.id,
+                    key=f"payout:{session.id}:{human.user_id}"
                 )
         
         # 更新统计
         await self._update_stats(session)
+        self._record_game(session, reward)
         
         # 显示结束界面
         # 对于PvE和快速模式，检查人类玩家是否获胜
@@ -424,7 +483,7 @@ class BuckshotRouletteGame:
             view_owner_id = human.user_id
         embed = create_game_over_embed(session, won)
         view = GameOverView(self, session, view_owner_id)
-        session.set_current_view(view)  # 注册当前视图
+        self.set_current_view(session, view)  # 注册当前视图
         
         try:
             await interaction.edit_original_response(embed=embed, view=view)
@@ -432,7 +491,7 @@ class BuckshotRouletteGame:
             
             # 计划自动删除消息
             if Config.AUTO_DELETE_MESSAGES:
-                asyncio.create_task(view.schedule_delete(Config.GAME_OVER_DELETE_DELAY))
+                view.schedule_delete(self.bot, Config.GAME_OVER_DELETE_DELAY)
         except:
             pass
         
@@ -440,64 +499,102 @@ class BuckshotRouletteGame:
         self.remove_session(session)
     
     async def _update_stats(self, session: GameSession) -> None:
-        """更新玩家统计"""
+        """更新玩家统计（所有真人玩家的增量一次提交）"""
         winner = session.get_winner()
+        deltas = []
         
         for player in session.players:
             if player.is_ai:
                 continue
             
-            stats = await self.bot.database.get_player_stats(player.user_id)
-            stats.games_played += 1
-            
-            if winner and winner.user_id == player.user_id:
-                stats.games_won += 1
+            won = winner is not None and winner.user_id == player.user_id
+            delta = StatsDelta(
+                user_id=player.user_id,
+                games_played=1,
+                games_won=1 if won else 0
+            )
             
             if session.mode == GameMode.PVE:
-                stage = session.stage_manager.current_stage
-                total_rounds = session.stage_manager.total_rounds
+                delta.pve_best_stage = session.stage_manager.current_stage
+                # 最高轮数（撤离成功时的总轮数）
+                delta.pve_best_rounds = session.stage_manager.total_rounds
                 
-                if stage > stats.pve_best_stage:
-                    stats.pve_best_stage = stage
-                    
-                # 更新最高轮数（撤离成功时的总轮数）
-                if total_rounds > stats.pve_best_rounds:
-                    stats.pve_best_rounds = total_rounds
-                    
                 if session.accumulated_reward > 0:
-                    stats.pve_total_earnings += session.accumulated_reward
-                    # 更新最大单局奖励
-                    if session.accumulated_reward > stats.pve_best_reward:
-                        stats.pve_best_reward = session.accumulated_reward
+                    delta.pve_total_earnings = session.accumulated_reward
+                    # 最大单局奖励
+                    delta.pve_best_reward = session.accumulated_reward
                         
             elif session.mode == GameMode.PVP:
-                if winner and winner.user_id == player.user_id:
-                    stats.pvp_wins += 1
-                    stats.pvp_total_earnings += session.bet_amount * 2
+                if won:
+                    delta.pvp_wins = 1
+                    delta.pvp_total_earnings = session.bet_amount * 2
                 else:
-                    stats.pvp_losses += 1
+                    delta.pvp_losses = 1
             
-            await self.bot.database.update_player_stats(stats)
+            deltas.append(delta)
+        
+        if deltas:
+            # 统计无需等待落盘，启用写队列时与其他写入合并提交
+            await self.bot.database.apply_stats_deltas(deltas, wait=False)
+    
+    def _record_game(self, session: GameSession, reward: int, retreated: bool = False) -> None:
+        """提交游戏记录（后台批量写入，不等待）
+        
+        Args:
+            session: 游戏会话
+            reward: 本局发放的奖励
+            retreated: 是否为PvE撤离结束
+        """
+        winner = session.get_winner()
+        stages_completed = 0
+        total_rounds = 1
+        if session.mode == GameMode.PVE:
+            # 撤离时当前阶段已完成，失败时当前阶段未完成
+            current_stage = session.stage_manager.current_stage
+            stages_completed = current_stage if retreated else current_stage - 1
+            total_rounds = session.stage_manager.total_rounds
+        elif session.mode == GameMode.PVP:
+            total_rounds = session.pvp_current_round
+        
+        self.bot.game_records.submit(GameRecord(
+            id=session.id,
+            mode=session.mode,
+            player1_id=session.players[0].user_id,
+            player2_id=session.players[1].user_id if session.mode == GameMode.PVP else None,
+            winner_id=winner.user_id if winner else None,  # AI获胜时为0
+            bet_amount=session.bet_amount if session.mode == GameMode.PVP else session.entry_fee,
+            reward_amount=reward,
+            stages_completed=stages_completed,
+            total_rounds=total_rounds,
+            duration=session.get_duration()
+        ))
     
     async def handle_retreat(self, session: GameSession,
                             interaction: discord.Interaction) -> None:
         """处理撤离"""
-        reward = session.handle_retreat()
+        try:
+            events = step(session, Action.retreat())
+        except IllegalActionError:
+            return
+        reward = events[-1].reward
         
         # 发放奖励
         await self.bot.economy.add_chips(
             session.human_player.user_id,
             reward,
-            "PvE撤离奖励"
+            "PvE撤离奖励",
+            session_id=session.id,
+            key=f"payout:{session.id}:{session.human_player.user_id}"
         )
         
         # 更新统计
         await self._update_stats(session)
+        self._record_game(session, reward, retreated=True)
         
         # 显示结束界面
         embed = create_game_over_embed(session, True)
         view = GameOverView(self, session, session.human_player.user_id)
-        session.set_current_view(view)  # 注册当前视图
+        self.set_current_view(session, view)  # 注册当前视图
         
         try:
             await interaction.edit_original_response(embed=embed, view=view)
@@ -505,7 +602,7 @@ class BuckshotRouletteGame:
             
             # 计划自动删除消息
             if Config.AUTO_DELETE_MESSAGES:
-                asyncio.create_task(view.schedule_delete(Config.GAME_OVER_DELETE_DELAY))
+                view.schedule_delete(self.bot, Config.GAME_OVER_DELETE_DELAY)
         except:
             pass
         
@@ -515,14 +612,7 @@ class BuckshotRouletteGame:
     async def handle_continue(self, session: GameSession,
                              interaction: discord.Interaction) -> None:
         """处理继续挑战"""
-        session.handle_continue()
-        
-        # 更新界面
-        await self._update_game_view(session, interaction)
-        
-        # 如果是AI回合，执行AI动作
-        if session.current_player.is_ai:
-            await self._execute_ai_turn(session, interaction)
+        await self._apply_action(session, interaction, Action.continue_())
     
     async def handle_timeout(self, session: GameSession) -> None:
         """处理超时"""
@@ -530,11 +620,14 @@ class BuckshotRouletteGame:
             return
         
         # 超时自动射击对手
-        result = session.shoot_opponent()
+        try:
+            events = step(session, Action.shoot_opponent())
+        except IllegalActionError:
+            return
         
         # 由于没有interaction，需要直接编辑消息
         # 这里简化处理，直接结束游戏
-        if result.game_over or result.round_over:
+        if any(e.type in (EventType.GAME_OVER, EventType.ROUND_OVER) for e in events):
             session.state = GameState.ENDED
             self.remove_session(session)
     
@@ -544,28 +637,4 @@ class BuckshotRouletteGame:
         # 延迟模拟思考
         await asyncio.sleep(Config.AI_THINK_DELAY)
         
-        # 导入AI模块
-        from .ai import AIPlayer
-        
-        # 快速模式使用指定难度，其他模式使用阶段难度
-        if session.mode == GameMode.QUICK and session.ai_difficulty:
-            ai_level = session.ai_difficulty
-        else:
-            ai_level = session.stage_manager.get_ai_level()
-        
-        ai = AIPlayer(ai_level)
-        action = ai.decide_action(session)
-        
-        if action["type"] == "shoot_opponent":
-            result = session.shoot_opponent()
-        elif action["type"] == "shoot_self":
-            result = session.shoot_self()
-        elif action["type"] == "use_item":
-            item = action["item"]
-            target = action.get("target")
-            result = session.use_item(item, target)
-        else:
-            # 默认射击对手
-            result = session.shoot_opponent()
-        
-        await self._process_action_result(session, interaction, result)
\ No newline at end of file
+        await self._apply_action(session, interaction, ai_action(session))
@@ -2,12 +2,15 @@
 玩家类 - 恶魔轮盘赌
 """
 from dataclasses import dataclass, field
-from typing import List, Optional, TYPE_CHECKING
+from typing import List, Optional, Tuple, TYPE_CHECKING
+
+from utils.helpers import slotted
 
 if TYPE_CHECKING:
     from .items import Item
 
 
+@slotted
 @dataclass
 class Player:
     """游戏中的玩家"""
@@ -124,6 +127,14 @@ class Player:
             return self.items[index]
         return None
     
+    def item_counts(self) -> Tuple[int, ...]:
+        """按 ItemType 定义顺序统计的道具数量（道具实例是共享的，同类道具可互换）"""
+        from .items import ItemType
+        counts = dict.fromkeys(ItemType, 0)
+        for item in self.items:
+            counts[item.item_type] += 1
+        return tuple(counts.values())
+    
     def clear_overheal(self) -> int:
         """清除超量治疗（轮次结束时）
         
@@ -1,25 +1,24 @@
 """
 游戏会话管理 - 恶魔轮盘赌
+
+会话只保存游戏状态，不引用任何Discord对象；界面由 game.py 根据引擎事件渲染。
 """
 import uuid
 import random
-import asyncio
+import struct
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Optional, List, TYPE_CHECKING, Any
+from typing import Optional, List
 from enum import Enum
 
 from .player import Player
 from .shotgun import Shotgun, BulletType, generate_magazine_config
 from .items import Item, ItemType, generate_items, get_item_count_for_stage, get_item
 from .stages import StageManager
-from utils.constants import GameMode, GameState
+from utils.constants import GameMode, GameState, AIDifficulty
+from utils.helpers import slotted, datetime_to_ms, ms_to_datetime
 from config import Config
 
-if TYPE_CHECKING:
-    import discord
-    from discord import ui
-
 
 class ActionType(Enum):
     """动作类型"""
@@ -43,17 +42,35 @@ class ActionResult:
     private_info: Optional[str] = None  # 私密信息（只有使用者可见）
 
 
+# ==================== 快照编码 ====================
+
+# 字符串常量和枚举在快照中按位置编码为小整数
+_MODES = (GameMode.PVE, GameMode.PVP, GameMode.QUICK)
+_STATES = (GameState.WAITING, GameState.PLAYING, GameState.STAGE_COMPLETE, GameState.ENDED)
+_DIFFICULTIES = (None, AIDifficulty.EASY, AIDifficulty.NORMAL, AIDifficulty.HARD,
+                 AIDifficulty.HARD_PLUS, AIDifficulty.DEMON)
+_ITEM_TYPES = tuple(ItemType)
+_ITEM_CODES = {item_type: code for code, item_type in enumerate(_ITEM_TYPES)}
+_NO_ITEM = 0xFF
+
+SNAPSHOT_VERSION = 2
+# 版本, 模式, 状态, 标志位, 当前玩家, AI难度, 会话ID（16字节）,
+# 阶段, 阶段内轮数, 总轮数, 剩余子弹, 实弹位图, 已知位图, 实弹数, 空包弹数,
+# 押注, 入场费, 累积奖励, PvP比分x2, PvP轮数, 挑战者ID, 开始/结束时间（毫秒，0表示无）, 玩家数
+_SESSION_STRUCT = struct.Struct("<BBBBBB16sHBHBIIBBqqqBBHQqqB")
+# 用户ID, 标志位, 生命值, 最大生命值, 超量治疗, 被干扰道具, 造成伤害, 使用道具数, 道具数, 名称字节数
+_PLAYER_STRUCT = struct.Struct("<QBBBBBHHBB")
+
+
+@slotted
 @dataclass
 class GameSession:
     """游戏会话"""
     
-    id: str = field(default_factory=lambda: str(uuid.uuid4())[:8])
+    # 完整的128位ID：幂等键和游戏记录以它为键，长期保存不能碰撞
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
     mode: str = GameMode.PVE
     
-    # Discord相关
-    channel_id: int = 0
-    message_id: int = 0
-    
     # 玩家
     players: List[Player] = field(default_factory=list)
     current_turn: int = 0             # 当前行动玩家索引
@@ -87,22 +104,14 @@ class GameSession:
     pvp_current_round: int = 1
     challenger_id: int = 0                # PvP挑战发起者ID
     
-    # 当前活动的视图（用于防止旧View超时删除消息）
-    current_view: Optional[Any] = None  # 实际类型是 ui.View，使用 Any 避免循环导入
-    
-    def set_current_view(self, view: 'ui.View') -> None:
-        """设置当前活动的视图，并停止旧视图
-        
-        Args:
-            view: 新的视图
-        """
-        # 停止旧的视图（防止旧视图超时触发删除）
-        if self.current_view is not None:
-            try:
-                self.current_view.stop()
-            except:
-                pass
-        self.current_view = view
+    @property
+    def quick_difficulty_config(self) -> Optional[dict]:
+        """快速模式的难度配置（其他模式为None）"""
+        if self.mode != GameMode.QUICK:
+            return None
+        return Config.QUICK_DIFFICULTY_CONFIG.get(
+            self.ai_difficulty or "normal", Config.QUICK_DIFFICULTY_CONFIG["normal"]
+        )
     
     @property
     def current_player(self) -> Player:
@@ -215,13 +224,11 @@ class GameSession:
         self.ai_difficulty = difficulty
         
         # 获取难度配置
-        self.quick_difficulty_config = Config.QUICK_DIFFICULTY_CONFIG.get(
-            difficulty, Config.QUICK_DIFFICULTY_CONFIG["normal"]
-        )
-        self.entry_fee = self.quick_difficulty_config["entry_fee"]
+        config = self.quick_difficulty_config
+        self.entry_fee = config["entry_fee"]
         
         # 创建玩家 - 血量根据难度配置
-        health = self.quick_difficulty_config["health"]
+        health = config["health"]
         human = Player(
             user_id=user_id,
             name=username,
@@ -268,7 +275,7 @@ class GameSession:
         current_health = self.players[0].max_health if self.players else 5
         
         # 装填弹夹
-        if self.mode == GameMode.QUICK and hasattr(self, 'quick_difficulty_config'):
+        if self.mode == GameMode.QUICK:
             # 快速模式：使用难度配置的弹夹大小，但仍需考虑血量平衡
             config = self.quick_difficulty_config
             # 使用平衡的弹夹配置生成器
@@ -304,7 +311,7 @@ class GameSession:
         
         # 发放道具
         if give_items:
-            if self.mode == GameMode.QUICK and hasattr(self, 'quick_difficulty_config'):
+            if self.mode == GameMode.QUICK:
                 # 快速模式：使用难度配置的道具数量
                 config = self.quick_difficulty_config
                 item_count = random.randint(config["items_min"], config["items_max"])
@@ -956,4 +963,98 @@ class GameSession:
     
     def get_recent_logs(self, count: int = 5) -> List[str]:
         """获取最近的日志"""
-        return self.action_log[-count:]
\ No newline at end of file
+        return self.action_log[-count:]
+    
+    # ==================== 快照 ====================
+    
+    def snapshot(self) -> bytes:
+        """把会话状态编码为紧凑的二进制快照（通常不到200字节）
+        
+        包含规则相关的全部状态；操作日志只用于显示，不包含在内。
+        """
+        shotgun = self.shotgun
+        stage = self.stage_manager
+        flags = self.is_reloading | self._magazine_info_shown << 1 | shotgun.is_sawed << 2
+        parts = [_SESSION_STRUCT.pack(
+            SNAPSHOT_VERSION, _MODES.index(self.mode), _STATES.index(self.state), flags,
+            self.current_turn, _DIFFICULTIES.index(self.ai_difficulty), bytes.fromhex(self.id),
+            stage.current_stage, stage.current_round, stage.total_rounds,
+            shotgun.size, shotgun.pattern, shotgun.known_mask, shotgun.live_count, shotgun.blank_count,
+            self.bet_amount, self.entry_fee, self.accumulated_reward,
+            self.pvp_scores[0], self.pvp_scores[1], self.pvp_current_round, self.challenger_id,
+            datetime_to_ms(self.started_at) if self.started_at else 0,
+            datetime_to_ms(self.ended_at) if self.ended_at else 0,
+            len(self.players)
+        )]
+        for player in self.players:
+            name = player.name.encode()[:255]
+            jammed = player.jammed_item
+            parts.append(_PLAYER_STRUCT.pack(
+                player.user_id, player.is_ai | player.is_handcuffed << 1 | player.has_vest << 2,
+                player.health, player.max_health, player.overheal,
+                _ITEM_CODES[jammed.item_type] if jammed is not None else _NO_ITEM,
+                player.damage_dealt, player.items_used, len(player.items), len(name)
+            ))
+            parts.append(bytes(_ITEM_CODES[item.item_type] for item in player.items))
+            parts.append(name)
+        return b"".join(parts)
+    
+    @classmethod
+    def restore(cls, data: bytes) -> 'GameSession':
+        """从 snapshot() 的结果恢复会话
+        
+        Raises:
+            ValueError: 快照版本不匹配
+        """
+        (version, mode, state, flags, current_turn, difficulty, session_id,
+         current_stage, current_round, total_rounds, size, pattern, known_mask, live, blank,
+         bet_amount, entry_fee, accumulated_reward, score1, score2, pvp_round, challenger_id,
+         started_ms, ended_ms, player_count) = _SESSION_STRUCT.unpack_from(data)
+        if version != SNAPSHOT_VERSION:
+            raise ValueError(f"不支持的快照版本: {version}")
+        
+        offset = _SESSION_STRUCT.size
+        players = []
+        for _ in range(player_count):
+            (user_id, player_flags, health, max_health, overheal, jammed,
+             damage_dealt, items_used, item_count, name_length) = _PLAYER_STRUCT.unpack_from(data, offset)
+            offset += _PLAYER_STRUCT.size
+            items = [get_item(_ITEM_TYPES[code]) for code in data[offset:offset + item_count]]
+            offset += item_count
+            name = data[offset:offset + name_length].decode(errors="ignore")
+            offset += name_length
+            players.append(Player(
+                user_id=user_id,
+                name=name,
+                is_ai=bool(player_flags & 1),
+                health=health,
+                max_health=max_health,
+                items=items,
+                is_handcuffed=bool(player_flags & 2),
+                has_vest=bool(player_flags & 4),
+                overheal=overheal,
+                jammed_item=get_item(_ITEM_TYPES[jammed]) if jammed != _NO_ITEM else None,
+                damage_dealt=damage_dealt,
+                items_used=items_used
+            ))
+        
+        return cls(
+            id=session_id.hex(),
+            mode=_MODES[mode],
+            players=players,
+            current_turn=current_turn,
+            state=_STATES[state],
+            stage_manager=StageManager(current_stage, current_round, total_rounds),
+            shotgun=Shotgun(size, pattern, known_mask, live, blank, bool(flags & 4)),
+            ai_difficulty=_DIFFICULTIES[difficulty],
+            _magazine_info_shown=bool(flags & 2),
+            is_reloading=bool(flags & 1),
+            bet_amount=bet_amount,
+            entry_fee=entry_fee,
+            accumulated_reward=accumulated_reward,
+            started_at=ms_to_datetime(started_ms) if started_ms else None,
+            ended_at=ms_to_datetime(ended_ms) if ended_ms else None,
+            pvp_scores=[score1, score2],
+            pvp_current_round=pvp_round,
+            challenger_id=challenger_id
+        )
@@ -2,10 +2,12 @@
 霰弹枪和弹夹系统 - 恶魔轮盘赌
 """
 import random
-from dataclasses import dataclass, field
-from typing import List, Optional, Tuple
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
 from enum import Enum
 
+from utils.helpers import slotted
+
 
 class BulletType(Enum):
     """子弹类型"""
@@ -13,17 +15,50 @@ class BulletType(Enum):
     BLANK = "blank"     # 空包弹
 
 
+@slotted
 @dataclass
 class Shotgun:
-    """霰弹枪"""
+    """霰弹枪
+    
+    弹夹用整数位图表示：第 i 位对应从当前子弹起的第 i 发（1为实弹），
+    开枪/退弹时整体右移一位，已知位置用同样排列的 known_mask 记录。
+    复制一把枪只需复制几个整数（见 clone）。
+    """
     
-    magazine: List[BulletType] = field(default_factory=list)
+    size: int = 0                 # 剩余子弹数
+    pattern: int = 0              # 实弹位图（bit i = 第i发是实弹）
+    known_mask: int = 0           # 已知位置位图（用于AI和道具效果）
     live_count: int = 0           # 实弹数量
     blank_count: int = 0          # 空包弹数量
     is_sawed: bool = False        # 是否被锯短（下一发双倍伤害）
     
-    # 已知子弹信息（用于AI和道具效果）
-    known_bullets: dict = field(default_factory=dict)  # {index: BulletType}
+    @property
+    def magazine(self) -> List[BulletType]:
+        """剩余子弹列表（按发射顺序）"""
+        return [self._bullet(i) for i in range(self.size)]
+    
+    @property
+    def known_bullets(self) -> Dict[int, BulletType]:
+        """已知子弹信息 {位置: 子弹类型}"""
+        return {
+            i: self._bullet(i)
+            for i in range(self.size)
+            if self.known_mask >> i & 1
+        }
+    
+    def _bullet(self, position: int) -> BulletType:
+        return BulletType.LIVE if self.pattern >> position & 1 else BulletType.BLANK
+    
+    def clone(self) -> 'Shotgun':
+        """复制当前状态"""
+        return Shotgun(self.size, self.pattern, self.known_mask,
+                       self.live_count, self.blank_count, self.is_sawed)
+    
+    def _shuffle(self) -> None:
+        """按当前实弹/空包弹数量随机排列弹夹"""
+        self.pattern = 0
+        for position in random.sample(range(self.size), self.live_count):
+            self.pattern |= 1 << position
     
     def load(self, live: int, blank: int) -> None:
         """装填弹夹
@@ -32,21 +67,27 @@ class Shotgun:
             live: 实弹数量
             blank: 空包弹数量
         """
-        self.magazine = (
-            [BulletType.LIVE] * live + 
-            [BulletType.BLANK] * blank
-        )
-        random.shuffle(self.magazine)
-        
+        self.size = live + blank
         self.live_count = live
         self.blank_count = blank
+        self._shuffle()
         self.is_sawed = False
-        self.known_bullets.clear()
+        self.known_mask = 0
     
     def reload_shuffle(self) -> None:
         """重新打乱弹夹顺序（幸运硬币效果）"""
-        random.shuffle(self.magazine)
-        self.known_bullets.clear()
+        self._shuffle()
+        self.known_mask = 0
+    
+    def bullet_at(self, position: int) -> Optional[BulletType]:
+        """指定位置的子弹（不记为已知，用于作弊AI和结算）
+        
+        Args:
+            position: 位置索引（0为当前子弹）
+        """
+        if 0 <= position < self.size:
+            return self._bullet(position)
+        return None
     
     def peek_current(self) -> Optional[BulletType]:
         """查看当前子弹（放大镜效果）
@@ -54,11 +95,7 @@ class Shotgun:
         Returns:
             当前子弹类型，弹夹空返回None
         """
-        if not self.magazine:
-            return None
-        bullet = self.magazine[0]
-        self.known_bullets[0] = bullet
-        return bullet
+        return self.peek_position(0)
     
     def peek_position(self, position: int) -> Optional[BulletType]:
         """查看指定位置的子弹（望远镜/窃贼电话效果）
@@ -69,37 +106,33 @@ class Shotgun:
         Returns:
             子弹类型，位置无效返回None
         """
-        if 0 <= position < len(self.magazine):
-            bullet = self.magazine[position]
-            self.known_bullets[position] = bullet
-            return bullet
+        if 0 <= position < self.size:
+            self.known_mask |= 1 << position
+            return self._bullet(position)
         return None
     
+    def _pop(self) -> BulletType:
+        """移出当前子弹，更新计数，位图整体前移一位"""
+        if self.pattern & 1:
+            bullet = BulletType.LIVE
+            self.live_count -= 1
+        else:
+            bullet = BulletType.BLANK
+            self.blank_count -= 1
+        self.pattern >>= 1
+        self.known_mask >>= 1
+        self.size -= 1
+        return bullet
+    
     def eject_current(self) -> Optional[BulletType]:
         """退出当前子弹（啤酒效果）
         
         Returns:
             被退出的子弹类型
         """
-        if not self.magazine:
+        if self.size == 0:
             return None
-        
-        bullet = self.magazine.pop(0)
-        
-        # 更新计数
-        if bullet == BulletType.LIVE:
-            self.live_count -= 1
-        else:
-            self.blank_count -= 1
-        
-        # 更新已知子弹索引
-        new_known = {}
-        for idx, b in self.known_bullets.items():
-            if idx > 0:
-                new_known[idx - 1] = b
-        self.known_bullets = new_known
-        
-        return bullet
+        return self._pop()
     
     def invert_current(self) -> Optional[BulletType]:
         """反转当前子弹（逆转器效果）
@@ -109,24 +142,21 @@ class Shotgun:
         Returns:
             反转后的子弹类型
         """
-        if not self.magazine:
+        if self.size == 0:
             return None
         
-        current = self.magazine[0]
-        if current == BulletType.LIVE:
-            self.magazine[0] = BulletType.BLANK
-            self.live_count -= 1
-            self.blank_count += 1
-        else:
-            self.magazine[0] = BulletType.LIVE
+        self.pattern ^= 1
+        if self.pattern & 1:
             self.blank_count -= 1
             self.live_count += 1
+        else:
+            self.live_count -= 1
+            self.blank_count += 1
         
         # 原版规则：逆转后玩家不知道结果，清除已知信息
-        if 0 in self.known_bullets:
-            del self.known_bullets[0]
+        self.known_mask &= ~1
         
-        return self.magazine[0]
+        return self._bullet(0)
     
     def set_current_bullet(self, bullet_type: BulletType) -> Optional[BulletType]:
         """设置当前子弹类型（命运硬币效果）
@@ -137,16 +167,12 @@ class Shotgun:
         Returns:
             设置后的子弹类型
         """
-        if not self.magazine:
+        if self.size == 0:
             return None
         
-        current = self.magazine[0]
-        if current == bullet_type:
-            # 已经是目标类型，不需要改变
-            pass
-        else:
+        if self._bullet(0) != bullet_type:
             # 需要改变类型
-            self.magazine[0] = bullet_type
+            self.pattern ^= 1
             if bullet_type == BulletType.LIVE:
                 self.blank_count -= 1
                 self.live_count += 1
@@ -155,9 +181,9 @@ class Shotgun:
                 self.blank_count += 1
         
         # 更新已知信息
-        self.known_bullets[0] = self.magazine[0]
+        self.known_mask |= 1
         
-        return self.magazine[0]
+        return bullet_type
     
     def fire(self) -> Tuple[Optional[BulletType], int]:
         """开枪
@@ -165,16 +191,10 @@ class Shotgun:
         Returns:
             (子弹类型, 伤害值)
         """
-        if not self.magazine:
+        if self.size == 0:
             return None, 0
         
-        bullet = self.magazine.pop(0)
-        
-        # 更新计数
-        if bullet == BulletType.LIVE:
-            self.live_count -= 1
-        else:
-            self.blank_count -= 1
+        bullet = self._pop()
         
         # 计算伤害
         damage = 0
@@ -184,13 +204,6 @@ class Shotgun:
         # 重置锯短状态
         self.is_sawed = False
         
-        # 更新已知子弹索引
-        new_known = {}
-        for idx, b in self.known_bullets.items():
-            if idx > 0:
-                new_known[idx - 1] = b
-        self.known_bullets = new_known
-        
         return bullet, damage
     
     def saw_off(self) -> None:
@@ -199,18 +212,17 @@ class Shotgun:
     
     def is_empty(self) -> bool:
         """检查弹夹是否为空"""
-        return len(self.magazine) == 0
+        return self.size == 0
     
     def remaining_count(self) -> int:
         """获取剩余子弹数量"""
-        return len(self.magazine)
+        return self.size
     
     def get_probability_live(self) -> float:
         """获取当前子弹是实弹的概率"""
-        total = len(self.magazine)
-        if total == 0:
+        if self.size == 0:
             return 0.0
-        return self.live_count / total
+        return self.live_count / self.size
     
     def format_magazine(self, reveal: bool = False) -> str:
         """格式化弹夹显示
@@ -231,11 +243,11 @@ class Shotgun:
             return " ".join(symbols)
         else:
             # 使用 ● 符号表示未知子弹
-            return " ".join(["●"] * len(self.magazine))
+            return " ".join(["●"] * self.size)
     
     def format_info(self) -> str:
         """格式化弹夹信息（只显示剩余数量）"""
-        return f"{len(self.magazine)} 发子弹"
+        return f"{self.size} 发子弹"
     
     def format_initial_info(self) -> str:
         """格式化初始弹夹信息（用于轮次开始时）"""
@@ -0,0 +1,389 @@
+"""
+搜索AI - 恶魔轮盘赌
+
+对当前轮次做期望极小极大搜索（expectiminimax）：己方取最大、对手取最小，
+开枪和随机道具效果按子弹后验概率（belief.py）取期望。
+
+状态是纯元组：(行动方, 对手, 剩余子弹, 实弹数, 已知位图, 已知实弹位图, 是否锯短)，
+玩家为 (生命, 最大生命, 超量治疗, 防弹背心, 被铐, 各类道具数量)，总是从行动方视角表示，
+换手时交换双方并取负值。相同状态的结果存在置换表中，按迭代加深逐层搜索，
+超过时间预算时返回上一层完成的结果；一层都没完成时返回None，由启发式策略兜底。
+
+模型范围：弹夹打空视为叶子（下一轮装填随机），干扰器及被干扰状态不参与搜索。
+"""
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Union
+
+from .belief import posterior
+from .items import ITEMS, ItemType
+
+if TYPE_CHECKING:
+    from .session import GameSession
+
+# 道具数量元组的下标（与 Player.item_counts() 顺序一致）
+_INDEX = {item_type: i for i, item_type in enumerate(ItemType)}
+# 搜索中可以使用的道具（干扰器效果随机且对手不可见，不建模）
+_SEARCH_ITEMS = tuple(t for t in ItemType if t != ItemType.JAMMER)
+# 肾上腺素可以偷取的道具
+_STEALABLE = tuple(t for t in _SEARCH_ITEMS if ITEMS[t].can_be_stolen)
+
+# 动作：("shoot_opponent",) / ("shoot_self",) / ("use_item", 道具类型, 偷取的道具类型或None)
+SearchAction = Tuple
+PlayerState = Tuple[int, int, int, bool, bool, Tuple[int, ...]]
+State = Tuple[PlayerState, PlayerState, int, int, int, int, bool]
+# 动作结果：终局值（行动方视角），或 (新状态, 是否仍由行动方行动)
+Outcome = Union[float, Tuple[State, bool]]
+
+_SHOOT_OPPONENT = ("shoot_opponent",)
+_SHOOT_SELF = ("shoot_self",)
+_WIN = 1.0
+_LOSS = -1.0
+
+
+class _Timeout(Exception):
+    """搜索超出时间预算"""
+    pass
+
+
+def root_state(session: 'GameSession', reveal_current: bool = False) -> State:
+    """从会话构造搜索根状态（当前行动方视角）
+    
+    Args:
+        session: 游戏会话
+        reveal_current: 是否让行动方知道当前子弹（作弊AI）
+    """
+    shotgun = session.shotgun
+    known_mask = shotgun.known_mask | (1 if reveal_current and shotgun.size else 0)
+    
+    def player_state(player) -> PlayerState:
+        return (player.health, player.max_health, player.overheal, player.has_vest,
+                player.is_handcuffed, player.item_counts())
+    
+    return (
+        player_state(session.current_player), player_state(session.opponent),
+        shotgun.size, shotgun.live_count, known_mask, shotgun.pattern & known_mask, shotgun.is_sawed
+    )
+
+
+class ExpectimaxSolver:
+    """带置换表和迭代加深的期望极小极大搜索"""
+    
+    def __init__(self, time_budget: float = 0.05, max_depth: int = 12, table_size: int = 200_000):
+        """
+        Args:
+            time_budget: 每步搜索的时间上限（秒）
+            max_depth: 最大搜索深度（动作数）
+            table_size: 置换表最大条目数，超过后清空
+        """
+        self.time_budget = time_budget
+        self.max_depth = max_depth
+        self.table_size = table_size
+        # 状态 -> (搜索深度, 值, 最佳动作)；估值只取决于状态，可以跨回合复用
+        self._table: Dict[State, Tuple[int, float, Optional[SearchAction]]] = {}
+        self._deadline = 0.0
+        self._nodes = 0
+        # 统计
+        self.searches = 0
+        self.timeouts = 0     # 一层都没完成、交给启发式的次数
+        self.last_depth = 0   # 上次搜索完成的深度
+    
+    def search(self, state: State) -> Optional[SearchAction]:
+        """搜索最佳动作
+        
+        Returns:
+            最佳动作，时间预算内一层都没完成时返回None
+        """
+        self.searches += 1
+        if len(self._table) > self.table_size:
+            self._table.clear()
+        if state[2] == 0:
+            return None
+        
+        actions = _actions(state)
+        if len(actions) == 1:
+            self.last_depth = 0
+            return actions[0]
+        
+        self._deadline = time.perf_counter() + self.time_budget
+        self._nodes = 0
+        best = None
+        self.last_depth = 0
+        for depth in range(1, self.max_depth + 1):
+            try:
+                self._value(state, depth)
+            except _Timeout:
+                break
+            best = self._table[state][2]
+            self.last_depth = depth
+        
+        if best is None:
+            self.timeouts += 1
+        return best
+    
+    def _value(self, state: State, depth: int) -> float:
+        """行动方视角的状态值"""
+        entry = self._table.get(state)
+        if entry is not None and entry[0] >= depth:
+            return entry[1]
+        if depth == 0:
+            return _evaluate(state)
+        
+        self._nodes += 1
+        if self._nodes & 31 == 0 and time.perf_counter() > self._deadline:
+            raise _Timeout()
+        
+        actions = _actions(state)
+        # 上一层的最佳动作先搜索
+        if entry is not None and entry[2] in actions:
+            actions.remove(entry[2])
+            actions.insert(0, entry[2])
+        
+        best_value = -2.0
+        best_action = None
+        for action in actions:
+            value = 0.0
+            for probability, outcome in _outcomes(state, action):
+                if isinstance(outcome, float):
+                    value += probability * outcome
+                else:
+                    next_state, keep_turn = outcome
+                    child = self._value(next_state, depth - 1)
+                    value += probability * (child if keep_turn else -child)
+            if value > best_value:
+                best_value = value
+                best_action = action
+        
+        self._table[state] = (depth, best_value, best_action)
+        return best_value
+    
+    def get_metrics(self) -> Dict[str, int]:
+        """搜索统计"""
+        return {
+            "searches": self.searches,
+            "timeouts": self.timeouts,
+            "last_depth": self.last_depth,
+            "table": len(self._table),
+        }
+
+
+# ==================== 规则模型 ====================
+
+def _evaluate(state: State) -> float:
+    """非终局状态的估值（行动方视角，-1到1之间）：生命差（含超量治疗）为主，道具数量为辅"""
+    me, opp = state[0], state[1]
+    scale = max(me[1], opp[1], 1)
+    score = 0.5 * (me[0] + me[2] - opp[0] - opp[2]) / scale + 0.02 * (sum(me[5]) - sum(opp[5]))
+    return max(-0.9, min(0.9, score))
+
+
+def _damage(player: PlayerState, amount: int, ignore_vest: bool = False) -> PlayerState:
+    """与 Player.take_damage 一致：背心减1点，先扣超量治疗再扣生命"""
+    hp, max_hp, overheal, vest, cuffed, items = player
+    if vest and amount > 0 and not ignore_vest:
+        amount -= 1
+        vest = False
+    absorbed = min(overheal, amount)
+    return (max(0, hp - amount + absorbed), max_hp, overheal - absorbed, vest, cuffed, items)
+
+
+def _heal(player: PlayerState, amount: int) -> PlayerState:
+    """与 Player.heal 一致：只恢复生命，不超过上限，超量治疗不变"""
+    hp, max_hp, overheal, vest, cuffed, items = player
+    return (min(max_hp, hp + amount), max_hp, overheal, vest, cuffed, items)
+
+
+def _take_item(player: PlayerState, item_type: ItemType) -> PlayerState:
+    items = list(player[5])
+    items[_INDEX[item_type]] -= 1
+    return player[:5] + (tuple(items),)
+
+
+def _has(player: PlayerState, item_type: ItemType) -> bool:
+    return player[5][_INDEX[item_type]] > 0
+
+
+def _live_probability(state: State, position: int) -> float:
+    return posterior(state[2], state[3], state[4], state[5])[position]
+
+
+def _is_known(state: State, position: int) -> bool:
+    return bool(state[4] >> position & 1)
+
+
+def _bullet_branches(state: State, position: int) -> List[Tuple[float, bool]]:
+    """指定位置的子弹分支 [(概率, 是否实弹)]"""
+    p = _live_probability(state, position)
+    branches = []
+    if p > 0.0:
+        branches.append((p, True))
+    if p < 1.0:
+        branches.append((1.0 - p, False))
+    return branches
+
+
+def _pop(state: State, live: bool) -> State:
+    """移出当前子弹（开枪或退弹）"""
+    me, opp, size, live_count, known_mask, known_live, sawed = state
+    return (me, opp, size - 1, live_count - live, known_mask >> 1, known_live >> 1, sawed)
+
+
+def _reveal(state: State, position: int, live: bool) -> State:
+    me, opp, size, live_count, known_mask, known_live, sawed = state
+    bit = 1 << position
+    return (me, opp, size, live_count, known_mask | bit,
+            (known_live | bit) if live else (known_live & ~bit), sawed)
+
+
+def _after_action(state: State) -> Outcome:
+    """行动方继续行动（道具、空包弹射自己）"""
+    if state[0][0] <= 0:
+        return _LOSS
+    if state[2] == 0:
+        return _evaluate(state)
+    return (state, True)
+
+
+def _after_shot(state: State) -> Outcome:
+    """开枪后的结算和换手（被铐的一方跳过回合）"""
+    me, opp, size, live, known_mask, known_live, _ = state
+    if opp[0] <= 0:
+        return _WIN
+    if me[0] <= 0:
+        return _LOSS
+    if size == 0:
+        return _evaluate(state)
+    if opp[4]:
+        opp = opp[:4] + (False, opp[5])
+        return ((me, opp, size, live, known_mask, known_live, False), True)
+    return ((opp, me, size, live, known_mask, known_live, False), False)
+
+
+def _actions(state: State) -> List[SearchAction]:
+    """可选动作（去掉明显无效的道具使用）"""
+    actions = [_SHOOT_OPPONENT, _SHOOT_SELF]
+    me, opp = state[0], state[1]
+    for item_type in _SEARCH_ITEMS:
+        if _has(me, item_type) and _useful(state, me, opp, item_type):
+            if item_type == ItemType.ADRENALINE:
+                for stolen in _STEALABLE:
+                    if _has(opp, stolen) and _useful(state, me, opp, stolen):
+                        actions.append(("use_item", item_type, stolen))
+            else:
+                actions.append(("use_item", item_type, None))
+    return actions
+
+
+def _useful(state: State, me: PlayerState, opp: PlayerState, item_type: ItemType) -> bool:
+    """道具在当前状态下是否有效果"""
+    size = state[2]
+    if item_type == ItemType.MAGNIFIER:
+        return not _is_known(state, 0)
+    if item_type == ItemType.CIGARETTE:
+        return me[0] < me[1]
+    if item_type == ItemType.SAW:
+        return not state[6]
+    if item_type == ItemType.HANDCUFFS:
+        return not opp[4]
+    if item_type == ItemType.VEST:
+        return not me[3]
+    if item_type == ItemType.TELESCOPE:
+        return size > 1 and not _is_known(state, 1)
+    if item_type == ItemType.PHONE:
+        return size > 1
+    if item_type == ItemType.MEDKIT:
+        return opp[0] > 1
+    return True
+
+
+def _outcomes(state: State, action: SearchAction) -> List[Tuple[float, Outcome]]:
+    """动作的所有结果 [(概率, 结果)]"""
+    me, opp, size, live, known_mask, known_live, sawed = state
+    
+    if action == _SHOOT_OPPONENT:
+        outcomes = []
+        for p, is_live in _bullet_branches(state, 0):
+            after = _pop(state, is_live)
+            if is_live:
+                after = (after[0], _damage(after[1], 2 if sawed else 1)) + after[2:]
+            outcomes.append((p, _after_shot(after)))
+        return outcomes
+    
+    if action == _SHOOT_SELF:
+        outcomes = []
+        for p, is_live in _bullet_branches(state, 0):
+            after = _pop(state, is_live)
+            if is_live:
+                after = (_damage(after[0], 2 if sawed else 1),) + after[1:]
+                outcomes.append((p, _after_shot(after)))
+            else:
+                after = after[:6] + (False,)
+                outcomes.append((p, _after_action(after)))
+        return outcomes
+    
+    _, item_type, stolen = action
+    me = _take_item(me, item_type)
+    if stolen is not None:
+        opp = _take_item(opp, stolen)
+        item_type = stolen
+    return _item_outcomes((me, opp, size, live, known_mask, known_live, sawed), item_type)
+
+
+def _item_outcomes(state: State, item_type: ItemType) -> List[Tuple[float, Outcome]]:
+    """使用道具的结果（道具已从道具栏扣除）"""
+    me, opp, size, live, known_mask, known_live, sawed = state
+    
+    if item_type == ItemType.MAGNIFIER:
+        return [(p, _after_action(_reveal(state, 0, is_live))) for p, is_live in _bullet_branches(state, 0)]
+    
+    if item_type == ItemType.TELESCOPE:
+        return [(p, _after_action(_reveal(state, 1, is_live))) for p, is_live in _bullet_branches(state, 1)]
+    
+    if item_type == ItemType.PHONE:
+        outcomes = []
+        positions = size - 1
+        for position in range(1, size):
+            if _is_known(state, position):
+                outcomes.append((1.0 / positions, _after_action(state)))
+                continue
+            for p, is_live in _bullet_branches(state, position):
+                outcomes.append((p / positions, _after_action(_reveal(state, position, is_live))))
+        return outcomes
+    
+    if item_type == ItemType.BEER:
+        return [(p, _after_action(_pop(state, is_live))) for p, is_live in _bullet_branches(state, 0)]
+    
+    if item_type == ItemType.INVERTER:
+        # 逆转后当前位置不再已知，但剩余数量随之变化
+        outcomes = []
+        for p, is_live in _bullet_branches(state, 0):
+            after = (me, opp, size, live + (-1 if is_live else 1),
+                     known_mask & ~1, known_live & ~1, sawed)
+            outcomes.append((p, _after_action(after)))
+        return outcomes
+    
+    if item_type == ItemType.COIN:
+        outcomes = []
+        for p, is_live in _bullet_branches(state, 0):
+            for target_live in (True, False):
+                after = (me, opp, size, live - is_live + target_live, known_mask, known_live, sawed)
+                outcomes.append((p * 0.5, _after_action(_reveal(after, 0, target_live))))
+        return outcomes
+    
+    if item_type == ItemType.MEDICINE:
+        healed = (_heal(me, 2),) + state[1:]
+        hurt = (_damage(me, 1),) + state[1:]
+        return [(0.5, _after_action(healed)), (0.5, _after_action(hurt))]
+    
+    if item_type == ItemType.CIGARETTE:
+        after = (_heal(me, 1),) + state[1:]
+    elif item_type == ItemType.SAW:
+        after = state[:6] + (size > 0,)
+    elif item_type == ItemType.HANDCUFFS:
+        after = (me, opp[:4] + (True, opp[5])) + state[2:]
+    elif item_type == ItemType.VEST:
+        after = (me[:3] + (True,) + me[4:],) + state[1:]
+    elif item_type == ItemType.MEDKIT:
+        after = (me, _damage(opp, 1, ignore_vest=True) if opp[0] > 1 else opp) + state[2:]
+    else:
+        after = state
+    return [(1.0, _after_action(after))]
@@ -4,9 +4,11 @@
 from dataclasses import dataclass
 from typing import Tuple
 from utils.constants import AIDifficulty
+from utils.helpers import slotted
 from config import Config
 
 
+@slotted
 @dataclass
 class StageManager:
     """阶段管理器"""
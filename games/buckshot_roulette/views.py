@@ -4,7 +4,6 @@ Discord Views - 恶魔轮盘赌
 import discord
 from discord import ui
 from typing import TYPE_CHECKING, Optional, Dict
-import asyncio
 
 from ui.base_views import BaseView
 from config import Config
@@ -115,7 +114,7 @@ class GameView(BaseView):
         """使用道具"""
         embed = create_item_select_embed(self.session)
         view = ItemSelectView(self.game, self.session, self.user_id)
-        self.session.set_current_view(view)  # 注册当前视图
+        self.game.set_current_view(self.session, view)  # 注册当前视图
         view.message = self.message
         await interaction.response.edit_message(embed=embed, view=view)
     
@@ -164,7 +163,7 @@ class ItemSelectView(BaseView):
                 if stealable:
                     embed = create_adrenaline_select_embed(self.session)
                     view = AdrenalineTargetView(self.game, self.session, self.user_id, item)
-                    self.session.set_current_view(view)  # 注册当前视图
+                    self.game.set_current_view(self.session, view)  # 注册当前视图
                     view.message = self.message
                     await interaction.response.edit_message(embed=embed, view=view)
                     return
@@ -175,7 +174,7 @@ class ItemSelectView(BaseView):
                 if self.session.opponent.items:
                     embed = create_jammer_select_embed(self.session)
                     view = JammerTargetView(self.game, self.session, self.user_id, item)
-                    self.session.set_current_view(view)  # 注册当前视图
+                    self.game.set_current_view(self.session, view)  # 注册当前视图
                     view.message = self.message
                     await interaction.response.edit_message(embed=embed, view=view)
                     return
@@ -188,7 +187,7 @@ class ItemSelectView(BaseView):
         """返回游戏界面"""
         embed = create_game_embed(self.session)
         view = GameView(self.game, self.session, self.user_id)
-        self.session.set_current_view(view)  # 注册当前视图
+        self.game.set_current_view(self.session, view)  # 注册当前视图
         view.message = self.message
         await interaction.response.edit_message(embed=embed, view=view)
 
@@ -231,7 +230,7 @@ class AdrenalineTargetView(BaseView):
         """返回道具选择"""
         embed = create_item_select_embed(self.session)
         view = ItemSelectView(self.game, self.session, self.user_id)
-        self.session.set_current_view(view)  # 注册当前视图
+        self.game.set_current_view(self.session, view)  # 注册当前视图
         view.message = self.message
         await interaction.response.edit_message(embed=embed, view=view)
 
@@ -273,7 +272,7 @@ class JammerTargetView(BaseView):
         """返回道具选择"""
         embed = create_item_select_embed(self.session)
         view = ItemSelectView(self.game, self.session, self.user_id)
-        self.session.set_current_view(view)  # 注册当前视图
+        self.game.set_current_view(self.session, view)  # 注册当前视图
         view.message = self.message
         await interaction.response.edit_message(embed=embed, view=view)
 
@@ -414,7 +413,13 @@ class PvPChallengeView(BaseView):
     
     async def on_accept(self, interaction: discord.Interaction):
         """接受挑战"""
-        await interaction.response.defer()
+        # 只处理第一次接受：停止视图并禁用按钮，连点或重复点击不会再次开局
+        if self.is_finished():
+            await interaction.response.defer()
+            return
+        self.stop()
+        self.disable_all()
+        await interaction.response.edit_message(view=self)
         
         # 删除挑战消息（游戏开始后不需要了）
         if Config.AUTO_DELETE_MESSAGES and self.message:
@@ -427,7 +432,8 @@ class PvPChallengeView(BaseView):
             interaction,
             self.challenger_id,
             self.target_id,
-            self.bet_amount
+            self.bet_amount,
+            challenge_id=interaction.message.id if interaction.message else None
         )
     
     async def on_decline(self, interaction: discord.Interaction):
@@ -441,7 +447,7 @@ class PvPChallengeView(BaseView):
         
         # 计划删除消息
         if Config.AUTO_DELETE_MESSAGES:
-            asyncio.create_task(self.schedule_delete(Config.CHALLENGE_DELETE_DELAY))
+            self.schedule_delete(self.game.bot, Config.CHALLENGE_DELETE_DELAY)
     
     async def on_timeout(self):
         """超时处理"""
@@ -456,6 +462,6 @@ class PvPChallengeView(BaseView):
                 
                 # 计划删除消息
                 if Config.AUTO_DELETE_MESSAGES:
-                    asyncio.create_task(self.schedule_delete(Config.CHALLENGE_DELETE_DELAY))
+                    self.schedule_delete(self.game.bot, Config.CHALLENGE_DELETE_DELAY)
             except:
                 pass
\ No newline at end of file
@@ -3,11 +3,14 @@
 """
 import discord
 from discord import ui
-from typing import Optional, Callable, Any
+from typing import Optional, Callable, Any, TYPE_CHECKING
 import asyncio
 
 from config import Config
 
+if TYPE_CHECKING:
+    from bot import GameCenterBot
+
 
 class BaseView(ui.View):
     """基础View类，提供通用功能"""
@@ -102,10 +105,11 @@ class BaseView(ui.View):
             if isinstance(item, (ui.Button, ui.Select)):
                 item.disabled = True
     
-    async def schedule_delete(self, delay: int = None) -> None:
-        """计划删除消息
+    def schedule_delete(self, bot: 'GameCenterBot', delay: int = None) -> None:
+        """计划删除消息（由Bot的消息删除服务执行，不单独创建任务）
         
         Args:
+            bot: Bot实例
             delay: 延迟秒数，None则使用默认配置
         """
         if not Config.AUTO_DELETE_MESSAGES:
@@ -117,16 +121,7 @@ class BaseView(ui.View):
         if delay is None:
             delay = Config.GAME_OVER_DELETE_DELAY
         
-        await asyncio.sleep(delay)
-        
-        try:
-            await self.message.delete()
-        except discord.NotFound:
-            pass  # 消息已被删除
-        except discord.Forbidden:
-            pass  # 没有删除权限
-        except Exception:
-            pass
+        bot.delete_later(self.message, delay)
 
 
 class ConfirmView(BaseView):
@@ -1,7 +1,12 @@
 """
 辅助函数
 """
-from typing import Optional
+import dataclasses
+import time
+from datetime import datetime, timedelta
+from typing import Optional, Tuple, Type, TypeVar
+
+T = TypeVar("T")
 
 
 def format_chips(amount: int) -> str:
@@ -91,4 +96,68 @@ def ordinal(n: int) -> str:
     Returns:
         序数词，如 "第1"
     """
-    return f"第{n}"
\ No newline at end of file
+    return f"第{n}"
+
+
+# ==================== 时间戳 ====================
+
+MS_PER_DAY = 86_400_000
+
+
+def now_ms() -> int:
+    """当前时间（毫秒时间戳）"""
+    return int(time.time() * 1000)
+
+
+def ms_to_datetime(ms: int) -> datetime:
+    """毫秒时间戳转换为本地时间"""
+    return datetime.fromtimestamp(ms / 1000)
+
+
+def datetime_to_ms(dt: datetime) -> int:
+    """本地时间（或带时区的时间）转换为毫秒时间戳"""
+    return int(dt.timestamp() * 1000)
+
+
+# 缓存的当天边界（本地0点, 次日0点），毫秒时间戳
+_day_bounds: Tuple[int, int] = (0, 0)
+
+
+def local_day_bounds(now: Optional[int] = None) -> Tuple[int, int]:
+    """本地当天0点和次日0点的毫秒时间戳
+    
+    边界按天缓存，同一天内的调用只做两次整数比较。
+    
+    Args:
+        now: 毫秒时间戳，默认为当前时间
+    """
+    global _day_bounds
+    if now is None:
+        now = now_ms()
+    start, end = _day_bounds
+    if start <= now < end:
+        return _day_bounds
+    
+    midnight = ms_to_datetime(now).replace(hour=0, minute=0, second=0, microsecond=0)
+    bounds = (datetime_to_ms(midnight), datetime_to_ms(midnight + timedelta(days=1)))
+    # 只缓存当前这一天（查询其他日期时不覆盖）
+    if bounds[0] <= now_ms() < bounds[1]:
+        _day_bounds = bounds
+    return bounds
+
+
+def slotted(cls: Type[T]) -> Type[T]:
+    """为数据类加上 __slots__（Python 3.10 以下没有 dataclass(slots=True)）
+    
+    放在 @dataclass 之上使用。实例不再带 __dict__，内存更小、属性访问更快，
+    也不能再动态添加未声明的属性。
+    """
+    names = tuple(f.name for f in dataclasses.fields(cls))
+    namespace = {
+        key: value for key, value in cls.__dict__.items()
+        if key not in names and key not in ("__dict__", "__weakref__")
+    }
+    namespace["__slots__"] = names
+    new_cls = type(cls)(cls.__name__, cls.__bases__, namespace)
+    new_cls.__qualname__ = cls.__qualname__
+    return new_cls